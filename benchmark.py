@@ -0,0 +1,412 @@
+"""
+Нагрузочные замеры: выполнение запроса, заполнение таблицы результатов,
+экспорт, быстрый фильтр и сортировка результата, подсветка синтаксиса на
+синтетических базах разного размера.
+
+    python benchmark.py --sizes 10000,100000,1000000
+    python benchmark.py --save-baseline          # сохранить эталон
+    python benchmark.py --threshold 0.2          # сравнить с эталоном
+
+Базы создаются один раз в --data-dir и переиспользуются. Результаты
+пишутся в JSON: время (медиана и минимум из --repeat повторов) и пик
+памяти Python по tracemalloc (память Qt на стороне C++ в него не входит).
+При наличии эталона замеры, ставшие медленнее или тяжелее больше чем
+на --threshold, считаются регрессией (код завершения 1).
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from sql_editor.db.connection import DatabaseManager
+from sql_editor.utils.columnar import ColumnStore, RowFilter
+from sql_editor.utils.export import export_to_csv, export_to_json
+
+# Размеры таблиц (строк) и сценария подсветки (строк текста) по умолчанию
+DEFAULT_SIZES = (10000, 100000, 1000000)
+DEFAULT_SCRIPT_LINES = (10000, 100000)
+
+# Допустимое ухудшение относительно эталона (0.2 - на 20%)
+DEFAULT_THRESHOLD = 0.2
+
+# Замеры меньше этого времени не сравниваются: их разброс больше порога
+MIN_COMPARED_SECONDS = 0.005
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Столбцы синтетических таблиц: выражения от номера строки n, чтобы
+# данные были одинаковыми при каждом создании базы
+SHAPES = {
+    "narrow": [
+        ("name", "TEXT", "'user_' || n"),
+        ("value", "REAL", "n * 0.25"),
+        ("created", "TEXT", "date('2020-01-01', '+' || (n % 1500) || ' days')"),
+    ],
+    "wide": [
+        column
+        for i in range(10)
+        for column in (
+            (f"num_{i}", "INTEGER", f"(n * {7919 + i}) % 100000"),
+            (f"text_{i}", "TEXT", f"'value ' || ((n + {i}) % 977) || ' of {i}'"),
+        )
+    ],
+}
+
+CASES = ("execute", "fill", "export", "filter", "highlight")
+
+# Условие быстрого фильтра по первому текстовому столбцу таблицы
+FILTER_TEXT = "7"
+
+# Фрагмент сценария для подсветки: ключевые слова, строки, числа,
+# однострочные и многострочные комментарии
+SCRIPT_TEMPLATE = """\
+-- Отчет {n}
+SELECT id, name, value * 1.5 AS total, 'строка ''{n}''' AS label
+FROM narrow
+WHERE value > {n} AND name LIKE 'user_%' /* фильтр
+   по нескольким строкам */
+ORDER BY total DESC LIMIT 100;
+"""
+
+
+def database_path(data_dir, shape, size):
+    return os.path.join(data_dir, f"bench_{shape}_{size}.db")
+
+
+def create_database(path, shape, size):
+    """
+    Синтетическая таблица shape из size строк (если еще не создана).
+    Признак готовой базы - PRAGMA user_version, равный числу строк
+    """
+    if os.path.exists(path):
+        connection = sqlite3.connect(path)
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] == size:
+                return path
+        finally:
+            connection.close()
+        os.remove(path)
+
+    columns = SHAPES[shape]
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        definitions = ", ".join(f"{name} {type_}" for name, type_, _ in columns)
+        connection.execute(
+            f"CREATE TABLE {shape} (id INTEGER PRIMARY KEY, {definitions})")
+        expressions = ", ".join(expression for _, _, expression in columns)
+        connection.execute("BEGIN")
+        connection.execute(
+            f"WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s "
+            f"WHERE n < ?) INSERT INTO {shape} SELECT n, {expressions} FROM s",
+            (size,))
+        connection.execute(f"PRAGMA user_version = {int(size)}")
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+    return path
+
+
+def build_script(lines):
+    """SQL-сценарий примерно из lines строк"""
+    block = SCRIPT_TEMPLATE.count("\n")
+    return "".join(SCRIPT_TEMPLATE.format(n=n)
+                   for n in range(max(1, lines // block)))
+
+
+def measure(run, repeat):
+    """
+    Медиана и минимум времени run() по repeat повторам и пик памяти
+    Python за отдельный (repeat + 1)-й запуск под tracemalloc
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "peak_bytes": peak,
+    }
+
+
+class QtBench:
+    """
+    Окружение Qt без экрана для замеров окна и подсветки.
+    Настройки и история окна пишутся в тестовые каталоги Qt, а не в
+    рабочие каталоги пользователя
+    """
+
+    def __init__(self, data_dir):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtCore import QSettings, QStandardPaths
+        from PyQt6.QtWidgets import QApplication
+
+        QStandardPaths.setTestModeEnabled(True)
+        QSettings.setPath(QSettings.Format.NativeFormat,
+                          QSettings.Scope.UserScope,
+                          os.path.join(data_dir, "settings"))
+        self.app = QApplication.instance() or QApplication([])
+        self._window = None
+
+    @property
+    def window(self):
+        if self._window is None:
+            from sql_editor.ui.main_window import MainWindow
+            self._window = MainWindow()
+            self._window.show()
+            self.app.processEvents()
+        return self._window
+
+    def fill(self, headers, rows):
+        """Вывод результата в таблицу окна с отрисовкой начала и конца"""
+        window = self.window
+        window.fill_table(headers, rows)
+        view = window.result_table
+        self.app.processEvents()
+        view.viewport().grab()
+        view.scrollToBottom()
+        view.viewport().grab()
+        window.fill_table([], [])
+
+    def highlighter(self):
+        from PyQt6.QtGui import QTextDocument
+        from sql_editor.ui.syntax import SqlHighlighter
+        document = QTextDocument()
+        return document, SqlHighlighter(document)
+
+    def close(self):
+        if self._window is not None:
+            # Без closeEvent: он сохраняет настройки и спрашивает о транзакциях
+            if self._window.history is not None:
+                self._window.history.close()
+            for db in self._window.databases + [self._window.db]:
+                db.close()
+            self._window.hide()
+            self._window.deleteLater()
+            self._window = None
+            self.app.processEvents()
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, shapes=tuple(SHAPES), cases=CASES,
+                   script_lines=DEFAULT_SCRIPT_LINES, repeat=3,
+                   data_dir=None, log=None):
+    """
+    Выполнение замеров. Возвращает словарь для JSON: сведения об окружении
+    и результаты по ключам вида "execute_query/narrow/10000"
+    """
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(),
+                                        "sql_editor_bench")
+    os.makedirs(data_dir, exist_ok=True)
+    log = log or (lambda message: None)
+    results = {}
+
+    def record(key, run, **extra):
+        log(f"{key}...")
+        results[key] = dict(measure(run, repeat), **extra)
+        item = results[key]
+        log(f"{key}: {item['seconds'] * 1000:.1f} мс, "
+            f"пик памяти {item['peak_bytes'] / 1048576:.1f} МБ")
+
+    def record_filter(shape, size, headers, rows):
+        # Пик памяти замера хранилища - объем результата по столбцам
+        record(f"column_store/{shape}/{size}",
+               lambda: ColumnStore(len(headers), rows), rows=size)
+        store = ColumnStore(len(headers), rows)
+        text_column = next(i for i, (_, kind, _) in enumerate(SHAPES[shape])
+                           if kind == "TEXT") + 1
+        row_filter = RowFilter(FILTER_TEXT, column=text_column)
+        record(f"filter/{shape}/{size}",
+               lambda: store.view((), row_filter), rows=size)
+
+        def sort():
+            store.clear_orders()
+            store.view(((text_column, False), (0, True)))
+        record(f"sort/{shape}/{size}", sort, rows=size)
+
+    qt = None
+    if "fill" in cases or "highlight" in cases:
+        qt = QtBench(data_dir)
+    try:
+        table_cases = [case for case in cases if case != "highlight"]
+        for shape in shapes if table_cases else ():
+            for size in sizes:
+                path = create_database(database_path(data_dir, shape, size),
+                                       shape, size)
+                db = DatabaseManager()
+                db.max_readers = 0
+                db.connect(path)
+                query = f"SELECT * FROM {shape}"
+                try:
+                    if "execute" in cases:
+                        record(f"execute_query/{shape}/{size}",
+                               lambda: db.execute_query(query), rows=size)
+                    if {"fill", "export", "filter"} & set(cases):
+                        headers, rows = db.execute_query(query)
+                        if "fill" in cases:
+                            record(f"fill_table/{shape}/{size}",
+                                   lambda: qt.fill(headers, rows), rows=size)
+                        if "export" in cases:
+                            output = os.path.join(data_dir, "export.out")
+                            record(f"export_to_csv/{shape}/{size}",
+                                   lambda: export_to_csv(output, headers, rows),
+                                   rows=size)
+                            record(f"export_to_json/{shape}/{size}",
+                                   lambda: export_to_json(output, headers,
+                                                          rows),
+                                   rows=size)
+                            os.remove(output)
+                        if "filter" in cases:
+                            record_filter(shape, size, headers, rows)
+                        del headers, rows
+                finally:
+                    db.close()
+
+        if "highlight" in cases:
+            document, highlighter = qt.highlighter()
+            for lines in script_lines:
+                script = build_script(lines)
+                record(f"highlight/{lines}",
+                       lambda: document.setPlainText(script), lines=lines)
+            document.clear()
+    finally:
+        if qt is not None:
+            qt.close()
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Регрессии относительно эталона: список (ключ, метрика, эталон, текущее).
+    Сравниваются только замеры, присутствующие в обоих наборах
+    """
+    regressions = []
+    old_results = baseline.get("results", {})
+    for key, item in current.get("results", {}).items():
+        old = old_results.get(key)
+        if old is None:
+            continue
+        if (max(old["seconds"], item["seconds"]) >= MIN_COMPARED_SECONDS
+                and item["seconds"] > old["seconds"] * (1 + threshold)):
+            regressions.append((key, "seconds", old["seconds"],
+                                item["seconds"]))
+        if item["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            regressions.append((key, "peak_bytes", old["peak_bytes"],
+                                item["peak_bytes"]))
+    return regressions
+
+
+def _int_list(value):
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "ожидается список чисел через запятую") from None
+
+
+def _name_list(choices):
+    def parse(value):
+        names = [item.strip() for item in value.split(",") if item.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(
+                f"неизвестные значения: {', '.join(unknown)} "
+                f"(допустимы: {', '.join(choices)})")
+        return names
+    return parse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Замеры производительности SQL Editor")
+    parser.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES),
+                        help="число строк таблиц через запятую "
+                             "(например, 10000,100000,1000000,10000000)")
+    parser.add_argument("--shapes", type=_name_list(tuple(SHAPES)),
+                        default=list(SHAPES),
+                        help="виды таблиц: narrow (4 столбца), wide (21)")
+    parser.add_argument("--cases", type=_name_list(CASES), default=list(CASES),
+                        help="замеры: execute, fill, export, filter, "
+                             "highlight")
+    parser.add_argument("--script-lines", type=_int_list,
+                        default=list(DEFAULT_SCRIPT_LINES),
+                        help="размеры сценария для подсветки (строк текста)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="повторов каждого замера")
+    parser.add_argument("--data-dir",
+                        help="каталог синтетических баз (по умолчанию - "
+                             "во временном каталоге)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="файл результатов JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="файл эталонных результатов")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="записать результаты как новый эталон")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое ухудшение (0.2 - на 20%%)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.repeat < 1:
+        print("Ошибка: --repeat должен быть положительным", file=sys.stderr)
+        return 2
+
+    report = run_benchmarks(
+        args.sizes, args.shapes, args.cases, args.script_lines, args.repeat,
+        args.data_dir, log=lambda message: print(message, file=sys.stderr))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"Эталон сохранен: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Эталон {args.baseline} не найден, сравнение пропущено "
+              f"(создайте его с --save-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare_results(report, baseline, args.threshold)
+    for key, metric, old, new in regressions:
+        print(f"Регрессия {key} ({metric}): {old:.4g} -> {new:.4g} "
+              f"({(new / old - 1) * 100:+.0f}%)")
+    if regressions:
+        return 1
+    print(f"Регрессий нет (порог {args.threshold * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
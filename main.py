@@ -1,15 +1,41 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from sql_editor.ui.main_window import MainWindow
+
+# Флаг отчета о времени запуска (импорт модулей и этапы до готовности окна)
+STARTUP_REPORT_FLAG = "--startup-report"
 
 
 def main():
+    report = None
+    if STARTUP_REPORT_FLAG in sys.argv:
+        sys.argv.remove(STARTUP_REPORT_FLAG)
+        from sql_editor.utils.startup import StartupReport
+        report = StartupReport()
+        # Замер импортов начинается до загрузки PyQt6 и окна
+        report.install()
+
+    # Импорт здесь, а не в начале модуля, чтобы его время попало в отчет
+    from PyQt6.QtWidgets import QApplication
+    from sql_editor.ui.main_window import MainWindow
+    if report is not None:
+        report.mark("импорт модулей")
+
     # Создаем экземпляр приложения
     app = QApplication(sys.argv)
+    # Имена совпадают с QSettings: от них зависит каталог данных приложения
+    app.setOrganizationName("LinkovSoft")
+    app.setApplicationName("SQLEditor")
 
-    # Создаем и показываем главное окно
+    # Создаем и показываем главное окно. Подсветка, история и БД прошлой
+    # сессии загружаются после первой отрисовки (MainWindow.finish_startup)
     window = MainWindow()
+    if report is not None:
+        report.mark("создание окна")
+        window.startupStage.connect(report.mark)
+        window.startupFinished.connect(
+            lambda: print(report.format(), file=sys.stderr, flush=True))
     window.show()
+    if report is not None:
+        report.mark("показ окна")
 
     # Запускаем цикл событий
     sys.exit(app.exec())
@@ -0,0 +1,455 @@
+"""
+Запуск SQL-скриптов без графического интерфейса:
+
+    python -m sql_editor run db.sqlite script.sql --out result.ndjson
+
+Нагрузочный замер (повторение запросов в несколько потоков):
+
+    python -m sql_editor load db.sqlite --script queries.sql --readers 8
+
+Модуль не импортирует PyQt6 - только sql_editor.db и sql_editor.utils.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sql_editor.db.connection import (
+    CACHEABLE_KEYWORDS, DEFAULT_BATCH_SIZE, DatabaseManager
+)
+from sql_editor.db.history import saved_statements
+from sql_editor.db.profiles import (
+    JOURNAL_MODES, SYNCHRONOUS_MODES, new_profile
+)
+from sql_editor.db.workload import (
+    DEFAULT_BUSY_LIMIT, DEFAULT_DURATION, DEFAULT_HISTORY_LIMIT,
+    DEFAULT_JOURNAL_MODES, DEFAULT_READERS, DEFAULT_WRITERS, run_workload, split_workload
+)
+from sql_editor.utils.export import (
+    BLOB_MODES, EXPORT_FORMATS, detect_format, export_stream, write_stream
+)
+from sql_editor.utils.lexer import first_keyword, split_statements
+
+# Коды завершения
+EXIT_OK = 0
+EXIT_SQL_ERROR = 1      # хотя бы один оператор завершился ошибкой
+EXIT_USAGE = 2          # неверные аргументы (так же завершается argparse)
+EXIT_IO_ERROR = 3       # не удалось прочитать скрипт, открыть БД или записать результат
+EXIT_INTERRUPTED = 130  # прервано Ctrl+C
+
+# Формат результата в stdout, если --format не указан
+STDOUT_FORMAT = "ndjson"
+
+
+class StatementReport:
+    """Итог одного оператора скрипта"""
+
+    def __init__(self, number, sql):
+        self.number = number
+        self.sql = sql
+        # Строк записано в результат (-1 - оператор не возвращает строк)
+        self.rows = -1
+        # Затронуто строк изменяющим оператором (-1 - неизвестно)
+        self.changed = -1
+        self.elapsed = 0.0
+        self.error = None
+        self.output = None
+
+    def describe(self):
+        """Строка отчета в том же виде, что и вкладка "Сообщения" редактора"""
+        sql = " ".join(self.sql.split())
+        if len(sql) > 80:
+            sql = sql[:77] + "..."
+        if self.error is not None:
+            status = f"ошибка: {self.error}"
+        elif self.rows >= 0:
+            status = f"строк: {self.rows}"
+            if self.output:
+                status += f" → {self.output}"
+        elif self.changed >= 0:
+            status = f"затронуто строк: {self.changed}"
+        else:
+            status = "выполнено"
+        return f"{self.number}. {sql} — {status}, {self.elapsed * 1000:.1f} мс"
+
+
+def numbered_path(path, number):
+    """Имя файла результата оператора: result.ndjson.gz -> result.3.ndjson.gz"""
+    _, compression = detect_format(path)
+    suffix = compression or ""
+    base = path[:len(path) - len(suffix)]
+    head, name = os.path.split(base)
+    stem, dot, ext = name.rpartition(".")
+    if not dot or not stem:
+        return f"{path}.{number}"
+    return os.path.join(head, f"{stem}.{number}.{ext}{suffix}")
+
+
+def open_database(path, read_only=False):
+    """DatabaseManager на одном соединении, без кэша результатов"""
+    db = DatabaseManager()
+    # Процесс выполняет операторы по одному - читатели пула не нужны,
+    # а собирать строки для кэша незачем
+    db.max_readers = 0
+    db.result_cache.max_bytes = 0
+    db.connect(path, new_profile(read_only=read_only))
+    return db
+
+
+def execute_statement(db, number, sql, output, fmt, compression,
+                      batch_size=DEFAULT_BATCH_SIZE, blobs="base64"):
+    """
+    Выполнение оператора с потоковой записью результата: в файл output
+    или, если он не задан, в stdout. Ошибки SQL попадают в отчет
+    """
+    report = StatementReport(number, sql)
+    started = time.perf_counter()
+    try:
+        result = db.execute_stream(sql, batch_size)
+        try:
+            if result.headers:
+                report.output = output
+                if output is None:
+                    report.rows = write_stream(
+                        sys.stdout, result.headers, result.batches(), fmt,
+                        blobs=blobs)
+                    sys.stdout.flush()
+                else:
+                    report.rows = export_stream(
+                        output, result.headers, result.batches(), fmt,
+                        compression, blobs=blobs)
+            else:
+                report.changed = result.rowcount
+        finally:
+            result.close()
+    except sqlite3.Error as e:
+        report.error = str(e)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _execute_read(db_path, number, sql, output, fmt, compression, batch_size,
+                  blobs):
+    # Выполняется в процессе пула: свое соединение только для чтения
+    db = open_database(db_path, read_only=True)
+    try:
+        return execute_statement(db, number, sql, output, fmt, compression,
+                                 batch_size, blobs)
+    finally:
+        db.close()
+
+
+def plan_groups(statements, jobs):
+    """
+    Разбиение скрипта на группы (список номеров операторов).
+    Подряд идущие выборки при jobs > 1 составляют одну группу и
+    выполняются параллельно (если скрипт не открыл транзакцию - тогда
+    по порядку на том же соединении); остальные операторы - по одному.
+    """
+    groups = []
+    reads = []
+    for number, sql in enumerate(statements, start=1):
+        if jobs > 1 and first_keyword(sql) in CACHEABLE_KEYWORDS:
+            reads.append(number)
+            continue
+        if reads:
+            groups.append(reads)
+            reads = []
+        groups.append([number])
+    if reads:
+        groups.append(reads)
+    return groups
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m sql_editor",
+        description="SQL Editor без графического интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser(
+        "run", help="выполнить SQL-скрипт",
+        description="Выполнение SQL-скрипта с потоковой записью результатов. "
+                    "Если в скрипте несколько операторов, результат "
+                    "оператора N пишется в файл ИМЯ.N.РАСШИРЕНИЕ.")
+    run.add_argument("database", help="файл базы данных SQLite")
+    run.add_argument("script", help="файл со скриптом SQL (- для stdin)")
+    run.add_argument("--out", "-o",
+                     help="файл результата (.csv, .json, .ndjson, со сжатием "
+                          ".gz/.bz2/.xz); без него строки пишутся в stdout")
+    run.add_argument("--format", "-f", choices=EXPORT_FORMATS,
+                     help="формат результата (по умолчанию - по расширению "
+                          f"--out, для stdout - {STDOUT_FORMAT})")
+    run.add_argument("--blobs", choices=BLOB_MODES, default="base64",
+                     help="значения BLOB: строкой base64 или отдельными "
+                          "файлами в каталоге ИМЯ_blobs рядом с --out "
+                          "(в ячейке - путь к файлу)")
+    run.add_argument("--jobs", "-j", type=int, default=1,
+                     help="сколько подряд идущих выборок выполнять "
+                          "параллельно в отдельных процессах")
+    run.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                     help="строк в одной порции выборки")
+    run.add_argument("--continue", dest="continue_on_error",
+                     action="store_true",
+                     help="не останавливаться на ошибочном операторе")
+    run.add_argument("--single-transaction", action="store_true",
+                     help="весь скрипт - одна транзакция (при ошибке "
+                          "откатывается целиком)")
+    run.add_argument("--read-only", action="store_true",
+                     help="открыть БД только для чтения")
+    run.add_argument("--quiet", "-q", action="store_true",
+                     help="не выводить время операторов в stderr")
+
+    load = commands.add_parser(
+        "load", help="нагрузочный замер: повторение запросов в потоках "
+                     "чтения и записи",
+        description="Повторение выборок в N потоках чтения и изменений в M "
+                    "потоках записи на копии БД для каждого режима журнала. "
+                    "Отчет JSON: пропускная способность, задержки "
+                    "p50/p95/p99, число SQLITE_BUSY и время ожидания "
+                    "блокировок.")
+    load.add_argument("database", help="файл базы данных SQLite")
+    source = load.add_mutually_exclusive_group(required=True)
+    source.add_argument("--script",
+                        help="файл с запросами (- для stdin)")
+    source.add_argument("--history",
+                        help="файл истории запросов редактора (history.db)")
+    load.add_argument("--history-limit", type=int,
+                      default=DEFAULT_HISTORY_LIMIT,
+                      help="сколько последних успешных запросов к этой БД "
+                           "взять из истории")
+    load.add_argument("--readers", type=int, default=DEFAULT_READERS,
+                      help="потоков чтения")
+    load.add_argument("--writers", type=int, default=DEFAULT_WRITERS,
+                      help="потоков записи")
+    load.add_argument("--read-rate", type=float, default=0,
+                      help="выборок в секунду на все потоки чтения "
+                           "(0 - без ограничения)")
+    load.add_argument("--write-rate", type=float, default=0,
+                      help="изменений в секунду на все потоки записи "
+                           "(0 - без ограничения)")
+    load.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                      help="длительность замера каждого режима (с)")
+    load.add_argument("--journal-modes",
+                      default=",".join(DEFAULT_JOURNAL_MODES),
+                      help="сравниваемые режимы журнала через запятую "
+                           f"({', '.join(JOURNAL_MODES)})")
+    load.add_argument("--synchronous", choices=SYNCHRONOUS_MODES,
+                      type=str.upper,
+                      help="PRAGMA synchronous соединений замера (по "
+                           "умолчанию - действующий в SQLite)")
+    load.add_argument("--processes", action="store_true",
+                      help="отдельные процессы вместо потоков")
+    load.add_argument("--busy-limit", type=int,
+                      default=DEFAULT_BUSY_LIMIT,
+                      help="сколько ждать блокировку (мс), прежде чем "
+                           "считать оператор неудавшимся")
+    load.add_argument("--out", "-o",
+                      help="файл отчета JSON (без него - в stdout)")
+    load.add_argument("--quiet", "-q", action="store_true",
+                      help="не выводить итоги режимов в stderr")
+    return parser
+
+
+def run_script(args):
+    """Команда run. Возвращает код завершения"""
+    def error(message, code):
+        print(f"Ошибка: {message}", file=sys.stderr)
+        return code
+
+    if args.jobs < 1 or args.batch_size < 1:
+        return error("--jobs и --batch-size должны быть положительными",
+                     EXIT_USAGE)
+    if args.jobs > 1 and args.out is None:
+        return error("для --jobs нужен --out: параллельные выборки пишут "
+                     "каждая в свой файл", EXIT_USAGE)
+    if args.blobs == "files" and args.out is None:
+        return error("для --blobs files нужен --out", EXIT_USAGE)
+    if args.jobs > 1 and args.single_transaction:
+        return error("--jobs несовместим с --single-transaction: "
+                     "параллельные выборки не видят незафиксированных "
+                     "изменений", EXIT_USAGE)
+
+    fmt, compression = args.format, None
+    if args.out is not None:
+        detected, compression = detect_format(args.out)
+        fmt = fmt or detected
+        if fmt is None:
+            return error("не удалось определить формат по имени файла, "
+                         "укажите --format", EXIT_USAGE)
+    fmt = fmt or STDOUT_FORMAT
+
+    try:
+        if args.script == "-":
+            script = sys.stdin.read()
+        else:
+            with open(args.script, encoding="utf-8") as f:
+                script = f.read()
+    except OSError as e:
+        return error(f"не удалось прочитать скрипт: {e}", EXIT_IO_ERROR)
+
+    statements = split_statements(script)
+    if not statements:
+        return error("в скрипте нет операторов", EXIT_USAGE)
+
+    if not os.path.exists(args.database):
+        return error(f"файл БД не найден: {args.database}", EXIT_IO_ERROR)
+    try:
+        db = open_database(args.database, args.read_only)
+    except sqlite3.Error as e:
+        return error(f"не удалось открыть БД: {e}", EXIT_IO_ERROR)
+
+    def output(number):
+        if args.out is None or len(statements) == 1:
+            return args.out
+        return numbered_path(args.out, number)
+
+    def report(item):
+        reports.append(item)
+        if not args.quiet:
+            print(item.describe(), file=sys.stderr, flush=True)
+
+    reports = []
+    executor = None
+    failed = False
+    started = time.perf_counter()
+    try:
+        if args.single_transaction:
+            db.begin()
+        for group in plan_groups(statements, args.jobs):
+            if len(group) > 1 and not db.in_transaction:
+                if executor is None:
+                    # spawn: дочерние процессы не наследуют открытое соединение
+                    executor = ProcessPoolExecutor(
+                        args.jobs, multiprocessing.get_context("spawn"))
+                futures = [executor.submit(
+                    _execute_read, args.database, number,
+                    statements[number - 1], output(number), fmt, compression,
+                    args.batch_size, args.blobs) for number in group]
+                for future in futures:
+                    report(future.result())
+            else:
+                # Выборки в транзакции, открытой скриптом (BEGIN), должны
+                # видеть ее незафиксированные изменения - только через db
+                for number in group:
+                    item = execute_statement(
+                        db, number, statements[number - 1], output(number),
+                        fmt, compression, args.batch_size, args.blobs)
+                    report(item)
+                    if item.error is not None \
+                            and not args.continue_on_error:
+                        break
+            failed = any(item.error is not None for item in reports)
+            if failed and not args.continue_on_error:
+                break
+
+        if args.single_transaction:
+            if failed:
+                db.rollback()
+                if not args.quiet:
+                    print("Изменения отменены", file=sys.stderr)
+            else:
+                db.commit()
+    except KeyboardInterrupt:
+        db.interrupt()
+        if db.in_transaction:
+            db.rollback()
+        return error("прервано", EXIT_INTERRUPTED)
+    except OSError as e:
+        if db.in_transaction:
+            db.rollback()
+        return error(f"не удалось записать результат: {e}", EXIT_IO_ERROR)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        db.close()
+
+    if not args.quiet:
+        total = time.perf_counter() - started
+        errors = sum(1 for item in reports if item.error is not None)
+        print(f"Выполнено операторов: {len(reports) - errors} из "
+              f"{len(statements)}, {total * 1000:.1f} мс", file=sys.stderr)
+    return EXIT_SQL_ERROR if failed else EXIT_OK
+
+
+def load_test(args):
+    """Команда load. Возвращает код завершения"""
+    def error(message, code):
+        print(f"Ошибка: {message}", file=sys.stderr)
+        return code
+
+    modes = [mode.strip().upper() for mode in args.journal_modes.split(",")
+             if mode.strip()]
+    unknown = [mode for mode in modes if mode not in JOURNAL_MODES]
+    if not modes or unknown:
+        return error(f"неизвестные режимы журнала: {', '.join(unknown)} "
+                     f"(допустимы: {', '.join(JOURNAL_MODES)})", EXIT_USAGE)
+    if (args.duration <= 0 or args.readers < 0 or args.writers < 0
+            or args.read_rate < 0 or args.write_rate < 0
+            or args.busy_limit < 0 or args.history_limit < 1):
+        return error("--duration, --history-limit - положительные, число "
+                     "потоков, частота и --busy-limit - неотрицательные",
+                     EXIT_USAGE)
+    if not os.path.exists(args.database):
+        return error(f"файл БД не найден: {args.database}", EXIT_IO_ERROR)
+
+    try:
+        if args.history is not None:
+            if not os.path.exists(args.history):
+                return error(f"файл истории не найден: {args.history}",
+                             EXIT_IO_ERROR)
+            statements = saved_statements(
+                args.history, os.path.abspath(args.database),
+                args.history_limit)
+        elif args.script == "-":
+            statements = split_statements(sys.stdin.read())
+        else:
+            with open(args.script, encoding="utf-8") as f:
+                statements = split_statements(f.read())
+    except (OSError, sqlite3.Error) as e:
+        return error(f"не удалось прочитать запросы: {e}", EXIT_IO_ERROR)
+
+    reads, writes, skipped = split_workload(statements)
+    if not args.quiet:
+        print(f"Выборок: {len(reads)}, изменений: {len(writes)}, "
+              f"пропущено: {skipped}", file=sys.stderr)
+
+    log = None if args.quiet else \
+        (lambda message: print(message, file=sys.stderr, flush=True))
+    try:
+        report = run_workload(
+            args.database, reads, writes, args.readers, args.writers,
+            args.read_rate, args.write_rate, args.duration, modes,
+            args.processes, args.busy_limit,
+            {"synchronous": args.synchronous} if args.synchronous else None,
+            log=log)
+    except ValueError as e:
+        return error(str(e), EXIT_USAGE)
+    except sqlite3.Error as e:
+        return error(f"не удалось подготовить копию БД: {e}", EXIT_IO_ERROR)
+    except KeyboardInterrupt:
+        return error("прервано", EXIT_INTERRUPTED)
+
+    # Ключи по алфавиту - отчеты разных запусков удобно сравнивать diff
+    text = json.dumps(report, ensure_ascii=False, indent=4, sort_keys=True)
+    if args.out is None:
+        print(text)
+        return EXIT_OK
+    try:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    except OSError as e:
+        return error(f"не удалось записать отчет: {e}", EXIT_IO_ERROR)
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run_script(args)
+    if args.command == "load":
+        return load_test(args)
+    return EXIT_USAGE
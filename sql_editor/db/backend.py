@@ -0,0 +1,95 @@
+import sqlite3
+from sql_editor.db.profiles import apply_profile, connection_target, new_profile
+
+
+class Backend:
+    """
+    Драйвер базы данных (DB-API 2.0).
+    Открывает соединения для записи и для чтения и сообщает, можно ли
+    читать параллельно с записью отдельными соединениями. Остальной код
+    работает с соединениями только через DB-API.
+    """
+
+    name = None
+
+    def connect(self, path, profile=None, cached_statements=None):
+        """
+        Соединение для записи.
+        Возвращает (соединение, ошибки применения профиля по именам настроек)
+        """
+        raise NotImplementedError
+
+    def connect_reader(self, path, profile=None, cached_statements=None):
+        """Дополнительное соединение только для чтения"""
+        raise NotImplementedError
+
+    def parallel_reads(self, connection):
+        """Видят ли читатели зафиксированные данные, не мешая записи"""
+        return False
+
+    def interrupt(self, connection):
+        """Прерывание выполняющегося на соединении оператора (из любого потока)"""
+
+
+class SqliteBackend(Backend):
+    """SQLite через модуль sqlite3"""
+
+    name = "sqlite"
+
+    def connect(self, path, profile=None, cached_statements=None):
+        profile = profile or new_profile()
+        connection = self._open(path, profile, cached_statements)
+        return connection, apply_profile(connection, profile)
+
+    def connect_reader(self, path, profile=None, cached_statements=None):
+        # PRAGMA профиля (кэш, mmap, busy_timeout) нужны и читателю, но
+        # journal_mode уже установлен соединением записи
+        profile = profile or new_profile()
+        pragmas = {name: value for name, value in profile["pragmas"].items()
+                   if name != "journal_mode"}
+        connection = self._open(path, profile, cached_statements)
+        apply_profile(connection, dict(profile, pragmas=pragmas))
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @staticmethod
+    def _open(path, profile, cached_statements):
+        database, uri = connection_target(path, profile)
+        # Соединение используется фоновыми потоками выполнения запросов,
+        # поэтому разрешаем обращение к нему не только из создавшего потока.
+        # isolation_level=None - модуль sqlite3 не открывает транзакции
+        # сам, ими управляет DatabaseManager (см. autocommit)
+        options = {}
+        if cached_statements is not None:
+            options["cached_statements"] = cached_statements
+        return sqlite3.connect(database, uri=uri, check_same_thread=False,
+                               isolation_level=None, **options)
+
+    def parallel_reads(self, connection):
+        # В режиме WAL читатели не блокируют запись и не ждут ее; в
+        # остальных режимах журнала (и для :memory:) - одно соединение
+        try:
+            mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        except sqlite3.Error:
+            return False
+        return str(mode).lower() == "wal"
+
+    def interrupt(self, connection):
+        connection.interrupt()
+
+
+# Доступные драйверы по именам
+BACKENDS = {SqliteBackend.name: SqliteBackend}
+
+
+def register_backend(backend_class):
+    """Регистрация драйвера (подкласса Backend) под его именем"""
+    BACKENDS[backend_class.name] = backend_class
+
+
+def get_backend(name=SqliteBackend.name):
+    """Экземпляр драйвера по имени"""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестный драйвер БД: {name}") from None
@@ -0,0 +1,107 @@
+import sys
+import threading
+from collections import OrderedDict
+from itertools import chain
+from sql_editor.utils.lexer import tokenize
+
+# Ограничение кэша результатов по умолчанию (байты)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Сколько строк порции просматривается для оценки ее объема
+SIZE_SAMPLE = 64
+
+# Функции, результат которых меняется между вызовами - такие запросы не кэшируются
+NONDETERMINISTIC = frozenset((
+    "RANDOM", "RANDOMBLOB", "CHANGES", "TOTAL_CHANGES", "LAST_INSERT_ROWID",
+    "CURRENT_TIMESTAMP", "CURRENT_DATE", "CURRENT_TIME", "'NOW'",
+))
+
+
+def normalize_sql(sql):
+    """
+    Нормализованный текст запроса для ключа кэша: без комментариев,
+    с единичными пробелами и ключевыми словами в верхнем регистре.
+    Возвращает None, если запрос нельзя кэшировать.
+    """
+    tokens, _ = tokenize(sql)
+    parts = []
+    for kind, start, length in tokens:
+        if kind == "comment":
+            continue
+        text = sql[start:start + length]
+        if kind in ("keyword", "identifier"):
+            # Имена в SQLite не зависят от регистра
+            text = text.upper()
+        if text.upper() in NONDETERMINISTIC:
+            return None
+        parts.append(text)
+
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts) or None
+
+
+def estimate_size(rows):
+    """
+    Приблизительный объем строк результата в памяти (байты).
+    Размер считается по равномерной выборке строк и умножается на их число,
+    чтобы оценка не стоила дороже самой выборки из курсора.
+    """
+    size = sys.getsizeof(rows)
+    if not rows:
+        return size
+    step = max(1, len(rows) // SIZE_SAMPLE)
+    sample = rows[::step]
+    sample_size = sum(map(sys.getsizeof, sample)) + sum(
+        map(sys.getsizeof, chain.from_iterable(sample)))
+    return size + sample_size * len(rows) // len(sample)
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов запросов, ограниченный суммарным объемом в байтах.
+    Ключ включает версии данных и схемы, поэтому любая запись делает
+    старые результаты недостижимыми, и они вытесняются как самые старые.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Кэш используется и фоновым потоком запроса, и потоком GUI
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(headers, rows) по ключу или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            headers, rows, _ = entry
+            return headers, rows
+
+    def put(self, key, headers, rows, size):
+        """Сохранение результата с вытеснением давно не использованных"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[2]
+            while self._entries and self.bytes + size > self.max_bytes:
+                _, (_, _, old_size) = self._entries.popitem(last=False)
+                self.bytes -= old_size
+            self._entries[key] = (headers, rows, size)
+            self.bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
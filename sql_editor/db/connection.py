@@ -1,25 +1,340 @@
 import sqlite3
+import time
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from sql_editor.db.backend import get_backend
+from sql_editor.db.cache import ResultCache, estimate_size, normalize_sql
+from sql_editor.db.pool import DEFAULT_READERS, READER_WAIT, ConnectionPool
+from sql_editor.db.profiler import ProfileHistory, QueryProfile
+from sql_editor.db.profiles import EFFECTIVE_PRAGMAS, new_profile
+from sql_editor.db.schema import SchemaCache, quote_identifier
+from sql_editor.utils.lexer import first_keyword, split_statements
+
+# Размер порции строк, забираемых из курсора за один fetchmany()
+DEFAULT_BATCH_SIZE = 1000
+
+# Размер кэша подготовленных операторов соединения (sqlite3 по умолчанию - 128)
+DEFAULT_CACHED_STATEMENTS = 256
+
+# Сколько наборов параметров передается в один вызов executemany
+MANY_BATCH_SIZE = 1000
+
+# Через сколько инструкций виртуальной машины SQLite вызывается обработчик прогресса
+PROGRESS_STEPS = 1000
+
+# Операторы управления транзакциями в SQL пользователя
+TRANSACTION_KEYWORDS = frozenset(
+    ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE"))
+
+# Операторы, которые нельзя (или не нужно) оборачивать в транзакцию редактора
+NO_WRAP_KEYWORDS = TRANSACTION_KEYWORDS | {"VACUUM"}
+
+# Операторы, которые сами по себе не изменяют базу данных
+READ_KEYWORDS = frozenset(
+    ("SELECT", "WITH", "VALUES", "EXPLAIN", "PRAGMA", "BEGIN", "SAVEPOINT"))
+
+# Операторы, результат которых можно взять из кэша
+CACHEABLE_KEYWORDS = frozenset(("SELECT", "WITH", "VALUES"))
+
+# Точка сохранения, под которой выполняется скрипт внутри открытой транзакции
+SCRIPT_SAVEPOINT = "sql_editor_script"
+
+# Настройки на время массовой загрузки: без fsync, большой кэш страниц,
+# журнал в памяти (для WAL режим журнала не меняется)
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # 256 МБ
+    "temp_store": "MEMORY",
+}
+
+
+class QueryResult:
+    """
+    Потоковый результат запроса.
+    Заголовки доступны сразу, строки забираются из курсора порциями.
+    """
+
+    def __init__(self, cursor=None, batch_size=DEFAULT_BATCH_SIZE,
+                 on_complete=None, collect_limit=0, profile=None,
+                 on_close=None):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.fetched = 0
+        self.rowcount = cursor.rowcount if cursor is not None else -1
+        # Строки взяты из кэша результатов, а не из курсора
+        self.from_cache = False
+        self._cached_rows = None
+        # Полностью прочитанный результат передается в on_complete(headers,
+        # rows, size); если он больше collect_limit байт, накопление бросается
+        self._on_complete = on_complete
+        self._collect_limit = collect_limit
+        self._collected = [] if on_complete else None
+        self._collected_size = 0
+        # Профиль запроса: время выборки, число и объем строк
+        self.profile = profile
+        # Вызывается один раз после закрытия курсора (возврат соединения в пул)
+        self._on_close = on_close
+
+        if cursor is not None and cursor.description:
+            self.headers = [desc[0] for desc in cursor.description]
+            self.exhausted = False
+        else:
+            # Команда действия - строк не будет, курсор больше не нужен
+            self.headers = []
+            self.close()
+
+    @classmethod
+    def from_rows(cls, headers, rows, profile=None):
+        """Результат из уже готовых строк (попадание в кэш)"""
+        result = cls(profile=profile)
+        result.headers = list(headers)
+        result.exhausted = False
+        result.from_cache = True
+        result._cached_rows = rows
+        return result
+
+    def fetch(self, count=None):
+        """Получение следующей порции строк (пустой список - данных больше нет)"""
+        if self.exhausted:
+            return []
+        if self._cached_rows is not None:
+            return self._take_cached()
+
+        count = count or self.batch_size
+        started = time.perf_counter()
+        rows = self.cursor.fetchmany(count)
+        self.fetched += len(rows)
+        self._account(rows, time.perf_counter() - started)
+        if len(rows) < count:
+            self._complete()
+        return rows
+
+    def fetch_all(self):
+        """Получение всех оставшихся строк"""
+        if self.exhausted:
+            return []
+        if self._cached_rows is not None:
+            return self._take_cached()
+
+        started = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self.fetched += len(rows)
+        self._account(rows, time.perf_counter() - started)
+        self._complete()
+        return rows
+
+    def _take_cached(self):
+        # Строки из кэша уже в памяти - отдаются одной порцией (копией,
+        # чтобы сортировка в модели не меняла закэшированный список)
+        started = time.perf_counter()
+        rows = list(self._cached_rows)
+        self._cached_rows = None
+        self.fetched += len(rows)
+        if self.profile is not None:
+            self.profile.add_fetch(len(rows), estimate_size(rows),
+                                   time.perf_counter() - started)
+        self.close()
+        return rows
+
+    def _account(self, rows, elapsed):
+        # Объем порции оценивается один раз - для профиля и для кэша
+        if self.profile is None and self._collected is None:
+            return
+        size = estimate_size(rows)
+        if self.profile is not None:
+            self.profile.add_fetch(len(rows), size, elapsed)
+        if self._collected is None:
+            return
+        self._collected_size += size
+        if self._collected_size > self._collect_limit:
+            self._collected = None
+        else:
+            self._collected.extend(rows)
+
+    def _complete(self):
+        # Результат прочитан до конца - только такой можно кэшировать
+        if self._collected is not None:
+            self._on_complete(self.headers, self._collected,
+                              self._collected_size)
+            self._collected = None
+        self.close()
+
+    def batches(self):
+        """Итератор по порциям строк"""
+        while not self.exhausted:
+            batch = self.fetch()
+            if batch:
+                yield batch
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    def close(self):
+        """Освобождение курсора"""
+        self.exhausted = True
+        self._collected = None
+        if self.profile is not None:
+            self.profile.finished = True
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+
+class StatementResult:
+    """Результат одного оператора скрипта"""
+
+    def __init__(self, sql, headers=None, rows=None, rowcount=-1,
+                 elapsed=0.0, error=None):
+        self.sql = sql
+        self.headers = headers or []
+        self.rows = rows or []
+        self.rowcount = rowcount
+        self.elapsed = elapsed
+        self.error = error
+        # Ошибка оператора откатила изменения скрипта (ROLLBACK или
+        # ROLLBACK TO точки сохранения)
+        self.rolled_back = False
 
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, backend=None):
+        # Драйвер БД и пул соединений: запись идет через connection,
+        # выборки в режиме автофиксации - через читателей пула
+        self.backend = backend or get_backend()
+        self.pool = None
+        self.max_readers = DEFAULT_READERS
         self.connection = None
         self.cursor = None
         self.db_path = None
+        # Профиль соединения (PRAGMA, режим только для чтения) и ошибки его применения
+        self.profile = None
+        self.profile_errors = {}
+        # Сколько подготовленных операторов соединение хранит для повторного
+        # использования (применяется при подключении)
+        self.cached_statements = DEFAULT_CACHED_STATEMENTS
+        # Счетчик шагов VM и необязательный слушатель прогресса выполнения
+        self.vm_steps = 0
+        self.progress_callback = None
+        # История профилей запросов; текущий профиль получает шаги VM
+        self.profiles = ProfileHistory()
+        self._profile = None
+        # Необязательная постоянная история запросов (QueryHistory)
+        self.history = None
+        self.schema = SchemaCache(self)
+        # Кэш результатов выборок (сбрасывается при переподключении)
+        self.result_cache = ResultCache()
+        # Режим транзакций: автофиксация каждого оператора или ручной
+        # BEGIN/COMMIT/ROLLBACK (транзакция открывается перед первым оператором)
+        self.autocommit = True
+        self.savepoints = []
+        self._changes_at_begin = None
+        # В транзакции выполнялись изменяющие операторы (DDL не виден в total_changes)
+        self._has_writes = False
 
-    def connect(self, path):
-        """Подключение к базе данных"""
-        self.connection = sqlite3.connect(path)
+    def connect(self, path, profile=None):
+        """Подключение к базе данных с применением профиля соединения"""
+        profile = profile or new_profile()
+        pool = ConnectionPool(self.backend, path, profile, self.max_readers,
+                              self.cached_statements)
+        if self.pool is not None:
+            self.pool.close()
+        self.pool = pool
+        self.connection = pool.writer
+        self.profile = profile
+        self.profile_errors = pool.errors
+        self.connection.set_progress_handler(self._on_progress, PROGRESS_STEPS)
         self.cursor = self.connection.cursor()
         self.db_path = path
+        self.vm_steps = 0
+        self.schema.reset()
+        self.result_cache.clear()
+        self.savepoints = []
+        self._changes_at_begin = None
+        self._has_writes = False
 
-    def execute_query(self, query):
-        """Выполнение SQL запроса"""
+    def _on_progress(self, profile=None):
+        # Соединение записи считает шаги текущего профиля, читатели пула -
+        # профиля своего запроса
+        profile = profile or self._profile
+        self.vm_steps += PROGRESS_STEPS
+        if profile is not None:
+            profile.vm_steps += PROGRESS_STEPS
+        if self.progress_callback:
+            self.progress_callback(self.vm_steps)
+        # Ноль - продолжать выполнение (отмена идет через interrupt)
+        return 0
+
+    def _add_profile(self, profile):
+        self.profiles.add(profile)
+        self._profile = profile
+        if self.history is not None:
+            self.history.record(self.db_path, profile)
+
+    @contextmanager
+    def _profiled(self, query, params=None, trace=True):
+        """Профилирование вызова execute: подготовка, выполнение, ошибка"""
+        profile = QueryProfile(query, params)
+        self._add_profile(profile)
+        # Трассировка включается только на время execute, чтобы не
+        # вызывать Python для каждого шага массовых операций
+        if trace:
+            self.connection.set_trace_callback(profile.traced)
+        profile.begin()
+        try:
+            yield profile
+        except sqlite3.Error as e:
+            profile.error = str(e)
+            profile.finished = True
+            raise
+        finally:
+            profile.executed()
+            if trace:
+                self.connection.set_trace_callback(None)
+
+    def interrupt(self):
+        """Прерывание выполняющегося запроса (безопасно из любого потока)"""
+        if self.connection:
+            self.connection.interrupt()
+        if self.pool is not None:
+            self.pool.interrupt_readers()
+
+    @property
+    def parallel_reads(self):
+        """Идут ли выборки через читателей пула параллельно с записью"""
+        return (self.pool is not None and self.pool.parallel_reads
+                and self.autocommit and not self.in_transaction)
+
+    @contextmanager
+    def reading(self):
+        """
+        Соединение для служебного чтения (структура БД): свободный читатель
+        пула или, если его нет, соединение записи
+        """
+        reader = self.pool.acquire(READER_WAIT) if self.parallel_reads \
+            else None
+        try:
+            yield reader or self.connection
+        finally:
+            if reader is not None:
+                self.pool.release(reader)
+
+    def execute_query(self, query, params=None):
+        """Выполнение SQL запроса (params - кортеж или словарь параметров)"""
         if not self.connection:
             raise ConnectionError("Нет активного соединения с базой данных")
 
         # Выполняем запрос
-        self.cursor.execute(query)
+        keyword = self._before_statement(query)
+        try:
+            self.cursor.execute(query, params or ())
+        finally:
+            self._after_statement(keyword)
 
         # Если есть описание курсора - это выборка данных (SELECT)
         if self.cursor.description:
@@ -27,28 +342,557 @@ class DatabaseManager:
             rows = self.cursor.fetchall()
             return headers, rows
 
-        # Если описания нет - это команда действия (INSERT, UPDATE, CREATE, DROP)
+        # Если описания нет - это команда действия (INSERT, UPDATE, CREATE, DROP).
+        # В режиме автофиксации SQLite фиксирует ее сам, в ручном режиме
+        # изменения ждут COMMIT
         else:
-            self.connection.commit()
             return [], []
 
+    def execute_stream(self, query, batch_size=DEFAULT_BATCH_SIZE, params=None):
+        """Выполнение SQL запроса с постраничной выборкой результата"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        key = self._cache_key(query, params)
+        if key is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                profile = QueryProfile(query, params)
+                profile.from_cache = True
+                self._add_profile(profile)
+                return QueryResult.from_rows(*cached, profile=profile)
+
+        # Соединение записи нельзя использовать из двух потоков сразу,
+        # поэтому при занятых читателях выборка ждет освобождения одного из них
+        reader = self.pool.acquire(READER_WAIT) if (
+            self.parallel_reads
+            and first_keyword(query) in CACHEABLE_KEYWORDS) else None
+        if reader is not None:
+            result = self._read_stream(reader, query, batch_size, params, key)
+            if result is not None:
+                return result
+
+        # Отдельный курсор, чтобы служебные запросы не сбрасывали выборку
+        cursor = self.connection.cursor()
+        keyword = self._before_statement(query)
+        try:
+            with self._profiled(query, params) as profile:
+                cursor.execute(query, params or ())
+        except sqlite3.Error:
+            cursor.close()
+            raise
+        finally:
+            self._after_statement(keyword)
+
+        return self._stream_result(cursor, batch_size, profile, key)
+
+    def _stream_result(self, cursor, batch_size, profile, key, on_close=None):
+        if key is None:
+            return QueryResult(cursor, batch_size, profile=profile,
+                               on_close=on_close)
+
+        def store(headers, rows, size):
+            self.result_cache.put(key, headers, rows, size)
+
+        return QueryResult(cursor, batch_size, store,
+                           self.result_cache.max_bytes, profile, on_close)
+
+    def _read_stream(self, reader, query, batch_size, params, key):
+        """
+        Выборка на соединении из пула чтения (соединение возвращается в пул
+        при закрытии результата). Возвращает None, если выборку нужно
+        выполнить через соединение записи: например, она обращается к
+        временной или присоединенной таблице, которых читатель не видит,
+        или оказалась изменяющей (WITH ... DELETE)
+        """
+        profile = QueryProfile(query, params)
+        reader.set_progress_handler(
+            partial(self._on_progress, profile), PROGRESS_STEPS)
+        reader.set_trace_callback(profile.traced)
+        cursor = reader.cursor()
+        profile.begin()
+        try:
+            cursor.execute(query, params or ())
+        except sqlite3.Error as e:
+            profile.executed()
+            reader.set_trace_callback(None)
+            cursor.close()
+            self.pool.release(reader)
+            if isinstance(e, sqlite3.OperationalError) \
+                    and str(e) != "interrupted":
+                return None
+            profile.error = str(e)
+            profile.finished = True
+            self._add_profile(profile)
+            raise
+        profile.executed()
+        reader.set_trace_callback(None)
+        self._add_profile(profile)
+        return self._stream_result(cursor, batch_size, profile, key,
+                                   partial(self.pool.release, reader))
+
+    def _cache_key(self, query, params=None):
+        """
+        Ключ кэша результатов или None, если результат кэшировать нельзя.
+        data_version меняется при фиксации изменений другими соединениями,
+        total_changes - при изменениях этим соединением, schema_version - при DDL.
+        """
+        if (self.result_cache.max_bytes <= 0
+                or first_keyword(query) not in CACHEABLE_KEYWORDS):
+            return None
+        # Незафиксированные изменения могут быть откачены - такое
+        # состояние данных не кэшируется
+        if self.is_dirty():
+            return None
+        normalized = normalize_sql(query)
+        if normalized is None:
+            return None
+        data_version = self.connection.execute(
+            "PRAGMA data_version").fetchone()[0]
+        schema_version = self.connection.execute(
+            "PRAGMA schema_version").fetchone()[0]
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        return (normalized, tuple(params or ()), data_version, schema_version,
+                self.connection.total_changes)
+
+    def explain(self, query, params=None):
+        """План выполнения запроса: строки EXPLAIN QUERY PLAN (id, parent, detail)"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        rows = self.connection.execute(
+            f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+        return [(row[0], row[1], row[3]) for row in rows]
+
+    def explain_bytecode(self, query, params=None):
+        """Байт-код виртуальной машины SQLite для запроса (EXPLAIN)"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        cursor = self.connection.execute(f"EXPLAIN {query}", params or ())
+        headers = [desc[0] for desc in cursor.description]
+        return headers, cursor.fetchall()
+
+    def can_rerun(self, query, params=None):
+        """
+        Вернет ли запрос те же строки на другом соединении с этим файлом.
+        Повторять можно только выборку вне открытой транзакции (другое
+        соединение не видит незафиксированных изменений), которая читает
+        лишь таблицы основной схемы: временные и присоединенные таблицы
+        есть только у этого соединения. Схемы определяются при компиляции
+        запроса (EXPLAIN) через authorizer
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        if first_keyword(query) not in CACHEABLE_KEYWORDS \
+                or self.in_transaction:
+            return False
+        schemas = set()
+
+        def authorizer(action, table, column, schema, source):
+            if action == sqlite3.SQLITE_READ:
+                schemas.add(schema)
+            return sqlite3.SQLITE_OK
+
+        self.connection.set_authorizer(authorizer)
+        try:
+            self.connection.execute(f"EXPLAIN {query}", params or ()).close()
+        except sqlite3.Error:
+            return False
+        finally:
+            self.connection.set_authorizer(None)
+        return schemas <= {"main"}
+
+    def _before_statement(self, query):
+        """В ручном режиме открывает транзакцию перед первым оператором"""
+        keyword = first_keyword(query)
+        if (not self.autocommit and not self.connection.in_transaction
+                and keyword not in NO_WRAP_KEYWORDS):
+            self.begin()
+        return keyword
+
+    def _after_statement(self, keyword):
+        """Учет BEGIN/COMMIT/ROLLBACK, выполненных SQL пользователя"""
+        if keyword == "ANALYZE":
+            # Новая статистика меняет оценки числа строк таблиц
+            self.schema.invalidate_estimates()
+        if not self.connection.in_transaction:
+            self.savepoints.clear()
+            self._changes_at_begin = None
+            self._has_writes = False
+        elif keyword in ("BEGIN", "SAVEPOINT") and self._changes_at_begin is None:
+            self._changes_at_begin = self.connection.total_changes
+        elif keyword and keyword not in READ_KEYWORDS | TRANSACTION_KEYWORDS:
+            self._has_writes = True
+
+    @property
+    def in_transaction(self):
+        return bool(self.connection and self.connection.in_transaction)
+
+    def is_dirty(self):
+        """Есть ли в открытой транзакции незафиксированные изменения"""
+        if not self.in_transaction:
+            return False
+        if self._changes_at_begin is None or self._has_writes:
+            return True
+        return self.connection.total_changes != self._changes_at_begin
+
+    def begin(self):
+        """Открытие транзакции"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        self.connection.execute("BEGIN")
+        self._changes_at_begin = self.connection.total_changes
+
+    def commit(self):
+        """Фиксация открытой транзакции"""
+        if self.in_transaction:
+            self.connection.execute("COMMIT")
+        self._after_statement("COMMIT")
+
+    def rollback(self):
+        """Откат открытой транзакции"""
+        if self.in_transaction:
+            self.connection.execute("ROLLBACK")
+        self._after_statement("ROLLBACK")
+
+    def savepoint(self, name=None):
+        """Создание точки сохранения (вне транзакции открывает ее)"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        name = name or f"sp{len(self.savepoints) + 1}"
+        self.connection.execute(f"SAVEPOINT {quote_identifier(name)}")
+        self.savepoints.append(name)
+        self._after_statement("SAVEPOINT")
+        return name
+
+    def release(self, name):
+        """Освобождение точки сохранения и всех созданных после нее"""
+        self.connection.execute(f"RELEASE {quote_identifier(name)}")
+        if name in self.savepoints:
+            del self.savepoints[self.savepoints.index(name):]
+        self._after_statement("RELEASE")
+
+    def rollback_to(self, name):
+        """Откат к точке сохранения (сама точка остается)"""
+        self.connection.execute(f"ROLLBACK TO {quote_identifier(name)}")
+        if name in self.savepoints:
+            del self.savepoints[self.savepoints.index(name) + 1:]
+        self._after_statement("ROLLBACK")
+
+    def effective_settings(self):
+        """Действующие значения PRAGMA соединения"""
+        if not self.connection:
+            return {}
+        settings = {}
+        for name in EFFECTIVE_PRAGMAS:
+            try:
+                settings[name] = self.get_pragma(name)
+            except sqlite3.Error as e:
+                settings[name] = f"ошибка: {e}"
+        return settings
+
+    def get_pragma(self, name):
+        """Текущее значение PRAGMA"""
+        if not self.connection:
+            return None
+        return self.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def set_pragma(self, name, value):
+        """Установка PRAGMA для текущего сеанса. Возвращает новое значение"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        if name == "journal_mode":
+            # Открытые читатели не дают сменить режим журнала
+            self.pool.close_idle()
+            try:
+                self.connection.execute(f"PRAGMA {name} = {value}")
+            finally:
+                self.pool.check_parallel_reads()
+        else:
+            self.connection.execute(f"PRAGMA {name} = {value}")
+        return self.get_pragma(name)
+
+    def execute_script(self, script, stop_on_error=True):
+        """
+        Выполнение нескольких операторов одной транзакцией.
+        Возвращает список StatementResult со временем и числом строк по каждому.
+        При stop_on_error первая ошибка откатывает всю транзакцию. Если
+        скрипт сам открыл транзакцию (BEGIN), откатывается она; транзакция,
+        открытая до скрипта, остается открытой (см. StatementResult.rolled_back)
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        statements = split_statements(script)
+        # Если скрипт сам управляет транзакциями, не мешаем ему
+        explicit = any(first_keyword(sql) in NO_WRAP_KEYWORDS
+                       for sql in statements)
+        # В режиме автофиксации скрипт - одна транзакция с одним COMMIT.
+        # Внутри открытой (или ручной) транзакции скрипт выполняется под
+        # точкой сохранения, чтобы при ошибке откатить только его
+        own_transaction = (not explicit and self.autocommit
+                           and not self.connection.in_transaction)
+        use_savepoint = not explicit and not own_transaction
+        # Транзакцию, открытую BEGIN самого скрипта, при ошибке откатываем
+        # так же, как свою
+        started_outside = self.connection.in_transaction
+
+        results = []
+        cursor = self.connection.cursor()
+        try:
+            if own_transaction:
+                cursor.execute("BEGIN")
+            elif use_savepoint:
+                if not self.connection.in_transaction:
+                    self.begin()
+                cursor.execute(f"SAVEPOINT {SCRIPT_SAVEPOINT}")
+
+            for sql in statements:
+                keyword = first_keyword(sql)
+                started = time.perf_counter()
+                try:
+                    with self._profiled(sql) as profile:
+                        cursor.execute(sql)
+                    if cursor.description:
+                        fetch_started = time.perf_counter()
+                        rows = cursor.fetchall()
+                        profile.add_fetch(len(rows), estimate_size(rows),
+                                          time.perf_counter() - fetch_started)
+                        result = StatementResult(
+                            sql, [desc[0] for desc in cursor.description], rows)
+                    else:
+                        result = StatementResult(sql, rowcount=cursor.rowcount)
+                    profile.finished = True
+                except sqlite3.Error as e:
+                    result = StatementResult(sql, error=e)
+                finally:
+                    self._after_statement(keyword)
+
+                result.elapsed = time.perf_counter() - started
+                results.append(result)
+                if result.error is not None and stop_on_error:
+                    result.rolled_back = self._undo_script(
+                        cursor, own_transaction or (
+                            explicit and not started_outside),
+                        use_savepoint)
+                    return results
+
+            if own_transaction:
+                cursor.execute("COMMIT")
+            elif use_savepoint:
+                cursor.execute(f"RELEASE {SCRIPT_SAVEPOINT}")
+        except BaseException:
+            self._undo_script(
+                cursor, own_transaction or (explicit and not started_outside),
+                use_savepoint)
+            raise
+        finally:
+            cursor.close()
+            self._after_statement(None)
+        return results
+
+    def execute_many(self, query, parameters, progress=None):
+        """
+        Выполнение одного оператора для каждого набора параметров.
+        Оператор подготавливается один раз, наборы передаются в executemany
+        порциями; все выполняется одной транзакцией (внутри открытой
+        транзакции - под точкой сохранения, ошибка откатывает только ее).
+        Возвращает (число наборов, число измененных строк).
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        parameters = iter(parameters)
+        executed = changed = 0
+        cursor = self.connection.cursor()
+        try:
+            with self._batch_transaction(cursor):
+                # Трассировка не нужна: она вызывалась бы для каждого набора
+                with self._profiled(query, trace=False) as profile:
+                    while True:
+                        batch = list(islice(parameters, MANY_BATCH_SIZE))
+                        if not batch:
+                            break
+                        cursor.executemany(query, batch)
+                        executed += len(batch)
+                        changed += max(cursor.rowcount, 0)
+                        if progress:
+                            progress(executed)
+                    profile.rows = changed
+                    profile.finished = True
+        finally:
+            cursor.close()
+            self._after_statement(first_keyword(query))
+        return executed, changed
+
+    def apply_changes(self, statements):
+        """
+        Запись правок таблицы: statements - список (оператор, наборы
+        параметров), каждый набор должен изменить ровно одну строку.
+        Все выполняется одной транзакцией (как execute_many); если строка
+        не найдена или нарушено ограничение, откатываются все правки.
+        Возвращает число измененных строк.
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        changed = 0
+        cursor = self.connection.cursor()
+        try:
+            with self._batch_transaction(cursor):
+                for query, parameters in statements:
+                    with self._profiled(query, trace=False) as profile:
+                        cursor.executemany(query, parameters)
+                        profile.rows = max(cursor.rowcount, 0)
+                        profile.finished = True
+                    if cursor.rowcount != len(parameters):
+                        raise ValueError(
+                            f"Изменено строк: {max(cursor.rowcount, 0)} из "
+                            f"{len(parameters)} - часть строк изменена или "
+                            f"удалена после выборки")
+                    changed += cursor.rowcount
+        finally:
+            cursor.close()
+            self._after_statement("UPDATE")
+        return changed
+
+    @contextmanager
+    def _batch_transaction(self, cursor):
+        """
+        Пакетная запись одной транзакцией. Внутри уже открытой транзакции -
+        под точкой сохранения: ошибка откатывает только эту запись
+        """
+        own_transaction = self.autocommit and not self.connection.in_transaction
+        try:
+            if own_transaction:
+                cursor.execute("BEGIN")
+            else:
+                if not self.connection.in_transaction:
+                    self.begin()
+                cursor.execute(f"SAVEPOINT {SCRIPT_SAVEPOINT}")
+            yield
+            if own_transaction:
+                cursor.execute("COMMIT")
+            else:
+                cursor.execute(f"RELEASE {SCRIPT_SAVEPOINT}")
+        except BaseException:
+            self._undo_script(cursor, own_transaction, not own_transaction)
+            raise
+
+    def _undo_script(self, cursor, own_transaction, use_savepoint):
+        """Откат записи после ошибки. Возвращает True, если откат выполнен"""
+        if not self.connection.in_transaction:
+            return False
+        if own_transaction:
+            cursor.execute("ROLLBACK")
+        elif use_savepoint:
+            cursor.execute(f"ROLLBACK TO {SCRIPT_SAVEPOINT}")
+            cursor.execute(f"RELEASE {SCRIPT_SAVEPOINT}")
+        else:
+            return False
+        return True
+
+    @contextmanager
+    def tuned_pragmas(self, pragmas):
+        """
+        Временная установка PRAGMA с восстановлением прежних значений.
+        Внутри транзакции пользователя (и в ручном режиме, где пакетная
+        запись продолжает ее) PRAGMA не меняются: synchronous, journal_mode
+        и temp_store нельзя менять в открытой транзакции
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+        if not self.autocommit or self.connection.in_transaction:
+            yield
+            return
+
+        saved = {}
+        try:
+            for name, value in pragmas.items():
+                current = self.connection.execute(f"PRAGMA {name}").fetchone()[0]
+                if name == "journal_mode" and str(current).lower() == "wal":
+                    continue
+                saved[name] = current
+                self.connection.execute(f"PRAGMA {name} = {value}")
+            yield
+        finally:
+            for name, value in saved.items():
+                self.connection.execute(f"PRAGMA {name} = {value}")
+
+    def bulk_insert(self, table, columns, batches, column_types=None,
+                    progress=None):
+        """
+        Массовая вставка порций строк одной транзакцией через executemany.
+        Если переданы типы столбцов, таблица создается в той же транзакции.
+        Внутри открытой транзакции вставка идет под точкой сохранения
+        (см. _batch_transaction) и ничего не фиксирует.
+        Возвращает количество вставленных строк.
+        """
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        quoted_table = quote_identifier(table)
+        quoted_columns = ", ".join(quote_identifier(c) for c in columns)
+        placeholders = ", ".join("?" * len(columns))
+        insert = (f"INSERT INTO {quoted_table} ({quoted_columns}) "
+                  f"VALUES ({placeholders})")
+
+        count = 0
+        cursor = self.connection.cursor()
+        try:
+            with self.tuned_pragmas(BULK_LOAD_PRAGMAS), \
+                    self._batch_transaction(cursor):
+                if column_types is not None:
+                    definitions = ", ".join(
+                        f"{quote_identifier(c)} {t}"
+                        for c, t in zip(columns, column_types))
+                    cursor.execute(
+                        f"CREATE TABLE {quoted_table} ({definitions})")
+                for batch in batches:
+                    cursor.executemany(insert, batch)
+                    count += len(batch)
+                    if progress:
+                        progress(count)
+        finally:
+            cursor.close()
+            self._after_statement("INSERT")
+        return count
+
+    def create_indexes(self, table, columns):
+        """Создание индексов по отдельным столбцам (после загрузки данных)"""
+        if not self.connection:
+            raise ConnectionError("Нет активного соединения с базой данных")
+
+        cursor = self.connection.cursor()
+        try:
+            with self.tuned_pragmas({"temp_store": "MEMORY"}), \
+                    self._batch_transaction(cursor):
+                for column in columns:
+                    name = quote_identifier(f"idx_{table}_{column}")
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name} ON "
+                        f"{quote_identifier(table)} "
+                        f"({quote_identifier(column)})")
+        finally:
+            cursor.close()
+            self._after_statement("CREATE")
+
     def close(self):
         """Закрытие соединения"""
         if self.connection:
-            self.connection.close()
+            self.pool.close()
+            self.pool = None
             self.connection = None
             self.cursor = None
             self.db_path = None
+            self.schema.reset()
 
     def get_tables(self):
         """Получение списка таблиц"""
         if not self.connection:
             return []
 
-        query = "SELECT name FROM sqlite_master WHERE type='table';"
-        try:
-            self.cursor.execute(query)
-            # Возвращаем плоский список имен
-            return [row[0] for row in self.cursor.fetchall()]
-        except sqlite3.Error:
-            return []
+        # Список берется из кэша структуры, sqlite_master перечитывается
+        # только при изменении schema_version
+        self.schema.refresh()
+        return self.schema.tables()
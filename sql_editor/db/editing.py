@@ -0,0 +1,227 @@
+from sql_editor.db.schema import ROWID_ALIASES, quote_identifier
+from sql_editor.utils.lexer import first_keyword, table_references, tokenize
+
+# Слова, с которыми строки результата не соответствуют строкам одной таблицы
+NOT_EDITABLE_WORDS = frozenset((
+    "JOIN", "UNION", "INTERSECT", "EXCEPT", "GROUP", "HAVING", "DISTINCT",
+    "WINDOW", "OVER",
+))
+
+
+class EditTarget:
+    """
+    Таблица, в которую записываются правки результата, и столбцы ключа,
+    по которым находится строка (первичный ключ или rowid). Скрытые
+    столбцы (hidden_columns) не показываются, их значения идут в кортеже
+    строки после столбцов headers
+    """
+
+    def __init__(self, db, table, headers, key_columns, hidden_columns=()):
+        self.db = db
+        self.table = table
+        self.headers = list(headers)
+        self.key_columns = list(key_columns)
+        columns = self.headers + list(hidden_columns)
+        self.key_indexes = [columns.index(name) for name in key_columns]
+
+    def key(self, row):
+        return tuple(row[i] for i in self.key_indexes)
+
+
+def edit_target(db, sql, headers, hidden_columns=()):
+    """
+    EditTarget для результата запроса или None, если его строки нельзя
+    однозначно сопоставить строкам одной таблицы. Подходит SELECT из одной
+    таблицы (не представления) со столбцами без выражений и псевдонимов,
+    в котором есть первичный ключ таблицы или rowid - среди заголовков или
+    среди скрытых столбцов источника (rowid просмотра таблицы)
+    """
+    if not sql or not headers or first_keyword(sql) != "SELECT":
+        return None
+    tables = set(table_references(sql).values())
+    if len(tables) != 1:
+        return None
+    table = tables.pop()
+
+    tokens, _ = tokenize(sql)
+    words = [(kind, sql[start:start + length]) for kind, start, length in tokens
+             if kind != "comment"]
+    if any(word.upper() in NOT_EDITABLE_WORDS for _, word in words):
+        return None
+    # Список выборки: только имена столбцов, "*" и "таблица.столбец"
+    # (псевдоним AS или выражение не соответствуют столбцу таблицы)
+    for kind, word in words[1:]:
+        if word.upper() == "FROM":
+            break
+        if kind not in ("identifier", "quoted") and word not in (",", ".", "*"):
+            return None
+
+    schema = db.schema
+    schema.refresh()
+    names = {name.lower(): name for name in schema.tables()}
+    table = names.get(table.lower())
+    if table is None:
+        return None
+    columns = schema.columns(table)
+    column_names = {column[1].lower() for column in columns}
+    lowered = [header.lower() for header in headers]
+    if len(set(lowered)) != len(lowered):
+        return None
+    rowid_headers = [header for header in headers
+                     if header.lower() in ROWID_ALIASES
+                     and header.lower() not in column_names]
+    if any(name not in column_names and header not in rowid_headers
+           for name, header in zip(lowered, headers)):
+        return None
+
+    primary_key = [column[1] for column in sorted(columns, key=lambda c: c[5])
+                   if column[5]]
+    by_lower = {header.lower(): header for header in headers}
+    if primary_key and all(name.lower() in by_lower for name in primary_key):
+        key = [by_lower[name.lower()] for name in primary_key]
+    elif rowid_headers:
+        key = rowid_headers[:1]
+    else:
+        key = [name for name in hidden_columns
+               if name.lower() in ROWID_ALIASES
+               and name.lower() not in column_names][:1]
+        if not key:
+            return None
+    return EditTarget(db, table, headers, key, hidden_columns)
+
+
+def cell_text(value):
+    """Текст значения ячейки для редактирования (обратный cell_value)"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        # Строка, которая читалась бы как число или NULL, берется в кавычки
+        if cell_value(value) != value:
+            return "'" + value.replace("'", "''") + "'"
+        return value
+    return str(value)
+
+
+def cell_value(text):
+    """Значение из введенного текста: NULL, число или строка ('...' - строка)"""
+    # Разбор тот же, что у значений параметров запроса
+    from sql_editor.utils.params import parse_value
+    return parse_value(text)
+
+
+class PendingChanges:
+    """
+    Неприменённые правки результата: измененные ячейки, удаленные и
+    добавленные строки. Применяются одной транзакцией (apply) - по одному
+    executemany на каждый вид оператора
+    """
+
+    def __init__(self, target):
+        self.target = target
+        # Ключ строки -> {индекс столбца: новое значение}
+        self.updates = {}
+        self.deletes = set()
+        # Добавленные строки: {индекс столбца: значение}; незаданные
+        # столбцы получают значения по умолчанию
+        self.inserts = []
+
+    def __len__(self):
+        return len(self.updates) + len(self.deletes) + len(self.inserts)
+
+    def clear(self):
+        self.updates.clear()
+        self.deletes.clear()
+        self.inserts.clear()
+
+    def value(self, row, column):
+        """Значение ячейки исходной строки с учетом правки"""
+        edits = self.updates.get(self.target.key(row))
+        if edits and column in edits:
+            return edits[column]
+        return row[column]
+
+    def is_edited(self, row, column):
+        edits = self.updates.get(self.target.key(row))
+        return bool(edits) and column in edits
+
+    def is_deleted(self, row):
+        return self.target.key(row) in self.deletes
+
+    def edit(self, row, column, value):
+        """Правка ячейки исходной строки (возврат к исходному значению снимает ее)"""
+        key = self.target.key(row)
+        edits = self.updates.setdefault(key, {})
+        if value == row[column] and type(value) is type(row[column]):
+            edits.pop(column, None)
+        else:
+            edits[column] = value
+        if not edits:
+            del self.updates[key]
+
+    def delete(self, row):
+        key = self.target.key(row)
+        self.updates.pop(key, None)
+        self.deletes.add(key)
+
+    def restore(self, row):
+        """Отмена удаления строки"""
+        self.deletes.discard(self.target.key(row))
+
+    def insert(self):
+        """Новая строка; возвращает ее номер среди добавленных"""
+        self.inserts.append({})
+        return len(self.inserts) - 1
+
+    def statements(self):
+        """Операторы и наборы параметров: [(sql, [параметры, ...]), ...]"""
+        target = self.target
+        table = quote_identifier(target.table)
+        headers = [quote_identifier(name) for name in target.headers]
+        where = " AND ".join(f"{quote_identifier(name)} = ?"
+                             for name in target.key_columns)
+        statements = []
+
+        if self.deletes:
+            statements.append((f"DELETE FROM {table} WHERE {where}",
+                               [list(key) for key in self.deletes]))
+
+        # Строки с одинаковым набором измененных столбцов - один оператор
+        groups = {}
+        for key, edits in self.updates.items():
+            columns = tuple(sorted(edits))
+            groups.setdefault(columns, []).append(
+                [edits[column] for column in columns] + list(key))
+        for columns, parameters in groups.items():
+            assignments = ", ".join(f"{headers[column]} = ?"
+                                    for column in columns)
+            statements.append(
+                (f"UPDATE {table} SET {assignments} WHERE {where}", parameters))
+
+        groups = {}
+        for values in self.inserts:
+            columns = tuple(sorted(values))
+            groups.setdefault(columns, []).append(
+                [values[column] for column in columns])
+        for columns, parameters in groups.items():
+            if columns:
+                names = ", ".join(headers[column] for column in columns)
+                marks = ", ".join("?" * len(columns))
+                sql = f"INSERT INTO {table} ({names}) VALUES ({marks})"
+            else:
+                sql = f"INSERT INTO {table} DEFAULT VALUES"
+            statements.append((sql, parameters))
+        return statements
+
+    def apply(self):
+        """
+        Запись правок в БД одной транзакцией. Если строка не найдена по
+        ключу (ее изменили или удалили в другом месте) или нарушено
+        ограничение, откатываются все правки и буфер сохраняется.
+        Возвращает число измененных строк
+        """
+        if not self:
+            return 0
+        changed = self.target.db.apply_changes(self.statements())
+        self.clear()
+        return changed
+
@@ -0,0 +1,194 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from sql_editor.db.connection import QueryResult
+
+# Запись в историю: не реже раза в столько секунд или при накоплении
+# FLUSH_SIZE записей
+FLUSH_INTERVAL = 1.0
+FLUSH_SIZE = 200
+
+# Сколько записей истории загружается за одну порцию
+HISTORY_PAGE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    executed_at REAL NOT NULL,
+    db_path TEXT,
+    sql TEXT NOT NULL,
+    duration REAL,
+    rows INTEGER,
+    error TEXT
+);
+"""
+
+# Полнотекстовый индекс по тексту запросов (внешнее содержимое - таблица
+# history, индекс пополняется триггером)
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    sql, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, sql) VALUES (new.id, new.sql);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, sql)
+    VALUES ('delete', old.id, old.sql);
+END;
+"""
+
+_COLUMNS = """
+    SELECT datetime(h.executed_at, 'unixepoch', 'localtime') AS "Время",
+           h.sql AS "Запрос",
+           round(h.duration * 1000, 1) AS "мс",
+           h.rows AS "Строк",
+           coalesce(h.error, '') AS "Ошибка",
+           coalesce(h.db_path, '') AS "БД"
+"""
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class QueryHistory:
+    """
+    История выполненных запросов в отдельной базе SQLite.
+    Записи копятся в памяти и пишутся фоновым потоком порциями, поэтому
+    выполнение запросов не ждет диска. Поиск идет по индексу FTS5
+    (если SQLite собран без FTS5 - через LIKE).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        # Соединение для поиска (поток GUI); WAL - чтение не мешает записи
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(_SCHEMA)
+        try:
+            self.connection.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.connection.commit()
+
+        self._writer = threading.Thread(
+            target=self._run, name="query-history", daemon=True)
+        self._writer.start()
+
+    def record(self, db_path, profile):
+        """
+        Постановка запроса в очередь записи. Профиль читается при записи,
+        когда выборка закончена (результат прочитан до конца или закрыт),
+        поэтому в историю попадает полное время и число полученных строк.
+        """
+        with self._lock:
+            self._pending.append((db_path, profile))
+            if len(self._pending) >= FLUSH_SIZE:
+                self._wakeup.set()
+
+    def _run(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA busy_timeout = 5000")
+        try:
+            while True:
+                self._wakeup.wait(FLUSH_INTERVAL)
+                self._wakeup.clear()
+                closed = self._closed
+                self._flush(connection, final=closed)
+                if closed:
+                    break
+        finally:
+            connection.close()
+
+    def _flush(self, connection, final=False):
+        with self._lock:
+            # Запросы, строки которых еще выбираются, ждут следующей записи;
+            # при закрытии истории пишется то, что известно на этот момент
+            ready, waiting = [], []
+            for item in self._pending:
+                if final or item[1].finished:
+                    ready.append(item)
+                else:
+                    waiting.append(item)
+            self._pending = waiting
+        if not ready:
+            return
+
+        rows = [(profile.started_at, db_path, profile.sql, profile.wall_time,
+                 profile.rows, profile.error) for db_path, profile in ready]
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO history "
+                    "(executed_at, db_path, sql, duration, rows, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error:
+            # История не должна мешать работе редактора
+            pass
+
+    def search(self, text="", batch_size=HISTORY_PAGE):
+        """
+        Поиск по истории (новые записи первыми).
+        Возвращает QueryResult: строки догружаются порциями по мере прокрутки.
+        """
+        words = _WORD_RE.findall(text)
+        if not words:
+            cursor = self.connection.execute(
+                _COLUMNS + " FROM history AS h ORDER BY h.id DESC")
+        elif self.fts:
+            # Каждое слово - префикс: "sel fro" находит SELECT ... FROM.
+            # CROSS JOIN оставляет FTS5 внешним циклом: он сам отдает rowid
+            # по убыванию, и первая порция не ждет сортировки всех совпадений
+            query = " ".join('"' + word + '"*' for word in words)
+            cursor = self.connection.execute(
+                _COLUMNS + " FROM history_fts AS f "
+                "CROSS JOIN history AS h ON h.id = f.rowid "
+                "WHERE history_fts MATCH ? ORDER BY f.rowid DESC", (query,))
+        else:
+            conditions = " AND ".join("h.sql LIKE ?" for _ in words)
+            cursor = self.connection.execute(
+                _COLUMNS + f" FROM history AS h WHERE {conditions} "
+                "ORDER BY h.id DESC", [f"%{word}%" for word in words])
+        return QueryResult(cursor, batch_size)
+
+    def clear(self):
+        """Удаление всей истории"""
+        with self._lock:
+            self._pending.clear()
+        with self.connection:
+            self.connection.execute("DELETE FROM history")
+
+    def close(self):
+        """Запись оставшихся запросов и остановка фонового потока"""
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.connection.close()
+
+
+def saved_statements(path, db_path=None, limit=None):
+    """
+    Тексты успешно выполненных запросов из файла истории, старые первыми
+    (для повторного выполнения). db_path - только запросы к этой БД,
+    limit - только столько последних запросов
+    """
+    connection = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro",
+                                 uri=True)
+    try:
+        query = "SELECT sql FROM history WHERE error IS NULL"
+        params = []
+        if db_path is not None:
+            query += " AND db_path = ?"
+            params.append(db_path)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        rows = connection.execute(query, params).fetchall()
+    finally:
+        connection.close()
+    return [row[0] for row in reversed(rows)]
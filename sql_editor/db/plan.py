@@ -0,0 +1,248 @@
+import re
+from sql_editor.db.schema import quote_identifier
+from sql_editor.utils.lexer import (
+    table_references, tokenize, unquote_identifier
+)
+
+# Строка плана с обращением к таблице: SCAN/SEARCH [TABLE] имя [AS псевдоним]
+_ACCESS_RE = re.compile(
+    r"^(?P<op>SCAN|SEARCH)(?: TABLE)? (?P<table>\S+)(?: AS (?P<alias>\S+))?")
+
+# Слова, которыми заканчиваются условия WHERE/ON и список ORDER BY
+_CLAUSE_END = frozenset((
+    "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT",
+    "WINDOW", "JOIN", "INNER", "LEFT", "RIGHT", "CROSS", "NATURAL", "WHERE",
+    "SELECT", "FROM",
+))
+
+# Операторы сравнения: равенство позволяет использовать следующие
+# столбцы индекса, диапазон - только последний
+_EQUALITY_OPS = frozenset(("=", "==", "IN", "IS"))
+_RANGE_OPS = frozenset(("<", ">", "<=", ">=", "BETWEEN", "LIKE", "GLOB"))
+
+# Слова списка ORDER BY, не являющиеся столбцами
+_ORDER_WORDS = frozenset(("ASC", "DESC", "NULLS", "FIRST", "LAST", "COLLATE"))
+
+
+class PlanNode:
+    """Строка EXPLAIN QUERY PLAN с дочерними строками"""
+
+    def __init__(self, node_id, parent_id, detail):
+        self.id = node_id
+        self.parent_id = parent_id
+        self.detail = detail
+        self.children = []
+        self.table = None
+        self.alias = None
+        self.index = None
+
+        match = _ACCESS_RE.match(detail)
+        if match:
+            self.table = match.group("table")
+            self.alias = match.group("alias")
+            index = re.search(r"USING (?:COVERING )?INDEX (\S+)", detail)
+            self.index = index.group(1) if index else None
+
+    @property
+    def full_scan(self):
+        """Полный просмотр таблицы без индекса"""
+        return (self.detail.startswith("SCAN ") and self.table is not None
+                and self.index is None and "CONSTANT ROW" not in self.detail)
+
+    @property
+    def temp_btree(self):
+        """Сортировка во временном B-дереве (ORDER BY, GROUP BY, DISTINCT)"""
+        return "TEMP B-TREE" in self.detail
+
+    @property
+    def warning(self):
+        if self.full_scan:
+            return "полный просмотр таблицы"
+        if self.temp_btree:
+            return "сортировка во временном B-дереве"
+        return None
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class IndexSuggestion:
+    """Предлагаемый индекс (existing - уже имеющийся индекс с теми же столбцами)"""
+
+    def __init__(self, table, columns, existing=None):
+        self.table = table
+        self.columns = columns
+        self.existing = existing
+
+    @property
+    def sql(self):
+        name = quote_identifier(f"idx_{self.table}_{'_'.join(self.columns)}")
+        columns = ", ".join(quote_identifier(c) for c in self.columns)
+        return (f"CREATE INDEX {name} ON "
+                f"{quote_identifier(self.table)} ({columns});")
+
+
+def build_plan(rows):
+    """Дерево плана из строк (id, parent, detail). Возвращает корневые узлы"""
+    nodes = {}
+    roots = []
+    for node_id, parent_id, detail in rows:
+        node = PlanNode(node_id, parent_id, detail)
+        nodes[node_id] = node
+        parent = nodes.get(parent_id)
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    return roots
+
+
+def clause_columns(sql):
+    """
+    Столбцы из условий WHERE/ON и списка ORDER BY.
+    Возвращает три списка пар (квалификатор или None, столбец):
+    сравнения на равенство, диапазонные сравнения и столбцы сортировки.
+    """
+    tokens, _ = tokenize(sql)
+    words = [(kind, sql[start:start + length]) for kind, start, length in tokens
+             if kind != "comment"]
+
+    equality, ranges, order = [], [], []
+    clause = None
+    i = 0
+    while i < len(words):
+        kind, text = words[i]
+        upper = text.upper()
+
+        if kind in ("keyword", "identifier") and upper in ("WHERE", "ON"):
+            clause = "where"
+        elif (upper == "ORDER" and i + 1 < len(words)
+              and words[i + 1][1].upper() == "BY"):
+            clause = "order"
+            i += 1
+        elif (kind in ("keyword", "identifier") and upper in _CLAUSE_END) \
+                or text == ";":
+            clause = None
+        elif clause and kind in ("identifier", "quoted"):
+            qualifier, column = None, unquote_identifier(text)
+            if (i + 2 < len(words) and words[i + 1][1] == "."
+                    and words[i + 2][0] in ("identifier", "quoted")):
+                qualifier, column = column, unquote_identifier(words[i + 2][1])
+                i += 2
+
+            following = words[i + 1][1] if i + 1 < len(words) else ""
+            if following == "(":
+                # Вызов функции, а не столбец
+                pass
+            elif clause == "order":
+                if column.upper() not in _ORDER_WORDS:
+                    order.append((qualifier, column))
+            else:
+                op = _operator(words, i + 1) or _operator_before(words, i)
+                if op in _EQUALITY_OPS:
+                    equality.append((qualifier, column))
+                elif op in _RANGE_OPS:
+                    ranges.append((qualifier, column))
+        i += 1
+
+    return equality, ranges, order
+
+
+def _operator(words, i):
+    """Оператор сравнения, начинающийся с позиции i (<= собирается из двух знаков)"""
+    if i >= len(words):
+        return None
+    kind, text = words[i]
+    if kind == "punct" and text in "=<>!":
+        if i + 1 < len(words) and words[i + 1][0] == "punct" \
+                and words[i + 1][1] in "=>":
+            text += words[i + 1][1]
+        return text
+    upper = text.upper()
+    following = words[i + 1][1].upper() if i + 1 < len(words) else ""
+    if upper == "NOT" or (upper == "IS" and following == "NOT"):
+        # NOT IN, NOT LIKE, IS NOT NULL индекс не используют
+        return None
+    return upper if upper in _EQUALITY_OPS | _RANGE_OPS else None
+
+
+def _operator_before(words, i):
+    """Оператор перед столбцом (5 = col, 10 < col)"""
+    if i == 0 or words[i - 1][0] != "punct":
+        return None
+    text = words[i - 1][1]
+    if i >= 2 and words[i - 2][0] == "punct" and words[i - 2][1] in "<>!=":
+        text = words[i - 2][1] + text
+    return text if text in _EQUALITY_OPS | _RANGE_OPS else None
+
+
+def _table_columns(refs, table, alias, known):
+    """Столбцы таблицы из списка ссылок (с учетом псевдонима)"""
+    names = {name.lower(): name for name in known}
+    qualifiers = {table.lower()} | ({alias.lower()} if alias else set())
+    result = []
+    for qualifier, column in refs:
+        if qualifier is not None and qualifier.lower() not in qualifiers:
+            continue
+        name = names.get(column.lower())
+        if name is not None and name not in result:
+            result.append(name)
+    return result
+
+
+def suggest_indexes(sql, roots, schema):
+    """
+    Индексы для таблиц, которые план просматривает целиком или сортирует
+    во временном B-дереве. Столбцы индекса: сначала сравнения на равенство,
+    затем столбцы сортировки или один диапазонный столбец.
+    """
+    schema.refresh()
+    tables = {name.lower(): name for name in schema.tables()}
+    references = table_references(sql)
+    equality, ranges, order = clause_columns(sql)
+    nodes = [node for root in roots for node in root.walk()]
+    needs_sort = any(node.temp_btree for node in nodes)
+
+    suggestions = []
+    for node in nodes:
+        if node.table is None:
+            continue
+        if not (node.full_scan or (needs_sort and node.index is None)):
+            continue
+        # Новые версии SQLite пишут в плане псевдоним вместо имени таблицы
+        name, alias = node.table, node.alias
+        if name.lower() in references:
+            name, alias = references[name.lower()], name
+        if name.lower() not in tables:
+            continue
+
+        table = tables[name.lower()]
+        known = schema.column_names(table)
+        columns = _table_columns(equality, table, alias, known)
+        order_columns = _table_columns(order, table, alias, known)
+        if needs_sort and order_columns and len(order_columns) == len(order):
+            columns += [c for c in order_columns if c not in columns]
+        else:
+            columns += [c for c in _table_columns(ranges, table, alias, known)
+                        if c not in columns][:1]
+        if not columns:
+            continue
+
+        suggestion = IndexSuggestion(table, columns, _existing_index(
+            schema, table, columns))
+        if all(s.sql != suggestion.sql for s in suggestions):
+            suggestions.append(suggestion)
+    return suggestions
+
+
+def _existing_index(schema, table, columns):
+    """Имя индекса таблицы, ключ которого начинается с указанных столбцов"""
+    wanted = [c.lower() for c in columns]
+    for row in schema.indexes(table):
+        name = row[1]
+        key = [c.lower() for c in schema.index_columns(name) if c is not None]
+        if key[:len(wanted)] == wanted:
+            return name
+    return None
@@ -0,0 +1,117 @@
+import threading
+
+# Наибольшее число соединений для чтения на одну БД
+DEFAULT_READERS = 4
+
+# Сколько секунд ждать освобождения читателя, если все заняты
+READER_WAIT = 5.0
+
+
+class ConnectionPool:
+    """
+    Соединения одной базы данных: одно для записи и до max_readers для чтения.
+    Читатели открываются по требованию и возвращаются в пул после
+    завершения выборки; без параллельного чтения (например, SQLite не
+    в режиме WAL) все запросы идут через соединение записи.
+    """
+
+    def __init__(self, backend, path, profile=None, max_readers=DEFAULT_READERS,
+                 cached_statements=None):
+        self.backend = backend
+        self.path = path
+        self.profile = profile
+        self.max_readers = max_readers
+        self.cached_statements = cached_statements
+        self.writer, self.errors = backend.connect(
+            path, profile, cached_statements)
+        self.parallel_reads = False
+        self._idle = []
+        self._busy = set()
+        self._opening = 0
+        self._lock = threading.Condition()
+        self.check_parallel_reads()
+
+    def check_parallel_reads(self):
+        """Повторная проверка режима (например, после смены journal_mode)"""
+        self.parallel_reads = (self.max_readers > 0
+                               and self.backend.parallel_reads(self.writer))
+        if not self.parallel_reads:
+            self.close_idle()
+        return self.parallel_reads
+
+    def acquire(self, timeout=0):
+        """
+        Соединение для чтения или None, если параллельное чтение недоступно
+        или за timeout секунд не освободился ни один читатель
+        """
+        if not self.parallel_reads:
+            return None
+        with self._lock:
+            while not self._idle and self._count() >= self.max_readers:
+                if not timeout or not self._lock.wait(timeout):
+                    return None
+            if self._idle:
+                connection = self._idle.pop()
+                self._busy.add(connection)
+                return connection
+            # Место занимается до открытия, чтобы не превысить max_readers
+            self._opening += 1
+        connection = None
+        try:
+            connection = self.backend.connect_reader(
+                self.path, self.profile, self.cached_statements)
+        finally:
+            with self._lock:
+                self._opening -= 1
+                if connection is not None:
+                    self._busy.add(connection)
+                else:
+                    self._lock.notify()
+        return connection
+
+    def release(self, connection):
+        """Возврат читателя в пул"""
+        with self._lock:
+            self._busy.discard(connection)
+            if self.parallel_reads:
+                self._idle.append(connection)
+                connection = None
+            self._lock.notify()
+        if connection is not None:
+            connection.close()
+
+    def _count(self):
+        return len(self._busy) + len(self._idle) + self._opening
+
+    def interrupt_readers(self):
+        """Прерывание запросов на всех занятых читателях"""
+        with self._lock:
+            busy = list(self._busy)
+        for connection in busy:
+            self.backend.interrupt(connection)
+
+    @property
+    def busy_readers(self):
+        return len(self._busy)
+
+    @property
+    def open_readers(self):
+        return len(self._busy) + len(self._idle)
+
+    def close_idle(self):
+        """Закрытие свободных читателей (занятые закроются при возврате)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def close(self):
+        """
+        Закрытие соединений. Занятые читатели закрываются при возврате
+        (их курсоры еще могут читаться)
+        """
+        self.parallel_reads = False
+        self.close_idle()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,205 @@
+import random
+import sqlite3
+from sql_editor.db.schema import column_affinity, quote_identifier, rowid_alias
+from sql_editor.utils.blobs import LAZY_SIZE, LazyValue
+
+# Строк в случайной выборке из таблицы
+SAMPLE_ROWS = 1000
+
+
+def _table_rowid(db, table):
+    """Имя rowid таблицы; ValueError для представлений и таблиц без rowid"""
+    db.schema.refresh()
+    if table not in db.schema.tables():
+        # У представления rowid не определен
+        raise ValueError(f"{table} - не таблица")
+    alias = rowid_alias(db.schema.column_names(table))
+    if alias is None:
+        raise ValueError(f"У таблицы {table} нет доступного rowid")
+    return alias
+
+
+class _LazyColumns:
+    """
+    Список выборки, в котором длинные значения столбцов TEXT и BLOB (кроме
+    первичного ключа) не читаются: вместо них приходит NULL и признак
+    "тип:длина", по которому строится LazyValue. length() и typeof() от
+    BLOB не читают само значение; длину текста SQLite считает по символам
+    """
+
+    def __init__(self, db, table, alias, headers, size=LAZY_SIZE):
+        self.db = db
+        self.table = table
+        self.headers = headers
+        declared = {column[1]: column for column in db.schema.columns(table)}
+        # Столбцы без объявления (например, вычисляемые) читаются как есть
+        self.lazy = [
+            i for i, name in enumerate(headers)
+            if name in declared and not declared[name][5]
+            and column_affinity(declared[name][2]) in ("TEXT", "BLOB")]
+
+        names = [quote_identifier(name) for name in headers]
+        select = [alias]
+        for i, name in enumerate(names):
+            if i in self.lazy:
+                select.append(f"CASE WHEN length({name}) > {size} THEN NULL "
+                              f"ELSE {name} END")
+            else:
+                select.append(name)
+        for i in self.lazy:
+            name = names[i]
+            select.append(f"CASE WHEN length({name}) > {size} THEN "
+                          f"typeof({name}) || ':' || length({name}) END")
+        self.select = ", ".join(select)
+
+    def rows(self, rows):
+        """Строки выборки без rowid, с LazyValue вместо длинных значений"""
+        width = len(self.headers) + 1
+        if not self.lazy:
+            return [row[1:width] for row in rows]
+        result = []
+        for row in rows:
+            markers = row[width:]
+            if not any(markers):
+                result.append(row[1:width])
+                continue
+            values = list(row[1:width])
+            for i, marker in zip(self.lazy, markers):
+                if marker:
+                    kind, _, size = marker.partition(":")
+                    values[i] = LazyValue(self.db, self.table, self.headers[i],
+                                          row[0], kind, int(size))
+            result.append(tuple(values))
+        return result
+
+
+class TablePreview:
+    """
+    Постраничный просмотр таблицы по rowid (keyset): каждая порция -
+    отдельный короткий запрос WHERE rowid > последний ORDER BY rowid LIMIT n,
+    поэтому порция из середины большой таблицы читается так же быстро,
+    как первая (в отличие от OFFSET), и между порциями не держится
+    открытая транзакция чтения. Длинные значения TEXT и BLOB приходят
+    заглушками LazyValue и читаются по требованию.
+    Интерфейс источника строк тот же, что у QueryResult.
+    """
+
+    def __init__(self, db, table, batch_size):
+        self.db = db
+        self.table = table
+        self.batch_size = batch_size
+        self.profile = None
+        self.from_cache = False
+        self.exhausted = False
+        self._last = None
+        self._alias = _table_rowid(db, table)
+        with db.reading() as connection:
+            try:
+                cursor = connection.execute(
+                    f"SELECT {self._alias}, * FROM {quote_identifier(table)} "
+                    f"LIMIT 0")
+            except sqlite3.OperationalError:
+                # Таблица WITHOUT ROWID
+                raise ValueError(
+                    f"У таблицы {table} нет rowid") from None
+            self.headers = [desc[0] for desc in cursor.description[1:]]
+        self._columns = _LazyColumns(db, table, self._alias, self.headers)
+        # rowid полученных строк по порядку - скрытый столбец ключа, по
+        # которому правятся строки таблицы без первичного ключа
+        self.key_columns = [self._alias]
+        self.keys = []
+
+    def fetch(self, count=None):
+        """Следующая порция строк (пустой список, если строк больше нет)"""
+        if self.exhausted:
+            return []
+        count = count or self.batch_size
+        alias = self._alias
+        sql = (f"SELECT {self._columns.select} "
+               f"FROM {quote_identifier(self.table)}")
+        params = (count,)
+        if self._last is not None:
+            sql += f" WHERE {alias} > ?"
+            params = (self._last, count)
+        sql += f" ORDER BY {alias} LIMIT ?"
+
+        with self.db.reading() as connection:
+            page = connection.execute(sql, params).fetchall()
+        if len(page) < count:
+            self.exhausted = True
+        if page:
+            self._last = page[-1][0]
+            self.keys.extend((row[0],) for row in page)
+        return self._columns.rows(page)
+
+    def fetch_all(self):
+        """Все оставшиеся строки"""
+        rows = []
+        while not self.exhausted:
+            rows.extend(self.fetch())
+        return rows
+
+    def batches(self):
+        while not self.exhausted:
+            batch = self.fetch()
+            if batch:
+                yield batch
+
+    def close(self):
+        self.exhausted = True
+
+
+def sample_rows(db, table, count=SAMPLE_ROWS):
+    """
+    Случайная выборка около count строк таблицы: (заголовки, строки).
+    Вместо ORDER BY random() (полный просмотр) строки находятся поиском
+    по случайным значениям rowid между наименьшим и наибольшим, так что
+    выборка стоит count обращений к индексу rowid (совпавшие значения
+    дают одну строку, поэтому строк бывает чуть меньше count). Строки после
+    пропусков в нумерации rowid попадают в выборку чаще остальных.
+    """
+    alias = _table_rowid(db, table)
+    name = quote_identifier(table)
+    with db.reading() as connection:
+        try:
+            cursor = connection.execute(
+                f"SELECT {alias}, * FROM {name} LIMIT 0")
+        except sqlite3.OperationalError:
+            raise ValueError(f"У таблицы {table} нет rowid") from None
+        headers = [desc[0] for desc in cursor.description[1:]]
+    # Структура читается отдельно: вложенный reading() может ждать
+    # свободного читателя пула
+    columns = _LazyColumns(db, table, alias, headers)
+
+    with db.reading() as connection:
+        # min() и max() в одном SELECT дают полный просмотр таблицы,
+        # а по отдельности - по одному обращению к краю индекса
+        low, high = connection.execute(
+            f"SELECT (SELECT min({alias}) FROM {name}), "
+            f"(SELECT max({alias}) FROM {name})").fetchone()
+        if low is None:
+            return headers, []
+
+        if high - low + 1 <= count * 2:
+            # Небольшая таблица: выборка из всех строк
+            rows = connection.execute(
+                f"SELECT {columns.select} FROM {name}").fetchall()
+            rows = random.sample(rows, min(count, len(rows)))
+        else:
+            # Случайные значения rowid порождаются в самом запросе, и для
+            # каждого берется ближайшая строка не меньше его. Во вложенном
+            # запросе имена уточнены: столбцы таблицы с именами n и r иначе
+            # заслонили бы столбцы sample_targets
+            rows = connection.execute(
+                f"WITH RECURSIVE sample_targets(n, r) AS (SELECT 0, NULL "
+                f"UNION ALL SELECT n + 1, ? + abs(random() % ?) "
+                f"FROM sample_targets WHERE n < ?) "
+                f"SELECT {columns.select} FROM {name} WHERE {alias} IN ("
+                f"SELECT (SELECT sample.{alias} FROM {name} AS sample "
+                f"WHERE sample.{alias} >= sample_targets.r "
+                f"ORDER BY sample.{alias} LIMIT 1) "
+                f"FROM sample_targets WHERE sample_targets.n > 0)",
+                (low, high - low + 1, count)).fetchall()
+
+    rows.sort(key=lambda row: row[0])
+    return headers, columns.rows(rows)
@@ -0,0 +1,119 @@
+import time
+from collections import deque
+from datetime import datetime
+
+# Сколько последних запросов хранится в истории профилировщика
+PROFILE_HISTORY = 500
+
+
+class QueryProfile:
+    """
+    Измерения одного запроса.
+    Подготовка - от вызова execute до начала выполнения оператора (момент
+    вызова trace callback SQLite), выполнение - до возврата из execute
+    (первый шаг VM), выборка - суммарное время fetchmany/fetchall.
+    """
+
+    def __init__(self, sql, params=None):
+        self.sql = sql
+        self.params = params
+        self.started_at = time.time()
+        self.prepare_time = 0.0
+        self.step_time = 0.0
+        self.fetch_time = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.vm_steps = 0
+        # Операторы, о которых сообщил trace callback (включая триггеры)
+        self.statements = []
+        self.from_cache = False
+        self.error = None
+        self.finished = False
+        # Идет вызов execute (время выполнения еще неизвестно)
+        self.executing = False
+        self._begin = None
+        self._traced_at = None
+
+    def begin(self):
+        """Начало вызова execute"""
+        self.executing = True
+        self._begin = time.perf_counter()
+
+    def traced(self, statement):
+        """Вызов trace callback: SQLite начинает выполнять оператор"""
+        if self._traced_at is None:
+            self._traced_at = time.perf_counter()
+        self.statements.append(statement)
+
+    def executed(self):
+        """Возврат из execute: делим время на подготовку и выполнение"""
+        if self._begin is None:
+            return
+        now = time.perf_counter()
+        traced_at = self._traced_at or now
+        self.prepare_time = traced_at - self._begin
+        self.step_time = now - traced_at
+        self._begin = None
+        self.executing = False
+
+    def add_fetch(self, rows, size, elapsed):
+        self.rows += rows
+        self.bytes += size
+        self.fetch_time += elapsed
+
+    @property
+    def wall_time(self):
+        return self.prepare_time + self.step_time + self.fetch_time
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.wall_time if self.wall_time > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "sql": self.sql,
+            "params": self.params,
+            "started_at": datetime.fromtimestamp(
+                self.started_at).isoformat(timespec="milliseconds"),
+            "wall_ms": round(self.wall_time * 1000, 3),
+            "prepare_ms": round(self.prepare_time * 1000, 3),
+            "step_ms": round(self.step_time * 1000, 3),
+            "fetch_ms": round(self.fetch_time * 1000, 3),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows_per_sec, 1),
+            "bytes": self.bytes,
+            "vm_steps": self.vm_steps,
+            "from_cache": self.from_cache,
+            "finished": self.finished,
+            "error": self.error,
+            "statements": self.statements,
+        }
+
+
+class ProfileHistory:
+    """История профилей последних запросов (самые старые вытесняются)"""
+
+    def __init__(self, size=PROFILE_HISTORY):
+        self._profiles = deque(maxlen=size)
+
+    def add(self, profile):
+        self._profiles.append(profile)
+
+    def clear(self):
+        self._profiles.clear()
+
+    def __iter__(self):
+        return iter(list(self._profiles))
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def to_json(self):
+        # json импортируется при экспорте, а не при запуске редактора
+        import json
+        return json.dumps([profile.to_dict() for profile in self],
+                          ensure_ascii=False, indent=4, default=str)
+
+    def export_json(self, filename):
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
@@ -0,0 +1,110 @@
+import re
+import sqlite3
+from pathlib import Path
+
+# PRAGMA, которые профиль применяет при подключении (в этом порядке:
+# busy_timeout нужен раньше journal_mode, который может ждать блокировку)
+PROFILE_PRAGMAS = ("busy_timeout", "journal_mode", "synchronous",
+                   "cache_size", "mmap_size", "temp_store")
+
+# PRAGMA, показываемые в диалоге действующих настроек
+EFFECTIVE_PRAGMAS = PROFILE_PRAGMAS + (
+    "page_size", "page_count", "locking_mode", "query_only")
+
+# Допустимые значения перечислимых PRAGMA
+SYNCHRONOUS_MODES = ["OFF", "NORMAL", "FULL", "EXTRA"]
+JOURNAL_MODES = ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]
+TEMP_STORE_MODES = ["DEFAULT", "FILE", "MEMORY"]
+
+# Допустимые значения PRAGMA в профиле: число или слово (WAL, MEMORY, ...)
+_VALUE_RE = re.compile(r"-?\d+|[A-Za-z]+")
+
+# Готовые наборы настроек
+PROFILE_PRESETS = {
+    "По умолчанию": {},
+    "Аналитика (чтение)": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,      # 256 МБ
+        "mmap_size": 1073741824,    # 1 ГБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "Запись (WAL)": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,       # 64 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def new_profile(pragmas=None, read_only=False, immutable=False):
+    """Профиль соединения: PRAGMA и режим открытия файла"""
+    return {
+        "pragmas": dict(pragmas or {}),
+        "read_only": read_only,
+        "immutable": immutable,
+    }
+
+
+def normalize_profile(data):
+    """Профиль из сохраненных данных (неизвестные ключи отбрасываются)"""
+    if not isinstance(data, dict):
+        data = {}
+    pragmas = data.get("pragmas")
+    if not isinstance(pragmas, dict):
+        pragmas = {}
+    pragmas = {name: value for name, value in pragmas.items()
+               if name in PROFILE_PRAGMAS and value is not None}
+    return new_profile(pragmas, bool(data.get("read_only")),
+                       bool(data.get("immutable")))
+
+
+def load_profiles(text):
+    """Профили по путям к БД из JSON (некорректный текст - пустой словарь)"""
+    # json не нужен для первой отрисовки окна - импортируется при чтении
+    import json
+    try:
+        data = json.loads(text) if text else {}
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {path: normalize_profile(profile) for path, profile in data.items()}
+
+
+def dump_profiles(profiles):
+    import json
+    return json.dumps(profiles, ensure_ascii=False, sort_keys=True)
+
+
+def connection_target(path, profile):
+    """Имя базы для sqlite3.connect и признак URI (режим только для чтения)"""
+    if not profile or not (profile.get("read_only") or profile.get("immutable")):
+        return path, False
+
+    params = ["mode=ro"]
+    if profile.get("immutable"):
+        # Файл гарантированно не меняется - SQLite не берет блокировки
+        params.append("immutable=1")
+    return f"{Path(path).resolve().as_uri()}?{'&'.join(params)}", True
+
+
+def apply_profile(connection, profile):
+    """Применение PRAGMA профиля. Возвращает словарь ошибок по именам PRAGMA"""
+    errors = {}
+    pragmas = (profile or {}).get("pragmas", {})
+    for name in PROFILE_PRAGMAS:
+        value = pragmas.get(name)
+        if value is None:
+            continue
+        if not _VALUE_RE.fullmatch(str(value)):
+            errors[name] = f"Недопустимое значение: {value}"
+            continue
+        try:
+            connection.execute(f"PRAGMA {name} = {value}")
+        except sqlite3.Error as e:
+            errors[name] = str(e)
+    return errors
@@ -0,0 +1,220 @@
+import sqlite3
+
+# Виды объектов sqlite_master в порядке отображения
+OBJECT_TYPES = ("table", "view", "index", "trigger")
+
+# Имена, под которыми SQLite доступен rowid (если их не занял столбец)
+ROWID_ALIASES = ("rowid", "_rowid_", "oid")
+
+
+def quote_identifier(name):
+    """Экранирование имени объекта для подстановки в SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def rowid_alias(column_names):
+    """Имя для обращения к rowid таблицы или None, если все заняты столбцами"""
+    taken = {name.lower() for name in column_names}
+    for alias in ROWID_ALIASES:
+        if alias not in taken:
+            return alias
+    return None
+
+
+def column_affinity(declared_type):
+    """Тип хранения столбца по объявленному типу (правила SQLite)"""
+    declared = (declared_type or "").upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if any(word in declared for word in ("CHAR", "CLOB", "TEXT")):
+        return "TEXT"
+    if "BLOB" in declared or not declared:
+        return "BLOB"
+    if any(word in declared for word in ("REAL", "FLOA", "DOUB")):
+        return "REAL"
+    return "NUMERIC"
+
+
+class SchemaCache:
+    """
+    Кэш структуры базы данных.
+    Список объектов перечитывается только при изменении PRAGMA schema_version,
+    столбцы и индексы таблиц загружаются лениво при первом обращении.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.version = None
+        self._objects = {kind: [] for kind in OBJECT_TYPES}
+        self._columns = {}
+        self._indexes = {}
+        self._index_columns = {}
+        # Оценки числа строк таблиц: имя -> (число, источник) или None.
+        # Действуют, пока не изменились данные (см. _data_key)
+        self._row_estimates = {}
+        self._estimates_key = None
+        # Счетчик сбросов оценок, которые не видны в data_version и
+        # total_changes (ANALYZE этим соединением)
+        self._estimates_generation = 0
+
+    def reset(self):
+        """Сброс кэша (например, при смене базы данных)"""
+        self.version = None
+        self._objects = {kind: [] for kind in OBJECT_TYPES}
+        self._columns.clear()
+        self._indexes.clear()
+        self._index_columns.clear()
+        self._row_estimates.clear()
+        self._estimates_key = None
+
+    def refresh(self):
+        """Перечитывание структуры, если она изменилась. Возвращает True при изменении"""
+        if not self.db.connection:
+            changed = self.version is not None
+            self.reset()
+            return changed
+
+        try:
+            with self.db.reading() as connection:
+                version = connection.execute(
+                    "PRAGMA schema_version").fetchone()[0]
+                if version == self.version:
+                    return False
+
+                rows = connection.execute(
+                    "SELECT type, name, tbl_name FROM sqlite_master "
+                    "WHERE type IN ('table', 'view', 'index', 'trigger') "
+                    "ORDER BY name"
+                ).fetchall()
+        except sqlite3.Error:
+            self.reset()
+            return True
+
+        self.reset()
+        self.version = version
+        for kind, name, table in rows:
+            self._objects[kind].append((name, table))
+        return True
+
+    def names(self, kind):
+        """Имена объектов указанного вида"""
+        return [name for name, _ in self._objects[kind]]
+
+    def tables(self):
+        return self.names("table")
+
+    def views(self):
+        return self.names("view")
+
+    def objects(self, kind):
+        """Пары (имя объекта, имя таблицы) указанного вида"""
+        return list(self._objects[kind])
+
+    def columns(self, table):
+        """Столбцы таблицы или представления: (cid, name, type, notnull, default, pk)"""
+        if table not in self._columns:
+            self._columns[table] = self._pragma("table_info", table)
+        return self._columns[table]
+
+    def column_names(self, table):
+        return [column[1] for column in self.columns(table)]
+
+    def indexes(self, table):
+        """Индексы таблицы: (seq, name, unique, origin, partial)"""
+        if table not in self._indexes:
+            self._indexes[table] = self._pragma("index_list", table)
+        return self._indexes[table]
+
+    def index_columns(self, index):
+        """Имена столбцов индекса в порядке ключа"""
+        if index not in self._index_columns:
+            rows = self._pragma("index_info", index)
+            self._index_columns[index] = [row[2] for row in rows]
+        return self._index_columns[index]
+
+    def row_estimates(self, tables):
+        """
+        Приблизительное число строк таблиц без COUNT(*): по статистике
+        sqlite_stat1 (после ANALYZE), иначе по max(rowid) - одно обращение
+        к индексу rowid, точное, пока строки только добавлялись.
+        Возвращает {таблица: (число, "stat1" | "rowid")}; таблиц без оценки
+        (WITHOUT ROWID без статистики) в словаре нет
+        """
+        key = self._data_key()
+        if key != self._estimates_key:
+            self._row_estimates.clear()
+            self._estimates_key = key
+        missing = [table for table in tables if table not in self._row_estimates]
+        if missing and self.db.connection:
+            # Столбцы читаются до запросов оценки: свое соединение чтения
+            aliases = {table: rowid_alias(self.column_names(table))
+                       for table in missing}
+            try:
+                with self.db.reading() as connection:
+                    self._estimate(connection, aliases)
+            except sqlite3.Error:
+                pass
+        return {table: self._row_estimates[table] for table in tables
+                if self._row_estimates.get(table) is not None}
+
+    def estimates_stale(self):
+        """Полученные оценки числа строк устарели (данные изменились)"""
+        return (self._estimates_key is not None
+                and self._estimates_key != self._data_key())
+
+    def invalidate_estimates(self):
+        """Сброс оценок после изменения, не видного в счетчиках (ANALYZE)"""
+        self._estimates_generation += 1
+
+    def _data_key(self):
+        """
+        Версия данных для оценок, как у кэша результатов: data_version
+        меняется при фиксации изменений другими соединениями,
+        total_changes - при изменениях этим соединением
+        """
+        connection = self.db.connection
+        if connection is None:
+            return None
+        try:
+            data_version = connection.execute(
+                "PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+        return (data_version, connection.total_changes,
+                self._estimates_generation)
+
+    def _estimate(self, connection, aliases):
+        stats = {}
+        if "sqlite_stat1" in self.names("table"):
+            # Первое число stat - строк в таблице; у таблицы без индексов
+            # одна строка статистики с idx IS NULL
+            for table, stat in connection.execute(
+                    "SELECT tbl, stat FROM sqlite_stat1"):
+                count = (stat or "").split(" ", 1)[0]
+                if count.isdigit():
+                    stats[table] = int(count)
+
+        for table, alias in aliases.items():
+            estimate = None
+            if table in stats:
+                estimate = (stats[table], "stat1")
+            elif alias is not None:
+                try:
+                    count = connection.execute(
+                        f"SELECT max({alias}) FROM {quote_identifier(table)}"
+                    ).fetchone()[0]
+                    estimate = (max(count or 0, 0), "rowid")
+                except sqlite3.OperationalError:
+                    # Таблица WITHOUT ROWID
+                    pass
+            self._row_estimates[table] = estimate
+
+    def _pragma(self, pragma, name):
+        if not self.db.connection:
+            return []
+        try:
+            with self.db.reading() as connection:
+                return connection.execute(
+                    f"PRAGMA {pragma}({quote_identifier(name)})").fetchall()
+        except sqlite3.Error:
+            return []
@@ -0,0 +1,329 @@
+"""
+Нагрузочное повторение запросов: N потоков (или процессов) чтения и
+M потоков записи выполняют операторы из файла или из истории запросов
+на копии БД с заданной частотой. По каждому режиму журнала - пропускная
+способность, задержки p50/p95/p99, число SQLITE_BUSY и время ожидания
+блокировок.
+
+Модуль не импортирует PyQt6 и используется командой python -m sql_editor load.
+"""
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sql_editor.db.connection import (
+    CACHEABLE_KEYWORDS, NO_WRAP_KEYWORDS, DatabaseManager
+)
+from sql_editor.db.profiles import connection_target, new_profile
+from sql_editor.utils.lexer import first_keyword
+from sql_editor.utils.params import parameter_names
+
+# Режимы журнала, сравниваемые по умолчанию
+DEFAULT_JOURNAL_MODES = ("WAL", "DELETE")
+
+DEFAULT_READERS = 4
+DEFAULT_WRITERS = 1
+DEFAULT_DURATION = 10.0
+
+# Сколько последних запросов берется из истории
+DEFAULT_HISTORY_LIMIT = 1000
+
+# Сколько ждать освобождения блокировки (мс), прежде чем считать
+# оператор неудавшимся
+DEFAULT_BUSY_LIMIT = 5000
+
+# Паузы между повторами оператора после SQLITE_BUSY (мс) - те же, что
+# у обработчика busy_timeout в самом SQLite. Повтор выполняется здесь,
+# а не внутри SQLite (busy_timeout = 0), чтобы посчитать ожидания
+BUSY_DELAYS = (1, 2, 5, 10, 15, 20, 25, 25, 25, 50, 50, 100)
+
+# Операторы, которые не повторяются: управление транзакциями (каждый
+# оператор выполняется в своей транзакции), настройки и служебные команды
+SKIPPED_KEYWORDS = NO_WRAP_KEYWORDS | {"PRAGMA", "EXPLAIN", "ATTACH", "DETACH"}
+
+# Процентили задержки в отчете
+PERCENTILES = (50, 95, 99)
+
+# Сколько разных сообщений об ошибках сохраняется в отчете по роли
+MAX_ERROR_MESSAGES = 10
+
+# Запас времени на запуск рабочих процессов перед общим стартом (с)
+PROCESS_START_DELAY = 2.0
+THREAD_START_DELAY = 0.05
+
+
+def split_workload(statements):
+    """
+    Разделение операторов на выборки и изменения.
+    Возвращает (выборки, изменения, число пропущенных): пропускаются
+    операторы из SKIPPED_KEYWORDS и операторы с параметрами (значения
+    параметров в истории не сохраняются)
+    """
+    reads, writes = [], []
+    skipped = 0
+    for sql in statements:
+        keyword = first_keyword(sql)
+        if not keyword or keyword in SKIPPED_KEYWORDS \
+                or parameter_names(sql)[0]:
+            skipped += 1
+        elif keyword in CACHEABLE_KEYWORDS:
+            reads.append(sql)
+        else:
+            writes.append(sql)
+    return reads, writes, skipped
+
+
+def percentile(values, percent):
+    """Процентиль по упорядоченному списку (ближайший ранг)"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+def is_busy(error):
+    """Ошибка SQLITE_BUSY (в том числе расширенные коды BUSY_*)"""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xff == sqlite3.SQLITE_BUSY
+    # Python до 3.11 не сообщает код ошибки
+    return "database is locked" in str(error)
+
+
+def _execute(db, sql, stats, busy_limit):
+    """
+    Выполнение оператора с повтором после SQLITE_BUSY.
+    Пауза и повтор - как у busy_timeout, но с учетом числа и времени ожиданий
+    """
+    attempt = 0
+    waited = 0.0
+    while True:
+        try:
+            db.execute_query(sql)
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            stats["busy"] += 1
+            if waited * 1000 >= busy_limit:
+                stats["busy_timeouts"] += 1
+                raise
+            delay = BUSY_DELAYS[min(attempt, len(BUSY_DELAYS) - 1)] / 1000
+            started = time.perf_counter()
+            time.sleep(delay)
+            slept = time.perf_counter() - started
+            waited += slept
+            stats["lock_wait"] += slept
+            attempt += 1
+
+
+def run_worker(role, path, profile, statements, rate, start_at, duration,
+               busy_limit, offset=0):
+    """
+    Один поток или процесс нагрузки: свое соединение, операторы по кругу
+    начиная с offset. rate - операторов в секунду (0 - без ограничения).
+    При заданной частоте задержка считается от запланированного момента
+    запуска, так что в нее входит и ожидание, если поток не успевает.
+    Возвращает словарь с задержками (с) и счетчиками
+    """
+    db = DatabaseManager()
+    # Одно соединение на поток: выборки не уходят в пул, результаты не кэшируются
+    db.max_readers = 0
+    db.result_cache.max_bytes = 0
+    db.connect(path, profile)
+    stats = {"role": role, "latencies": [], "errors": Counter(), "busy": 0,
+             "busy_timeouts": 0, "lock_wait": 0.0}
+    interval = 1 / rate if rate else 0.0
+    try:
+        delay = start_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.perf_counter()
+        finish = started + duration
+        count = 0
+        while True:
+            now = time.perf_counter()
+            if interval:
+                scheduled = started + count * interval
+                if scheduled >= finish:
+                    break
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+            elif now >= finish:
+                break
+            else:
+                scheduled = now
+
+            sql = statements[(offset + count) % len(statements)]
+            count += 1
+            try:
+                _execute(db, sql, stats, busy_limit)
+            except sqlite3.Error as e:
+                stats["errors"][str(e)] += 1
+                continue
+            stats["latencies"].append(time.perf_counter() - scheduled)
+        stats["elapsed"] = time.perf_counter() - started
+    finally:
+        db.close()
+    return stats
+
+
+def copy_database(source, target, journal_mode):
+    """
+    Копия БД для замера (backup API) с заданным режимом журнала.
+    ValueError, если режим не удалось установить
+    """
+    database, uri = connection_target(source, new_profile(read_only=True))
+    connection = sqlite3.connect(database, uri=uri)
+    try:
+        copy = sqlite3.connect(target)
+        try:
+            connection.backup(copy)
+            mode = copy.execute(
+                f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+        finally:
+            copy.close()
+    finally:
+        connection.close()
+    if str(mode).upper() != journal_mode.upper():
+        raise ValueError(f"Режим журнала {journal_mode} не установлен "
+                         f"(действует {mode})")
+
+
+def summarize(results, elapsed):
+    """Итог роли по результатам ее потоков"""
+    latencies = sorted(latency for item in results
+                       for latency in item["latencies"])
+    errors = Counter()
+    for item in results:
+        errors.update(item["errors"])
+    summary = {
+        "operations": len(latencies),
+        "errors": sum(errors.values()),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": (round(sum(latencies) / len(latencies) * 1000, 3)
+                     if latencies else None),
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+        "busy": sum(item["busy"] for item in results),
+        "busy_timeouts": sum(item["busy_timeouts"] for item in results),
+        "lock_wait_seconds": round(
+            sum(item["lock_wait"] for item in results), 4),
+        "error_messages": dict(errors.most_common(MAX_ERROR_MESSAGES)),
+    }
+    for percent in PERCENTILES:
+        value = percentile(latencies, percent)
+        summary["latency_ms"][f"p{percent}"] = (
+            round(value * 1000, 3) if value is not None else None)
+    return summary
+
+
+def run_workload(path, reads, writes, readers=DEFAULT_READERS,
+                 writers=DEFAULT_WRITERS, read_rate=0, write_rate=0,
+                 duration=DEFAULT_DURATION, journal_modes=DEFAULT_JOURNAL_MODES,
+                 processes=False, busy_limit=DEFAULT_BUSY_LIMIT, pragmas=None,
+                 log=None):
+    """
+    Нагрузочный замер для каждого режима журнала на отдельной копии БД
+    (исходный файл не изменяется). read_rate и write_rate - общая частота
+    операторов роли в секунду, делится между ее потоками (0 - без
+    ограничения). pragmas - дополнительные PRAGMA профиля соединения.
+    Возвращает словарь для JSON: окружение, параметры и итоги по режимам
+    """
+    if readers < 0 or writers < 0 or readers + writers == 0:
+        raise ValueError("Нужен хотя бы один поток чтения или записи")
+    if readers and not reads:
+        raise ValueError("Для потоков чтения нет выборок")
+    if writers and not writes:
+        raise ValueError("Для потоков записи нет изменяющих операторов")
+    log = log or (lambda message: None)
+
+    roles = [("reads", reads, read_rate / readers if read_rate else 0)
+             for _ in range(readers)]
+    roles += [("writes", writes, write_rate / writers if write_rate else 0)
+              for _ in range(writers)]
+    if processes:
+        # spawn: рабочие процессы не наследуют открытые соединения
+        executor = ProcessPoolExecutor(
+            len(roles), multiprocessing.get_context("spawn"))
+        start_delay = PROCESS_START_DELAY
+    else:
+        executor = ThreadPoolExecutor(len(roles))
+        start_delay = THREAD_START_DELAY
+
+    modes = {}
+    directory = tempfile.mkdtemp(prefix="sql_editor_load_")
+    try:
+        for mode in journal_modes:
+            target = os.path.join(directory, f"{mode.lower()}.db")
+            copy_database(path, target, mode)
+            profile = new_profile(dict(pragmas or {}, journal_mode=mode,
+                                       busy_timeout=0))
+            log(f"{mode}: потоков чтения {readers}, записи {writers}, "
+                f"{duration:g} с...")
+            start_at = time.time() + start_delay
+            # Потоки начинают с разных операторов, а не выполняют их в ногу
+            futures = [
+                executor.submit(run_worker, role, target, profile, statements,
+                                rate, start_at, duration, busy_limit, i)
+                for i, (role, statements, rate) in enumerate(roles)]
+            results = [future.result() for future in futures]
+            elapsed = max(item["elapsed"] for item in results)
+            modes[mode] = {"elapsed": round(elapsed, 3)}
+            for role in ("reads", "writes"):
+                items = [item for item in results if item["role"] == role]
+                if items:
+                    modes[mode][role] = summarize(items, elapsed)
+            log(describe_mode(mode, modes[mode]))
+    finally:
+        executor.shutdown(cancel_futures=True)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "workload": {
+            "database": os.path.abspath(path),
+            "reads": len(reads),
+            "writes": len(writes),
+            "readers": readers,
+            "writers": writers,
+            "read_rate": read_rate,
+            "write_rate": write_rate,
+            "duration": duration,
+            "workers": "processes" if processes else "threads",
+            "busy_limit_ms": busy_limit,
+            "pragmas": dict(pragmas or {}),
+        },
+        "journal_modes": modes,
+    }
+
+
+def describe_mode(mode, result):
+    """Строка итога режима журнала для вывода в stderr"""
+    parts = []
+    for role, title in (("reads", "чтение"), ("writes", "запись")):
+        item = result.get(role)
+        if item is None:
+            continue
+        latency = item["latency_ms"]
+        percentiles = ", ".join(
+            f"p{percent} {latency[f'p{percent}']} мс" for percent in PERCENTILES
+        ) if item["operations"] else "нет выполненных операторов"
+        parts.append(
+            f"{title}: {item['throughput']} оп/с, {percentiles}, "
+            f"BUSY {item['busy']}, ожидание блокировок "
+            f"{item['lock_wait_seconds']} с, ошибок {item['errors']}")
+    return f"{mode} — " + "; ".join(parts)
@@ -0,0 +1,146 @@
+import codecs
+import sqlite3
+from PyQt6.QtWidgets import (
+    QDialog, QFileDialog, QHBoxLayout, QLabel, QMessageBox, QPlainTextEdit,
+    QPushButton, QScrollArea, QTabWidget, QVBoxLayout
+)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontDatabase, QPixmap
+from sql_editor.utils.blobs import (
+    CHUNK_SIZE, LazyValue, format_hex, format_size, read_range, value_chunks,
+    value_length
+)
+
+# Изображения больше этого размера не загружаются для просмотра
+IMAGE_LIMIT = 32 * 1024 * 1024
+
+# Начальные байты форматов, которые открываются на вкладке изображения
+IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a",
+                    b"GIF89a", b"BM")
+
+
+def is_image(data):
+    """Начало значения похоже на изображение (PNG, JPEG, GIF, BMP, WEBP)"""
+    data = bytes(data[:12])
+    return data.startswith(IMAGE_SIGNATURES) or (
+        data[:4] == b"RIFF" and data[8:12] == b"WEBP")
+
+
+class BlobViewer(QDialog):
+    """
+    Просмотр длинного значения ячейки: шестнадцатеричный дамп, текст
+    и изображение. Значение читается частями по CHUNK_SIZE байт - большой
+    BLOB не загружается в память целиком (кроме просмотра изображения).
+    """
+
+    def __init__(self, value, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Значение: {title}")
+        self.resize(760, 520)
+        self.value = value
+        self.offset = 0
+        self.total = value_length(value)
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.image_loaded = False
+
+        font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        self.hex_edit = QPlainTextEdit(readOnly=True)
+        self.hex_edit.setFont(font)
+        self.hex_edit.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_edit = QPlainTextEdit(readOnly=True)
+        self.text_edit.setFont(font)
+        self.image_label = QLabel(alignment=Qt.AlignmentFlag.AlignCenter)
+        image_area = QScrollArea()
+        image_area.setWidgetResizable(True)
+        image_area.setWidget(self.image_label)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.hex_edit, "HEX")
+        self.tabs.addTab(self.text_edit, "Текст")
+        self.tabs.addTab(image_area, "Изображение")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        self.info_label = QLabel()
+        self.btn_more = QPushButton("Загрузить еще")
+        self.btn_more.clicked.connect(self.load_more)
+        self.btn_save = QPushButton("Сохранить в файл...")
+        self.btn_save.clicked.connect(self.on_save_clicked)
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.accept)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.info_label, 1)
+        buttons.addWidget(self.btn_more)
+        buttons.addWidget(self.btn_save)
+        buttons.addWidget(btn_close)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.tabs)
+        layout.addLayout(buttons)
+
+        first = self.load_more()
+        if isinstance(value, str) or (isinstance(value, LazyValue)
+                                      and value.is_text):
+            self.tabs.setCurrentIndex(1)
+        elif first is not None and is_image(first):
+            self.tabs.setCurrentIndex(2)
+
+    def load_more(self):
+        """Следующая часть значения на вкладки HEX и текста"""
+        try:
+            data = read_range(self.value, self.offset, CHUNK_SIZE)
+        except sqlite3.Error as e:
+            # Строку могли удалить или изменить после выборки
+            QMessageBox.critical(self, "Ошибка",
+                                 f"Не удалось прочитать значение:\n{e}")
+            return None
+        if data:
+            self.hex_edit.appendPlainText(format_hex(data, self.offset))
+            self.offset += len(data)
+        final = not data or self.offset >= self.total
+        self.text_edit.insertPlainText(self.decoder.decode(data, final=final))
+        self.update_info()
+        return data
+
+    def update_info(self):
+        self.info_label.setText(
+            f"Размер: {format_size(self.total)}, "
+            f"загружено: {format_size(self.offset)}")
+        self.btn_more.setEnabled(self.offset < self.total)
+
+    def on_tab_changed(self, index):
+        if index == 2 and not self.image_loaded:
+            self.load_image()
+
+    def load_image(self):
+        """Изображение читается целиком, поэтому его размер ограничен"""
+        self.image_loaded = True
+        if self.total > IMAGE_LIMIT:
+            self.image_label.setText(
+                f"Изображение больше {format_size(IMAGE_LIMIT)} не "
+                f"показывается - сохраните его в файл")
+            return
+        data = bytearray()
+        try:
+            for chunk in value_chunks(self.value):
+                data += chunk
+        except sqlite3.Error as e:
+            self.image_label.setText(f"Не удалось прочитать значение: {e}")
+            return
+        pixmap = QPixmap()
+        if pixmap.loadFromData(bytes(data)):
+            self.image_label.setPixmap(pixmap)
+        else:
+            self.image_label.setText("Значение не распознано как изображение")
+
+    def on_save_clicked(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить значение", "value.bin", "All Files (*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, "wb") as f:
+                for chunk in value_chunks(self.value):
+                    f.write(chunk)
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Ошибка",
+                                 f"Не удалось сохранить значение:\n{e}")
@@ -2,6 +2,9 @@ from PyQt6.QtWidgets import QPlainTextEdit, QCompleter
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QTextCursor, QKeyEvent, QFont
 
+# Сколько символов вокруг курсора передается поставщику автодополнения
+COMPLETION_CONTEXT = 4000
+
 
 class CodeEditor(QPlainTextEdit):
     # Сигнал, который будет испускаться при нажатии Enter
@@ -10,6 +13,9 @@ class CodeEditor(QPlainTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.completer = None
+        # Функция (текст, позиция курсора) -> (префикс, варианты); без нее
+        # варианты фильтруются из модели completer по слову под курсором
+        self.completion_provider = None
 
         # Настройка внешнего вида
         self.setPlaceholderText("Введите ваш SQL запрос здесь...")
@@ -32,6 +38,10 @@ class CodeEditor(QPlainTextEdit):
         # Подключаем сигнал выбора слова
         self.completer.activated.connect(self.insert_completion)
 
+    def set_completion_provider(self, provider):
+        """Установка поставщика вариантов автодополнения по контексту"""
+        self.completion_provider = provider
+
     def insert_completion(self, completion: str):
         """Вставка выбранного слова с заменой введенного префикса"""
         if self.completer.widget() != self:
@@ -52,6 +62,17 @@ class CodeEditor(QPlainTextEdit):
         tc.select(QTextCursor.SelectionType.WordUnderCursor)
         return tc.selectedText()
 
+    def text_around_cursor(self, radius=COMPLETION_CONTEXT):
+        """Текст вокруг курсора и позиция курсора в нем (без копирования всего документа)"""
+        position = self.textCursor().position()
+        start = max(0, position - radius)
+        end = min(self.document().characterCount() - 1, position + radius)
+        tc = QTextCursor(self.document())
+        tc.setPosition(start)
+        tc.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        # QTextCursor разделяет абзацы символом U+2029
+        return tc.selectedText().replace("\u2029", "\n"), position - start
+
     def focusInEvent(self, event):
         if self.completer:
             self.completer.setWidget(self)
@@ -103,6 +124,10 @@ class CodeEditor(QPlainTextEdit):
         if not self.completer or not allowed:
             return
 
+        if self.completion_provider is not None:
+            self._complete_from_provider(event, is_shortcut)
+            return
+
         eow = "~!@#$%^&*()_+{}|:\"<>?,./;'[]\\-="
         completion_prefix = self.text_under_cursor()
 
@@ -116,6 +141,30 @@ class CodeEditor(QPlainTextEdit):
             self.completer.popup()\
                 .setCurrentIndex(self.completer.completionModel().index(0, 0))
 
+        self._show_popup()
+
+    def _complete_from_provider(self, event, is_shortcut):
+        # Варианты запрашиваются при вводе символов слова и после точки
+        # ("псевдоним." - список столбцов)
+        typed = event.text()
+        if not is_shortcut and not (typed and (typed[-1].isalnum()
+                                               or typed[-1] in "_.")):
+            self.completer.popup().hide()
+            return
+
+        text, position = self.text_around_cursor()
+        prefix, words = self.completion_provider(text, position)
+        if not words or (not prefix and not is_shortcut and typed[-1] != "."):
+            self.completer.popup().hide()
+            return
+
+        self.completer.model().setStringList(words)
+        self.completer.setCompletionPrefix(prefix)
+        self.completer.popup()\
+            .setCurrentIndex(self.completer.completionModel().index(0, 0))
+        self._show_popup()
+
+    def _show_popup(self):
         cr = self.cursorRect()
         cr.setWidth(
             self.completer.popup().sizeHintForColumn(0) +
@@ -0,0 +1,102 @@
+from PyQt6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QLineEdit, QWidget
+from PyQt6.QtCore import QTimer, pyqtSignal
+from sql_editor.utils.columnar import FILTER_MODES, RowFilter
+
+# Задержка применения фильтра после ввода текста (мс)
+FILTER_DELAY = 250
+
+# Подсветка поля с неверным условием
+ERROR_STYLE = "border: 1px solid #d9534f;"
+
+# Подписи режимов фильтра (в порядке FILTER_MODES)
+FILTER_MODE_TITLES = ("Подстрока", "Регулярное выражение", "Диапазон")
+
+# Подсказки к полю фильтра по режиму
+FILTER_PLACEHOLDERS = (
+    "Фильтр по тексту ячеек...",
+    "Регулярное выражение, например ^user_\\d+$",
+    "Диапазон: 10..20, ..100, 2024-01-01..2024-12-31",
+)
+
+
+class FilterBar(QWidget):
+    """
+    Быстрый фильтр результата над таблицей: подстрока, регулярное
+    выражение или диапазон по одному или всем столбцам.
+    Фильтр применяется к уже полученным строкам, без запроса к БД.
+    """
+
+    # Новый фильтр (RowFilter) или None - фильтр снят
+    filterChanged = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setClearButtonEnabled(True)
+        self.combo_column = QComboBox()
+        self.combo_mode = QComboBox()
+        self.combo_mode.addItems(FILTER_MODE_TITLES)
+        self.count_label = QLabel()
+
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.apply)
+        self.filter_edit.textChanged.connect(self.filter_timer.start)
+        self.filter_edit.returnPressed.connect(self.apply)
+        self.combo_column.currentIndexChanged.connect(self.apply)
+        self.combo_mode.currentIndexChanged.connect(self.on_mode_changed)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter_edit, 1)
+        layout.addWidget(self.combo_column)
+        layout.addWidget(self.combo_mode)
+        layout.addWidget(self.count_label)
+        self.on_mode_changed()
+
+    def set_headers(self, headers):
+        """Новый результат: список столбцов, фильтр сбрасывается"""
+        self.filter_timer.stop()
+        for widget in (self.filter_edit, self.combo_column):
+            widget.blockSignals(True)
+        self.filter_edit.clear()
+        self.filter_edit.setStyleSheet("")
+        self.filter_edit.setToolTip("")
+        self.combo_column.clear()
+        self.combo_column.addItem("Все столбцы")
+        self.combo_column.addItems(headers)
+        for widget in (self.filter_edit, self.combo_column):
+            widget.blockSignals(False)
+        self.count_label.clear()
+
+    def set_counts(self, shown, total):
+        self.count_label.setText(
+            f"Показано: {shown} из {total}" if shown != total else "")
+
+    def on_mode_changed(self):
+        self.filter_edit.setPlaceholderText(
+            FILTER_PLACEHOLDERS[self.combo_mode.currentIndex()])
+        self.apply()
+
+    def row_filter(self):
+        """RowFilter по полям панели (None, если текст пуст); ValueError"""
+        text = self.filter_edit.text()
+        if not text:
+            return None
+        column = self.combo_column.currentIndex() - 1
+        return RowFilter(text, FILTER_MODES[self.combo_mode.currentIndex()],
+                         column if column >= 0 else None)
+
+    def apply(self):
+        self.filter_timer.stop()
+        try:
+            row_filter = self.row_filter()
+        except ValueError as e:
+            # Неверное выражение - поле подсвечивается, прежний фильтр остается
+            self.filter_edit.setStyleSheet(ERROR_STYLE)
+            self.filter_edit.setToolTip(str(e))
+            return
+        self.filter_edit.setStyleSheet("")
+        self.filter_edit.setToolTip("")
+        self.filterChanged.emit(row_filter)
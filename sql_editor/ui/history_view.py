@@ -0,0 +1,82 @@
+import sqlite3
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QHeaderView, QLineEdit, QPushButton, QTableView, QVBoxLayout,
+    QWidget
+)
+from PyQt6.QtCore import QTimer, pyqtSignal
+from sql_editor.ui.result_model import ResultTableModel
+
+# Задержка поиска после ввода текста (мс)
+SEARCH_DELAY = 200
+
+# Столбец с текстом запроса в результате QueryHistory.search
+SQL_COLUMN = 1
+
+
+class HistoryView(QWidget):
+    """
+    Панель истории запросов с поиском.
+    Записи загружаются порциями при прокрутке, запрос открывается двойным щелчком.
+    """
+
+    sqlActivated = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.history = None
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск по истории...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.btn_clear = QPushButton("Очистить")
+
+        self.model = ResultTableModel(self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.verticalHeader().setVisible(False)
+        self.view.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed)
+        self.view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.view.setWordWrap(False)
+        self.view.doubleClicked.connect(self._on_double_clicked)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.btn_clear.clicked.connect(self.clear_history)
+
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_edit)
+        search_layout.addWidget(self.btn_clear)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.view)
+
+    def set_history(self, history):
+        self.history = history
+        self.setEnabled(history is not None)
+
+    def refresh(self):
+        """Повторный поиск по текущему тексту (первая порция записей)"""
+        self.search_timer.stop()
+        if self.history is None:
+            return
+        try:
+            result = self.history.search(self.search_edit.text())
+            rows = result.fetch()
+        except sqlite3.Error:
+            # Например, синтаксис, который FTS5 не принял
+            self.model.clear()
+            return
+        self.model.set_result(result.headers, rows, result)
+
+    def clear_history(self):
+        if self.history is not None:
+            self.history.clear()
+            self.refresh()
+
+    def _on_double_clicked(self, index):
+        self.sqlActivated.emit(self.model.row_at(index.row())[SQL_COLUMN])
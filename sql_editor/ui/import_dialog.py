@@ -0,0 +1,45 @@
+import os
+from PyQt6.QtWidgets import (
+    QDialog, QDialogButtonBox, QFormLayout, QLineEdit, QSpinBox
+)
+from sql_editor.utils.importer import IMPORT_BATCH_SIZE
+
+
+class ImportDialog(QDialog):
+    """Параметры загрузки файла в таблицу"""
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Импорт данных")
+
+        name = os.path.basename(file_path).split(".", 1)[0]
+        self.table_edit = QLineEdit(name)
+        self.indexes_edit = QLineEdit()
+        self.indexes_edit.setPlaceholderText("столбцы через запятую")
+        self.batch_spin = QSpinBox()
+        self.batch_spin.setRange(100, 1_000_000)
+        self.batch_spin.setSingleStep(1000)
+        self.batch_spin.setValue(IMPORT_BATCH_SIZE)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok |
+            QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout(self)
+        layout.addRow("Файл:", QLineEdit(file_path, readOnly=True))
+        layout.addRow("Таблица:", self.table_edit)
+        layout.addRow("Индексы после загрузки:", self.indexes_edit)
+        layout.addRow("Размер порции:", self.batch_spin)
+        layout.addRow(buttons)
+
+    def table_name(self):
+        return self.table_edit.text().strip()
+
+    def index_columns(self):
+        return [c.strip() for c in self.indexes_edit.text().split(",")
+                if c.strip()]
+
+    def batch_size(self):
+        return self.batch_spin.value()
@@ -2,38 +2,159 @@ import os
 import sqlite3
 from PyQt6.QtWidgets import (
     QCompleter, QMainWindow, QWidget, QVBoxLayout,
-    QHBoxLayout, QPushButton, QTableWidget, QTreeWidget,
+    QHBoxLayout, QPushButton, QTableView, QTreeWidget,
     QSplitter, QHeaderView, QTreeWidgetItem,
-    QMessageBox, QFileDialog, QTableWidgetItem
+    QMessageBox, QFileDialog, QTabWidget, QPlainTextEdit, QCheckBox,
+    QComboBox, QLabel, QToolButton, QMenu, QApplication
 )
-from PyQt6.QtCore import Qt, QStringListModel, QSettings
-from sql_editor.db.connection import DatabaseManager
-from sql_editor.ui.syntax import SqlHighlighter, SQL_KEYWORDS
+from PyQt6.QtCore import (
+    Qt, QStringListModel, QSettings, QStandardPaths, QTimer, pyqtSignal
+)
+from sql_editor.db.connection import (
+    DatabaseManager, DEFAULT_BATCH_SIZE, DEFAULT_CACHED_STATEMENTS
+)
+from sql_editor.db.cache import DEFAULT_CACHE_BYTES
+from sql_editor.db.editing import PendingChanges, edit_target
+from sql_editor.db.pool import DEFAULT_READERS
+from sql_editor.db.profiles import (
+    JOURNAL_MODES, SYNCHRONOUS_MODES, dump_profiles, load_profiles, new_profile
+)
+from sql_editor.db.schema import OBJECT_TYPES, quote_identifier
 from sql_editor.ui.editor import CodeEditor
-from sql_editor.utils.export import export_to_csv, export_to_json
+from sql_editor.ui.filter_bar import FilterBar
+from sql_editor.ui.result_model import ResultTableModel
+from sql_editor.ui.history_view import HistoryView
+from sql_editor.ui.param_panel import ParameterPanel
+from sql_editor.ui.plan_view import PlanView
+from sql_editor.ui.profiler_view import ProfilerView
+from sql_editor.ui.worker import (
+    ConnectWorker, QueryWorker, ScriptWorker, ManyWorker, ExportWorker,
+    ImportWorker
+)
+from sql_editor.utils.completion import SchemaCompletion
+from sql_editor.utils.lexer import SQL_KEYWORDS, split_statements
 from sql_editor.ui.styles import DARK_THEME, LIGHT_THEME
+from sql_editor.utils.blobs import BINARY_TYPES, LazyValue, is_long
+
+# Диалоги (в том числе просмотр значений), подсветка, экспорт, разбор
+# наборов параметров (csv, json, модули сжатия), план запроса, просмотр
+# таблиц и история импортируются при первом использовании: окно должно
+# появиться как можно раньше
+
+# Подписи групп объектов в дереве структуры
+OBJECT_GROUP_TITLES = {
+    "table": "Таблицы",
+    "view": "Представления",
+    "index": "Индексы",
+    "trigger": "Триггеры",
+}
+
+# Фильтр диалогов выбора файла с данными (импорт, наборы параметров)
+DATA_FILE_FILTER = (
+    "Data Files (*.csv *.ndjson *.jsonl *.csv.gz *.ndjson.gz);;"
+    "All Files (*)"
+)
+
+# Задержка разбора параметров после правки текста запроса (мс)
+PARAMETER_PARSE_DELAY = 300
+
+# Постоянные вкладки результатов: "Результат", "Сообщения", "План",
+# "Профилировщик"
+FIXED_RESULT_TABS = 4
+
+# Файл истории запросов в каталоге данных приложения
+HISTORY_FILE = "history.sqlite"
+
+# Роль данных узла дерева: (вид узла, имя объекта)
+TREE_NODE_ROLE = Qt.ItemDataRole.UserRole
+
+# Подсказки к оценке числа строк таблицы по ее источнику
+ROW_ESTIMATE_HINTS = {
+    "stat1": "Число строк по статистике ANALYZE (sqlite_stat1)",
+    "rowid": "Число строк оценено по max(rowid); "
+             "ANALYZE даст оценку по статистике",
+}
+
+
+def format_count(count):
+    """Число строк с разделением разрядов: 50 000 000"""
+    return f"{count:,}".replace(",", " ")
+
+
+def export_filters():
+    """
+    Фильтры диалога экспорта: формат выбирается по расширению файла,
+    суффикс .gz/.bz2/.xz включает сжатие
+    """
+    from sql_editor.utils.export import COMPRESSORS, EXPORT_FORMATS
+    return ";;".join([
+        "CSV Files (*.csv)",
+        "JSON Files (*.json)",
+        "NDJSON Files (*.ndjson)",
+        "Compressed Files (" + " ".join(
+            f"*.{fmt}{suffix}" for fmt in EXPORT_FORMATS
+            for suffix in COMPRESSORS) + ")",
+    ])
 
 
 class MainWindow(QMainWindow):
+    # Этапы отложенного запуска (для отчета main.py --startup-report)
+    startupStage = pyqtSignal(str)
+    # Запуск завершен: подсветка готова, сессия восстановлена
+    startupFinished = pyqtSignal()
+
     def __init__(self):
         super().__init__()
 
-        # Логика
-        self.db = DatabaseManager()
+        # Логика: открытые базы данных и текущая (к ней относятся запросы,
+        # транзакции и настройки соединения на панели сеанса)
+        self.databases = []
+        self.db = None
+        self.history = None
         self.current_headers = []
         self.current_rows = []
+        self.query_worker = None
+        self.export_worker = None
+        self.import_worker = None
+        # Фоновое подключение к БД прошлой сессии
+        self.restore_worker = None
+        self.restore_failed = []
+        self.startup_done = False
+        self.current_sql = None
+        self.current_params = None
+        # База, из которой получен текущий результат (для экспорта)
+        self.current_db = None
+        # Текущий результат взят из кэша результатов
+        self.current_from_cache = False
+        self.current_profile = None
+        # Перезагрузка результата после применения правок (None - результат
+        # не редактируется)
+        self.current_reload = None
 
         # Состояние интерфейса (Инициализируем атрибуты здесь)
         self.is_dark_theme = True
         self.highlighter = None
         self.query_editor = None
         self.result_table = None
+        self.result_model = None
         self.tree_widget = None
 
         # Настройки UI
         self.setWindowTitle("SQL Editor")
         self.resize(1200, 800)
         self.settings = QSettings("LinkovSoft", "SQLEditor")
+        self.batch_size = self.settings.value(
+            "fetch_batch_size", DEFAULT_BATCH_SIZE, type=int)
+        self.cached_statements = self.settings.value(
+            "cached_statements", DEFAULT_CACHED_STATEMENTS, type=int)
+        # Объем кэша результатов (0 - кэш отключен)
+        self.result_cache_bytes = self.settings.value(
+            "result_cache_mb", DEFAULT_CACHE_BYTES // 1048576,
+            type=int) * 1048576
+        # Соединений для параллельного чтения на одну БД (в режиме WAL)
+        self.pool_readers = self.settings.value(
+            "pool_readers", DEFAULT_READERS, type=int)
+        self.db = self._new_database()
 
         # Инициализация интерфейса
         self._init_ui()
@@ -57,42 +178,172 @@ class MainWindow(QMainWindow):
         self.btn_connect = QPushButton("🔌 Подключить БД")
         self.btn_export = QPushButton("💾 Экспорт")
         self.btn_export.setEnabled(False)
+        self.btn_import = QPushButton("📥 Импорт")
+        self.btn_import.setEnabled(False)
         self.btn_run = QPushButton("▶ Выполнить")
         self.btn_run.setEnabled(False)
+        # План запроса; из меню - вместе с байт-кодом EXPLAIN
+        self.btn_explain = QToolButton()
+        self.btn_explain.setText("🔍 План")
+        self.btn_explain.setEnabled(False)
+        self.btn_explain.setPopupMode(
+            QToolButton.ToolButtonPopupMode.MenuButtonPopup)
+        explain_menu = QMenu(self.btn_explain)
+        self.action_explain_bytecode = explain_menu.addAction(
+            "План и байт-код (EXPLAIN)")
+        self.btn_explain.setMenu(explain_menu)
+        self.btn_cancel = QPushButton("⏹ Отмена")
+        self.btn_cancel.setEnabled(False)
+        self.chk_continue = QCheckBox("Продолжать при ошибке")
+        self.chk_continue.setToolTip(
+            "Для скриптов: не прерывать выполнение на ошибочном операторе")
         self.btn_theme = QPushButton("🌙️")
         self.btn_theme.setFixedWidth(48)
 
         self.toolbar_layout.addWidget(self.btn_create)
         self.toolbar_layout.addWidget(self.btn_connect)
         self.toolbar_layout.addWidget(self.btn_export)
+        self.toolbar_layout.addWidget(self.btn_import)
         self.toolbar_layout.addWidget(self.btn_run)
+        self.toolbar_layout.addWidget(self.btn_explain)
+        self.toolbar_layout.addWidget(self.btn_cancel)
+        self.toolbar_layout.addWidget(self.chk_continue)
         self.toolbar_layout.addStretch()
         self.toolbar_layout.addWidget(self.btn_theme)
         main_layout.addLayout(self.toolbar_layout)
 
+        # Панель сеанса: режим транзакций и PRAGMA соединения
+        self.session_layout = QHBoxLayout()
+        self.session_layout.setContentsMargins(10, 0, 10, 10)
+
+        self.combo_tx_mode = QComboBox()
+        self.combo_tx_mode.addItems(["Автофиксация", "Ручные транзакции"])
+        self.btn_commit = QPushButton("✔ COMMIT")
+        self.btn_rollback = QToolButton()
+        self.btn_rollback.setText("↩ ROLLBACK")
+        self.btn_rollback.setPopupMode(
+            QToolButton.ToolButtonPopupMode.MenuButtonPopup)
+        self.rollback_menu = QMenu(self.btn_rollback)
+        self.btn_rollback.setMenu(self.rollback_menu)
+        self.btn_savepoint = QPushButton("📌 Точка сохранения")
+        self.combo_synchronous = QComboBox()
+        self.combo_synchronous.addItems(SYNCHRONOUS_MODES)
+        self.combo_journal = QComboBox()
+        self.combo_journal.addItems(JOURNAL_MODES)
+        self.btn_profile = QPushButton("⚙ Соединение")
+        self.btn_profile.setEnabled(False)
+
+        self.session_layout.addWidget(self.combo_tx_mode)
+        self.session_layout.addWidget(self.btn_commit)
+        self.session_layout.addWidget(self.btn_rollback)
+        self.session_layout.addWidget(self.btn_savepoint)
+        self.session_layout.addStretch()
+        self.session_layout.addWidget(QLabel("synchronous:"))
+        self.session_layout.addWidget(self.combo_synchronous)
+        self.session_layout.addWidget(QLabel("journal_mode:"))
+        self.session_layout.addWidget(self.combo_journal)
+        self.session_layout.addWidget(self.btn_profile)
+        main_layout.addLayout(self.session_layout)
+
         # Рабочая область
         self.main_splitter = QSplitter(Qt.Orientation.Horizontal)
 
         self.tree_widget = QTreeWidget()
-        self.tree_widget.setHeaderLabel("База данных")
-        self.main_splitter.addWidget(self.tree_widget)
+        self.tree_widget.setHeaderLabel("Базы данных")
+        self.tree_widget.setContextMenuPolicy(
+            Qt.ContextMenuPolicy.CustomContextMenu)
+        # Слева: структура БД и история запросов (загружается при открытии)
+        self.history_view = HistoryView()
+        self.left_tabs = QTabWidget()
+        self.left_tabs.addTab(self.tree_widget, "Структура")
+        self.left_tabs.addTab(self.history_view, "История")
+        self.main_splitter.addWidget(self.left_tabs)
 
         self.right_splitter = QSplitter(Qt.Orientation.Vertical)
 
         self.query_editor = CodeEditor()
-        completer = QCompleter(SQL_KEYWORDS)
-        completer.setModel(QStringListModel(SQL_KEYWORDS))
+        # Ключевые слова и подсветка появляются после первой отрисовки окна
+        # (см. finish_startup)
+        self.completer_model = QStringListModel()
+        completer = QCompleter(self)
+        completer.setModel(self.completer_model)
         self.query_editor.set_completer(completer)
-        self.highlighter = SqlHighlighter(self.query_editor.document())
+        # Таблицы и столбцы из структуры текущей БД; столбцы не читаются,
+        # пока ее соединение занято запросом
+        self.completion = SchemaCompletion(self.db.schema)
+        self.completion.can_load = lambda: not self.is_database_busy(self.db)
+        self.query_editor.set_completion_provider(self.completion.complete)
 
-        self.result_table = QTableWidget()
-        self.result_table.horizontalHeader().setSectionResizeMode(
-            QHeaderView.ResizeMode.Stretch)
-        self.result_table.setSortingEnabled(True)
-        self.result_table.verticalHeader().setVisible(False)
+        # Параметры запроса разбираются не на каждое нажатие клавиши,
+        # а после паузы в наборе
+        self.param_panel = ParameterPanel()
+        self.param_panel.setVisible(False)
+        self.param_timer = QTimer(self)
+        self.param_timer.setSingleShot(True)
+        self.param_timer.setInterval(PARAMETER_PARSE_DELAY)
+        self.editor_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.editor_splitter.addWidget(self.query_editor)
+        self.editor_splitter.addWidget(self.param_panel)
+        self.editor_splitter.setStretchFactor(0, 3)
+        self.editor_splitter.setStretchFactor(1, 1)
+
+        self.result_model = ResultTableModel(self)
+        self.result_model.fetchProgress.connect(self.on_fetch_progress)
+        self.result_model.pendingChanged.connect(self.on_pending_changed)
+        self.result_table = self._create_result_view(self.result_model)
+        self.result_table.setContextMenuPolicy(
+            Qt.ContextMenuPolicy.CustomContextMenu)
+        self.result_table.customContextMenuRequested.connect(
+            self.on_result_context_menu)
+        self.result_table.doubleClicked.connect(self.on_result_double_clicked)
 
-        self.right_splitter.addWidget(self.query_editor)
-        self.right_splitter.addWidget(self.result_table)
+        # Панель правок: видна, когда результат можно редактировать
+        self.edit_bar = QWidget()
+        edit_layout = QHBoxLayout(self.edit_bar)
+        edit_layout.setContentsMargins(0, 0, 0, 0)
+        self.edit_label = QLabel()
+        self.btn_add_row = QPushButton("➕ Строка")
+        self.btn_add_row.setToolTip("Добавить строку в таблицу")
+        self.btn_delete_rows = QPushButton("➖ Удалить")
+        self.btn_delete_rows.setToolTip(
+            "Пометить выделенные строки на удаление (повторно - снять пометку)")
+        self.btn_apply_edits = QPushButton()
+        self.btn_apply_edits.setToolTip(
+            "Записать правки в БД одной транзакцией")
+        self.btn_discard_edits = QPushButton("✖ Отменить")
+        edit_layout.addWidget(self.edit_label)
+        edit_layout.addWidget(self.btn_add_row)
+        edit_layout.addWidget(self.btn_delete_rows)
+        edit_layout.addStretch()
+        edit_layout.addWidget(self.btn_apply_edits)
+        edit_layout.addWidget(self.btn_discard_edits)
+        self.edit_bar.setVisible(False)
+
+        # Быстрый фильтр по уже полученным строкам
+        self.filter_bar = FilterBar()
+        self.filter_bar.filterChanged.connect(self.on_filter_changed)
+
+        self.result_page = QWidget()
+        result_layout = QVBoxLayout(self.result_page)
+        result_layout.setContentsMargins(0, 0, 0, 0)
+        result_layout.addWidget(self.filter_bar)
+        result_layout.addWidget(self.edit_bar)
+        result_layout.addWidget(self.result_table)
+
+        # Вкладки результатов: основной результат, сообщения скрипта
+        # и дополнительные наборы строк (по одному на каждый SELECT)
+        self.messages_view = QPlainTextEdit()
+        self.messages_view.setReadOnly(True)
+        self.result_tabs = QTabWidget()
+        self.result_tabs.addTab(self.result_page, "Результат")
+        self.result_tabs.addTab(self.messages_view, "Сообщения")
+        self.plan_view = PlanView()
+        self.result_tabs.addTab(self.plan_view, "План")
+        self.profiler_view = ProfilerView()
+        self.result_tabs.addTab(self.profiler_view, "Профилировщик")
+
+        self.right_splitter.addWidget(self.editor_splitter)
+        self.right_splitter.addWidget(self.result_tabs)
         self.right_splitter.setStretchFactor(0, 1)
         self.right_splitter.setStretchFactor(1, 2)
 
@@ -103,50 +354,431 @@ class MainWindow(QMainWindow):
 
         self.status_bar = self.statusBar()
         self.status_bar.showMessage("Готов к работе")
+        # Индикатор незафиксированных изменений
+        self.tx_label = QLabel()
+        self.status_bar.addPermanentWidget(self.tx_label)
 
         # Сигналы
         self.btn_create.clicked.connect(self.on_create_clicked)
         self.btn_connect.clicked.connect(self.on_connect_clicked)
         self.btn_export.clicked.connect(self.on_export_clicked)
+        self.btn_import.clicked.connect(self.on_import_clicked)
         self.btn_run.clicked.connect(self.on_run_clicked)
+        self.btn_add_row.clicked.connect(self.on_add_row_clicked)
+        self.btn_delete_rows.clicked.connect(self.on_delete_rows_clicked)
+        self.btn_apply_edits.clicked.connect(self.on_apply_edits_clicked)
+        self.btn_discard_edits.clicked.connect(self.result_model.discard_pending)
+        self.btn_explain.clicked.connect(lambda: self.on_explain_clicked())
+        self.action_explain_bytecode.triggered.connect(
+            lambda: self.on_explain_clicked(bytecode=True))
+        self.plan_view.insertRequested.connect(self.on_insert_index_sql)
+        self.profiler_view.exportRequested.connect(self.on_export_profiles)
+        self.profiler_view.clearRequested.connect(self.on_clear_profiles)
+        self.result_tabs.currentChanged.connect(self.refresh_profiler)
+        self.btn_cancel.clicked.connect(self.on_cancel_clicked)
         self.btn_theme.clicked.connect(self.toggle_theme)
+        self.combo_tx_mode.currentIndexChanged.connect(self.on_tx_mode_changed)
+        self.btn_commit.clicked.connect(self.on_commit_clicked)
+        self.btn_rollback.clicked.connect(self.on_rollback_clicked)
+        self.btn_savepoint.clicked.connect(self.on_savepoint_clicked)
+        self.btn_profile.clicked.connect(self.on_profile_clicked)
+        self.combo_synchronous.textActivated.connect(
+            lambda value: self.on_session_pragma_changed("synchronous", value))
+        self.combo_journal.textActivated.connect(
+            lambda value: self.on_session_pragma_changed("journal_mode", value))
         self.query_editor.executionRequested.connect(self.on_run_clicked)
+        self.query_editor.textChanged.connect(self.param_timer.start)
+        self.param_timer.timeout.connect(self.update_parameters)
+        self.param_panel.action_from_file.triggered.connect(
+            self.on_run_many_from_file)
+        self.param_panel.action_from_clipboard.triggered.connect(
+            self.on_run_many_from_clipboard)
         self.tree_widget.itemClicked.connect(self.on_tree_item_clicked)
+        self.left_tabs.currentChanged.connect(self.on_left_tab_changed)
+        self.history_view.sqlActivated.connect(self.on_history_activated)
+        self.tree_widget.itemExpanded.connect(self.on_tree_item_expanded)
+        self.tree_widget.customContextMenuRequested.connect(
+            self.on_tree_context_menu)
 
         self.query_editor.setFocus()
         self.setStyleSheet(DARK_THEME)
+        self.update_transaction_state()
+
+    @staticmethod
+    def _create_result_view(model):
+        view = QTableView()
+        view.setModel(model)
+        view.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch)
+        # Фиксированная высота строк - представлению не нужно измерять ячейки
+        view.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed)
+        view.setSortingEnabled(True)
+        view.verticalHeader().setVisible(False)
+        return view
 
     def load_settings(self):
-        """Загрузка настроек приложения"""
+        """
+        Загрузка настроек, нужных для первой отрисовки окна.
+        История и БД прошлой сессии открываются позже (finish_startup)
+        """
+        self.query_editor.setPlainText(self.settings.value("editor_text", ""))
+
         saved_theme = self.settings.value("theme", "dark")
         if saved_theme == "light":
             self.toggle_theme()
 
+        if self.settings.value("transaction_mode", "auto") == "manual":
+            self.combo_tx_mode.setCurrentIndex(1)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_done:
+            self.startup_done = True
+            # Таймер срабатывает, когда цикл событий отрисовал окно
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Отложенная часть запуска: подсветка, автодополнение, сессия"""
+        self.startupStage.emit("первая отрисовка окна")
+        from sql_editor.ui.syntax import SqlHighlighter
+        self.highlighter = SqlHighlighter(self.query_editor.document())
+        self.highlighter.set_theme("dark" if self.is_dark_theme else "light")
+        self.completer_model.setStringList(SQL_KEYWORDS)
+        self.startupStage.emit("подсветка и автодополнение")
+
+        self.open_history()
+        self.restore_session()
+
+    def restore_session(self):
+        """
+        Подключение к БД, открытым в прошлый раз, в фоновом потоке;
+        текущей становится last_db
+        """
         last_db_path = self.settings.value("last_db")
-        if last_db_path and os.path.exists(last_db_path):
-            try:
-                self.db.connect(last_db_path)
-                self.status_bar.showMessage(
-                    f"Восстановлена сессия: {os.path.basename(last_db_path)}")
-                self.btn_run.setEnabled(True)
-                self.update_tree_structure()
-            except (sqlite3.Error,
-                    OSError):
-                self.settings.remove("last_db")
-                self.status_bar.showMessage("Не удалось открыть предыдущую БД")
+        paths = self.settings.value("open_databases", [], type=list)
+        if last_db_path and last_db_path not in paths:
+            paths.append(last_db_path)
+        targets = [(self._new_database(), path, self.load_profile(path))
+                   for path in paths if os.path.exists(path)]
+        if not targets:
+            self.on_restore_finished()
+            return
+
+        self.restore_failed = []
+        worker = ConnectWorker(targets, self)
+        worker.connected.connect(self.on_session_connected)
+        worker.failed.connect(
+            lambda path, error: self.restore_failed.append(path))
+        worker.finished.connect(self.on_restore_finished)
+        self.restore_worker = worker
+        self.status_bar.showMessage("Восстановление сессии...")
+        worker.start()
+
+    def on_session_connected(self, db):
+        """БД прошлой сессии подключена в фоне"""
+        if any(item.db_path == db.db_path for item in self.databases):
+            # Пользователь уже открыл этот файл сам
+            db.close()
+            return
+        self.databases.append(db)
+        self.update_tree_structure(db)
+        # Текущей становится last_db, а до ее подключения - первая готовая
+        if not self.is_query_running() and (
+                self.db.connection is None
+                or db.db_path == self.settings.value("last_db")):
+            self.set_active_database(db)
+        self._mark_active_root()
+
+    def on_restore_finished(self):
+        if self.restore_worker is not None:
+            self.restore_worker.deleteLater()
+            self.restore_worker = None
+            self.save_open_databases()
+
+        if self.restore_failed:
+            self.status_bar.showMessage("Не удалось открыть предыдущую БД")
+        elif self.db.db_path:
+            self.status_bar.showMessage(
+                f"Восстановлена сессия: {os.path.basename(self.db.db_path)}")
+        self.startupStage.emit("сессия восстановлена")
+        self.startupFinished.emit()
+
+    def on_connected(self):
+        """Обновление интерфейса после подключения к БД"""
+        if self.db.profile_errors:
+            self.status_bar.showMessage(
+                "Не все настройки профиля применены: " +
+                ", ".join(self.db.profile_errors))
+        self.update_tree_structure()
+        self.on_database_activated()
+
+    def on_database_activated(self):
+        """Обновление интерфейса при смене текущей БД"""
+        connected = self.db.connection is not None
+        self.btn_run.setEnabled(connected and not self.is_query_running())
+        self.btn_explain.setEnabled(connected and not self.is_query_running())
+        self.btn_import.setEnabled(
+            connected and not self.db.profile["read_only"]
+            and self.import_worker is None)
+        self.btn_profile.setEnabled(connected)
+        self.combo_tx_mode.blockSignals(True)
+        self.combo_tx_mode.setCurrentIndex(0 if self.db.autocommit else 1)
+        self.combo_tx_mode.blockSignals(False)
+        self.completion.set_schema(self.db.schema)
+        self._mark_active_root()
+        if connected:
+            self.load_session_pragmas()
+        self.update_transaction_state()
+        self.refresh_profiler()
+
+    def _new_database(self):
+        """DatabaseManager с настройками приложения (еще не подключенный)"""
+        db = DatabaseManager()
+        db.cached_statements = self.cached_statements
+        db.result_cache.max_bytes = self.result_cache_bytes
+        db.max_readers = self.pool_readers
+        db.history = self.history
+        db.autocommit = self.settings.value(
+            "transaction_mode", "auto") != "manual"
+        return db
+
+    def open_database(self, path):
+        """
+        Подключение к БД и выбор ее текущей. Уже открытая БД только
+        становится текущей, остальные открытые остаются подключенными
+        """
+        path = os.path.abspath(path)
+        for db in self.databases:
+            if db.db_path == path:
+                self.set_active_database(db)
+                return db
+
+        db = self.db if self.db.connection is None else self._new_database()
+        db.connect(path, self.load_profile(path))
+        if db not in self.databases:
+            self.databases.append(db)
+        self.db = db
+        self.on_connected()
+        self.save_open_databases()
+        return db
+
+    def set_active_database(self, db):
+        if db is self.db:
+            return
+        self.db = db
+        self.on_database_activated()
+        if db.db_path:
+            self.settings.setValue("last_db", db.db_path)
+            self.status_bar.showMessage(
+                f"Текущая БД: {os.path.basename(db.db_path)}")
+
+    def close_database(self, db):
+        """Отключение от БД (незафиксированные изменения - по решению пользователя)"""
+        if self.is_query_running() and self.query_worker.db is db:
+            self.status_bar.showMessage("Запрос уже выполняется")
+            return
+        self.set_active_database(db)
+        if self.current_db is db and not self.confirm_discard_edits():
+            return
+        if not self.confirm_pending_transaction():
+            return
+
+        root = self._tree_root(db)
+        if root is not None:
+            self.tree_widget.takeTopLevelItem(
+                self.tree_widget.indexOfTopLevelItem(root))
+        if self.current_db is db:
+            # Результат читался через закрываемое соединение
+            self.current_db = None
+            self.current_sql = None
+            self.fill_table([], [])
+        db.close()
+        self.databases.remove(db)
+        self.db = self.databases[-1] if self.databases \
+            else self._new_database()
+        self.on_database_activated()
+        if self.db.db_path:
+            self.settings.setValue("last_db", self.db.db_path)
         else:
             self.settings.remove("last_db")
+        self.save_open_databases()
+
+    def save_open_databases(self):
+        self.settings.setValue(
+            "open_databases", [db.db_path for db in self.databases])
+
+    def is_database_busy(self, db):
+        """
+        Занято ли соединение БД фоновым запросом так, что служебное чтение
+        (структура) заблокирует интерфейс. В режиме WAL оно идет через
+        читателя пула и не ждет запроса
+        """
+        return (self.is_query_running() and self.query_worker.db is db
+                and not db.parallel_reads)
+
+    def load_profile(self, path):
+        """Профиль соединения, сохраненный для файла БД"""
+        profiles = load_profiles(self.settings.value("connection_profiles", ""))
+        return profiles.get(os.path.abspath(path), new_profile())
+
+    def save_profile(self, path, profile):
+        profiles = load_profiles(self.settings.value("connection_profiles", ""))
+        profiles[os.path.abspath(path)] = profile
+        self.settings.setValue("connection_profiles", dump_profiles(profiles))
+
+    def on_profile_clicked(self):
+        if not self.db.connection or self.is_query_running():
+            return
+
+        from sql_editor.ui.profile_dialog import ConnectionProfileDialog
+        dialog = ConnectionProfileDialog(
+            self.db.profile, self.db.effective_settings(),
+            self.db.profile_errors, self)
+        if not dialog.exec():
+            return
+        if not self.confirm_pending_transaction():
+            return
+
+        path = self.db.db_path
+        self.save_profile(path, dialog.profile())
+        try:
+            self.db.connect(path, self.load_profile(path))
+            self.status_bar.showMessage(
+                f"Переподключено: {os.path.basename(path)}")
+            self.on_connected()
+        except Exception as e:
+            self.status_bar.showMessage("Ошибка подключения")
+            QMessageBox.critical(self, "Ошибка",
+                                 f"Не удалось переподключиться:\n{e}")
+
+    def load_session_pragmas(self):
+        """Отображение текущих synchronous и journal_mode соединения"""
+        for combo, name, values in (
+                (self.combo_synchronous, "synchronous", SYNCHRONOUS_MODES),
+                (self.combo_journal, "journal_mode", JOURNAL_MODES)):
+            value = self.db.get_pragma(name)
+            if value is None:
+                continue
+            # synchronous возвращается числом (0 - OFF, 1 - NORMAL, ...)
+            text = values[value] if isinstance(value, int) else str(value).upper()
+            combo.setCurrentText(text)
+
+    def on_session_pragma_changed(self, name, value):
+        if not self.db.connection or self.is_query_running():
+            self.load_session_pragmas()
+            return
+        try:
+            self.db.set_pragma(name, value)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось установить {name}:\n{e}")
+        # Показываем фактическое значение (SQLite может отказаться его менять)
+        self.load_session_pragmas()
+
+    def update_transaction_state(self):
+        """Кнопки транзакций и индикатор незафиксированных изменений"""
+        busy = self.is_query_running()
+        connected = self.db.connection is not None
+        in_tx = self.db.in_transaction
+
+        self.btn_commit.setEnabled(in_tx and not busy)
+        self.btn_rollback.setEnabled(in_tx and not busy)
+        self.btn_savepoint.setEnabled(connected and not busy)
+        self.combo_synchronous.setEnabled(connected and not busy)
+        self.combo_journal.setEnabled(connected and not busy and not in_tx)
+
+        self.rollback_menu.clear()
+        for name in reversed(self.db.savepoints):
+            action = self.rollback_menu.addAction(f"ROLLBACK TO {name}")
+            action.triggered.connect(
+                lambda _, sp=name: self.on_rollback_to_clicked(sp))
+
+        if self.db.is_dirty():
+            self.tx_label.setText("● Есть незафиксированные изменения")
+        elif in_tx:
+            self.tx_label.setText("Транзакция открыта")
+        else:
+            self.tx_label.setText("")
+
+    def on_tx_mode_changed(self, index):
+        manual = index == 1
+        if not manual and not self.confirm_pending_transaction():
+            # Пользователь отказался - остаемся в ручном режиме
+            self.combo_tx_mode.blockSignals(True)
+            self.combo_tx_mode.setCurrentIndex(1)
+            self.combo_tx_mode.blockSignals(False)
+            return
+
+        self.db.autocommit = not manual
+        self.settings.setValue("transaction_mode", "manual" if manual else "auto")
+        self.update_transaction_state()
+
+    def confirm_pending_transaction(self):
+        """
+        Завершение открытой транзакции перед сменой соединения или режима.
+        Возвращает False, если пользователь отменил действие.
+        """
+        if not self.db.in_transaction or self.is_query_running():
+            return True
+
+        if not self.db.is_dirty():
+            # Транзакция только на чтение - закрываем без вопросов
+            self.db.commit()
+            self.update_transaction_state()
+            return True
+
+        answer = QMessageBox.question(
+            self, "Незафиксированные изменения",
+            "В открытой транзакции есть изменения. Зафиксировать их?",
+            QMessageBox.StandardButton.Save |
+            QMessageBox.StandardButton.Discard |
+            QMessageBox.StandardButton.Cancel)
+
+        if answer == QMessageBox.StandardButton.Cancel:
+            return False
+        if answer == QMessageBox.StandardButton.Save:
+            self.on_commit_clicked()
+        else:
+            self.on_rollback_clicked()
+        return not self.db.in_transaction
+
+    def _transaction_action(self, action, message):
+        if self.is_query_running():
+            return
+        try:
+            result = action()
+            self.status_bar.showMessage(message.format(result))
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "SQL Ошибка", str(e))
+        self.update_tree_structure()
+        self.update_transaction_state()
+
+    def on_commit_clicked(self):
+        self._transaction_action(self.db.commit, "Транзакция зафиксирована")
+
+    def on_rollback_clicked(self):
+        self._transaction_action(self.db.rollback, "Транзакция отменена")
+
+    def on_rollback_to_clicked(self, name):
+        self._transaction_action(lambda: self.db.rollback_to(name),
+                                 "Откат к точке сохранения " + name)
+
+    def on_savepoint_clicked(self):
+        self._transaction_action(self.db.savepoint,
+                                 "Создана точка сохранения {}")
 
     def toggle_theme(self):
         if self.is_dark_theme:
             self.setStyleSheet(LIGHT_THEME)
-            self.highlighter.set_theme("light")
+            if self.highlighter is not None:
+                self.highlighter.set_theme("light")
             self.btn_theme.setText("☀️")
             self.is_dark_theme = False
             self.settings.setValue("theme", "light")
         else:
             self.setStyleSheet(DARK_THEME)
-            self.highlighter.set_theme("dark")
+            if self.highlighter is not None:
+                self.highlighter.set_theme("dark")
             self.btn_theme.setText("🌙")
             self.is_dark_theme = True
             self.settings.setValue("theme", "dark")
@@ -160,10 +792,8 @@ class MainWindow(QMainWindow):
                 file_path += '.db'
 
             try:
-                self.db.connect(file_path)
-                self.settings.setValue("last_db", file_path)
-                self.btn_run.setEnabled(True)
-                self.update_tree_structure()
+                self.open_database(file_path)
+                self.settings.setValue("last_db", self.db.db_path)
                 QMessageBox.information(self, "Успех",
                                         f"БД создана: {file_path}")
             except Exception as e:
@@ -179,12 +809,10 @@ class MainWindow(QMainWindow):
         )
         if file_path:
             try:
-                self.db.connect(file_path)
+                self.open_database(file_path)
                 self.status_bar.showMessage(
                     f"Подключено: {os.path.basename(file_path)}")
-                self.settings.setValue("last_db", file_path)
-                self.btn_run.setEnabled(True)
-                self.update_tree_structure()
+                self.settings.setValue("last_db", self.db.db_path)
             except Exception as e:
                 self.status_bar.showMessage("Ошибка подключения")
                 QMessageBox.critical(self, "Ошибка",
@@ -194,91 +822,917 @@ class MainWindow(QMainWindow):
         if not self.current_rows:
             QMessageBox.warning(self, "Ошибка", "Нет данных для экспорта")
             return
+        if self.export_worker is not None:
+            self.status_bar.showMessage("Экспорт уже выполняется")
+            return
 
         file_path, selected_filter = QFileDialog.getSaveFileName(
-            self, "Экспорт данных", "export_data",
-            "CSV Files (*.csv);;JSON Files (*.json)"
+            self, "Экспорт данных", "export_data", export_filters()
         )
         if not file_path:
             return
 
-        try:
-            if file_path.endswith('.csv') or "CSV" in selected_filter:
-                if not file_path.endswith('.csv'): file_path += '.csv'
-                export_to_csv(file_path, self.current_headers,
-                              self.current_rows)
+        from sql_editor.utils.export import detect_format
+        fmt, compression = detect_format(file_path)
+        if fmt is None:
+            if "NDJSON" in selected_filter:
+                fmt = "ndjson"
+            elif "JSON" in selected_filter:
+                fmt = "json"
             else:
-                if not file_path.endswith('.json'): file_path += '.json'
-                export_to_json(file_path, self.current_headers,
-                               self.current_rows)
+                fmt = "csv"
+            file_path += f".{fmt}"
 
-            QMessageBox.information(self, "Успех", "Файл успешно сохранен")
+        model = self.result_model
+        if model.canFetchMore() and not (
+                self.current_sql is not None
+                and self.current_db.can_rerun(self.current_sql,
+                                              self.current_params)):
+            # Повторный запрос на другом соединении выполнил бы изменение
+            # еще раз или не увидел бы незафиксированных строк и временных
+            # таблиц - догружаем оставшиеся строки из текущего результата
+            self.status_bar.showMessage("Загрузка всех строк для экспорта...")
+            model.fetch_all()
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка экспорта",
-                                 f"Не удалось сохранить файл:\n{e}")
+        blobs = "base64"
+        if not self.current_rows.value_types().isdisjoint(
+                BINARY_TYPES + (LazyValue,)):
+            from sql_editor.utils.export import blob_directory
+            answer = QMessageBox.question(
+                self, "Экспорт BLOB",
+                "В результате есть значения BLOB. Записать их отдельными "
+                f"файлами в каталог {os.path.basename(blob_directory(file_path))}"
+                "?\n\nНет - значения BLOB пишутся в файл строками base64.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                | QMessageBox.StandardButton.Cancel,
+                QMessageBox.StandardButton.No)
+            if answer == QMessageBox.StandardButton.Cancel:
+                return
+            if answer == QMessageBox.StandardButton.Yes:
+                blobs = "files"
+
+        if model.canFetchMore():
+            # Результат загружен частично - пишем прямо из курсора
+            # отдельного соединения, не загружая все строки в память
+            worker = ExportWorker(
+                file_path, fmt, compression, self.current_headers,
+                db_path=self.current_db.db_path, sql=self.current_sql,
+                profile=self.current_db.profile, batch_size=self.batch_size,
+                parent=self, params=self.current_params, blobs=blobs)
+        else:
+            lazy = LazyValue in self.current_rows.value_types()
+            worker = ExportWorker(
+                file_path, fmt, compression, self.current_headers,
+                rows=self.current_rows,
+                db_path=self.current_db.db_path if lazy else None,
+                profile=self.current_db.profile, batch_size=self.batch_size,
+                parent=self, blobs=blobs)
+
+        worker.progress.connect(
+            lambda count: self.status_bar.showMessage(
+                f"Экспорт: записано строк {count}"))
+        worker.done.connect(self.on_export_done)
+        worker.failed.connect(self.on_export_failed)
+        worker.finished.connect(self.on_export_worker_finished)
+
+        self.export_worker = worker
+        self.btn_export.setEnabled(False)
+        self.status_bar.showMessage("Экспорт...")
+        worker.start()
+
+    def on_export_done(self, count):
+        self.status_bar.showMessage(f"Экспортировано строк: {count}")
+        QMessageBox.information(self, "Успех", "Файл успешно сохранен")
+
+    def on_export_failed(self, error):
+        self.status_bar.showMessage("Ошибка экспорта")
+        QMessageBox.critical(self, "Ошибка экспорта",
+                             f"Не удалось сохранить файл:\n{error}")
+
+    def on_export_worker_finished(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.btn_export.setEnabled(bool(self.current_rows))
+
+    def on_import_clicked(self):
+        if self.import_worker is not None:
+            self.status_bar.showMessage("Импорт уже выполняется")
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт данных", "", DATA_FILE_FILTER)
+        if not file_path:
+            return
+
+        from sql_editor.ui.import_dialog import ImportDialog
+        dialog = ImportDialog(file_path, self)
+        if not dialog.exec() or not dialog.table_name():
+            return
+
+        worker = ImportWorker(self.db.db_path, file_path, dialog.table_name(),
+                              dialog.index_columns(), dialog.batch_size(),
+                              self.db.profile, self)
+        worker.progress.connect(
+            lambda count: self.status_bar.showMessage(
+                f"Импорт: загружено строк {count}"))
+        worker.done.connect(self.on_import_done)
+        worker.failed.connect(self.on_import_failed)
+        worker.finished.connect(self.on_import_worker_finished)
+
+        self.import_worker = worker
+        self.btn_import.setEnabled(False)
+        self.status_bar.showMessage("Импорт...")
+        worker.start()
+
+    def on_import_done(self, count):
+        self.status_bar.showMessage(f"Импортировано строк: {count}")
+        if not self.is_query_running():
+            self.update_tree_structure()
+        QMessageBox.information(self, "Успех",
+                                f"Загружено строк: {count}")
+
+    def on_import_failed(self, error):
+        self.status_bar.showMessage("Ошибка импорта")
+        QMessageBox.critical(self, "Ошибка импорта",
+                             f"Не удалось загрузить файл:\n{error}")
+
+    def on_import_worker_finished(self):
+        self.import_worker.deleteLater()
+        self.import_worker = None
+        self.btn_import.setEnabled(
+            self.db.connection is not None and not self.db.profile["read_only"])
 
     def on_run_clicked(self):
+        if self.is_query_running():
+            self.status_bar.showMessage("Запрос уже выполняется")
+            return
+
         sql = self.query_editor.toPlainText().strip()
-        if not sql:
+        statements = split_statements(sql)
+        if not statements:
             QMessageBox.warning(self, "Внимание", "Пустой запрос")
             return
+        if not self.confirm_discard_edits():
+            return
+
+        self.update_parameters()
+        params = self.param_panel.params()
+        if params is not None and len(statements) > 1:
+            QMessageBox.warning(
+                self, "Внимание",
+                "Параметры поддерживаются только для одного оператора")
+            return
+
+        # Запрос выполняется в фоне, окно остается отзывчивым
+        if len(statements) > 1:
+            self.query_worker = ScriptWorker(
+                self.db, sql, not self.chk_continue.isChecked(), self)
+            self.query_worker.scriptFinished.connect(self.on_script_finished)
+        else:
+            self.query_worker = QueryWorker(
+                self.db, statements[0], self.batch_size, self, params)
+            self.query_worker.resultReady.connect(self.on_query_finished)
+        self._start_query_worker()
 
+    def run_query(self, db, sql, params=None):
+        """Выполнение одного оператора в фоне (без текста редактора)"""
+        self.query_worker = QueryWorker(db, sql, self.batch_size, self, params)
+        self.query_worker.resultReady.connect(self.on_query_finished)
+        self._start_query_worker()
+
+    def _start_query_worker(self):
+        self.query_worker.failed.connect(self.on_query_failed)
+        self.query_worker.progress.connect(self.on_query_progress)
+        self.query_worker.finished.connect(self.on_worker_finished)
+
+        self.btn_run.setEnabled(False)
+        self.btn_explain.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status_bar.showMessage("Выполнение запроса...")
+        self.query_worker.start()
+        self.update_transaction_state()
+
+    def on_explain_clicked(self, bytecode=False):
+        """Построение плана запроса и подсказок по индексам"""
+        if self.is_query_running():
+            self.status_bar.showMessage("Запрос уже выполняется")
+            return
+
+        statements = split_statements(self.query_editor.toPlainText())
+        if len(statements) != 1:
+            QMessageBox.warning(self, "Внимание",
+                                "Для плана нужен ровно один оператор")
+            return
+        sql = statements[0]
+        self.update_parameters()
+        params = self.param_panel.params()
+
+        from sql_editor.db.plan import build_plan, suggest_indexes
         try:
-            # Чистый вызов логики
-            headers, rows = self.db.execute_query(sql)
+            roots = build_plan(self.db.explain(sql, params))
+            suggestions = suggest_indexes(sql, roots, self.db.schema)
+            code = self.db.explain_bytecode(sql, params) if bytecode else None
+        except (sqlite3.Error, ConnectionError) as e:
+            QMessageBox.critical(self, "SQL Ошибка",
+                                 f"Не удалось построить план:\n{e}")
+            return
 
-            # Успех
-            self.status_bar.showMessage("Запрос выполнен")
-            self.fill_table(headers, rows)
-            self.update_tree_structure()
+        self.plan_view.set_plan(roots, suggestions, code)
+        self.result_tabs.setCurrentWidget(self.plan_view)
+        warnings = sum(1 for root in roots for node in root.walk()
+                       if node.warning)
+        self.status_bar.showMessage(
+            f"План построен: замечаний {warnings}, "
+            f"предложено индексов {len(suggestions)}")
 
-            if not headers:  # Если это был не SELECT
-                QMessageBox.information(self, "Успех",
-                                        "Операция выполнена успешно")
+    def on_insert_index_sql(self, sql):
+        self.query_editor.setPlainText(sql)
+        self.query_editor.setFocus()
 
-        except sqlite3.Error as e:
+    def update_parameters(self):
+        """Обновление панели параметров по тексту запроса"""
+        from sql_editor.utils.params import parameter_names
+        self.param_timer.stop()
+        names, named = parameter_names(self.query_editor.toPlainText())
+        self.param_panel.set_parameters(names, named)
+
+    def on_run_many_from_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Наборы параметров", "", DATA_FILE_FILTER)
+        if file_path:
+            from sql_editor.utils.params import file_parameters
+            self.run_many(lambda names, named: file_parameters(
+                file_path, names, named))
+
+    def on_run_many_from_clipboard(self):
+        text = QApplication.clipboard().text()
+        if not text.strip():
+            QMessageBox.warning(self, "Внимание", "Буфер обмена пуст")
+            return
+        from sql_editor.utils.params import clipboard_parameters
+        self.run_many(lambda names, named: clipboard_parameters(
+            text, names, named))
+
+    def run_many(self, make_parameters):
+        """
+        Выполнение оператора для каждого набора параметров.
+        make_parameters(names, named) возвращает итератор наборов.
+        """
+        if self.db.connection is None:
+            QMessageBox.warning(self, "Внимание", "Нет подключения к БД")
+            return
+        if self.is_query_running():
+            self.status_bar.showMessage("Запрос уже выполняется")
+            return
+
+        statements = split_statements(self.query_editor.toPlainText())
+        if len(statements) != 1:
+            QMessageBox.warning(self, "Внимание",
+                                "Нужен ровно один оператор с параметрами")
+            return
+        from sql_editor.utils.params import parameter_names
+        names, named = parameter_names(statements[0])
+        if not names:
+            QMessageBox.warning(self, "Внимание", "В запросе нет параметров")
+            return
+
+        try:
+            parameters = make_parameters(names, named)
+        except ValueError as e:
+            QMessageBox.warning(self, "Внимание", str(e))
+            return
+
+        self.query_worker = ManyWorker(self.db, statements[0], parameters, self)
+        self.query_worker.executed.connect(
+            lambda count: self.status_bar.showMessage(
+                f"Выполнено наборов параметров: {count}"))
+        self.query_worker.manyFinished.connect(self.on_many_finished)
+        self._start_query_worker()
+
+    def on_many_finished(self, executed, changed):
+        self.status_bar.showMessage(
+            f"Выполнено наборов: {executed}, изменено строк: {changed}")
+        self.update_tree_structure()
+        QMessageBox.information(
+            self, "Успех",
+            f"Оператор выполнен для {executed} наборов параметров")
+
+    def is_query_running(self):
+        return self.query_worker is not None and self.query_worker.isRunning()
+
+    def on_cancel_clicked(self):
+        if self.is_query_running():
+            self.query_worker.cancel()
+            self.status_bar.showMessage("Отмена запроса...")
+
+    def on_query_progress(self, elapsed, steps):
+        self.status_bar.showMessage(
+            f"Выполняется: {elapsed:.1f} с, шагов VM: {steps}")
+
+    def on_query_finished(self, result, rows):
+        # Запоминаем запрос, чтобы экспорт мог выполнить его повторно
+        sql = self.query_worker.sql
+        self.current_sql = sql if result.headers else None
+        self.current_params = params = self.query_worker.params
+        self.current_db = db = self.query_worker.db
+
+        # Успех
+        self._clear_extra_result_tabs()
+        self.result_tabs.setCurrentWidget(self.result_page)
+        profile = result.profile
+        self.status_bar.showMessage(
+            f"Запрос выполнен за {profile.wall_time * 1000:.1f} мс"
+            if profile is not None else "Запрос выполнен")
+        self.fill_table(result.headers, rows, result, edit_sql=sql,
+                        reload=lambda: self.run_query(db, sql, params))
+        self.update_tree_structure()
+
+        if not result.headers:  # Если это был не SELECT
+            QMessageBox.information(self, "Успех",
+                                    "Операция выполнена успешно")
+
+    def on_script_finished(self, results):
+        # Все наборы строк скрипта уже загружены целиком
+        self.current_sql = None
+        self._clear_extra_result_tabs()
+
+        result_sets = [r for r in results if r.headers]
+        if result_sets:
+            self.fill_table(result_sets[0].headers, result_sets[0].rows)
+        else:
+            self.fill_table([], [])
+
+        for number, result in enumerate(result_sets[1:], start=2):
+            model = ResultTableModel(self)
+            view = self._create_result_view(model)
+            model.set_result(result.headers, result.rows)
+            self.result_tabs.addTab(view, f"Результат {number}")
+
+        lines = []
+        for number, result in enumerate(results, start=1):
+            sql = " ".join(result.sql.split())
+            if len(sql) > 80:
+                sql = sql[:77] + "..."
+            if result.error is not None:
+                status = f"ошибка: {result.error}"
+            elif result.headers:
+                status = f"строк: {len(result.rows)}"
+            elif result.rowcount >= 0:
+                status = f"затронуто строк: {result.rowcount}"
+            else:
+                status = "выполнено"
+            lines.append(f"{number}. {sql} — {status}, "
+                         f"{result.elapsed * 1000:.1f} мс")
+        self.messages_view.setPlainText("\n".join(lines))
+
+        failed = [r for r in results if r.error is not None]
+        total = sum(r.elapsed for r in results)
+        self.status_bar.showMessage(
+            f"Выполнено операторов: {len(results) - len(failed)} из "
+            f"{len(results)}, {total * 1000:.1f} мс")
+        self.result_tabs.setCurrentWidget(
+            self.result_page if result_sets and not failed
+            else self.messages_view)
+        self.update_tree_structure()
+        self.refresh_profiler()
+
+        if failed and self.query_worker.stop_on_error:
+            if results[-1].rolled_back:
+                outcome = ", изменения отменены"
+            elif self.db.in_transaction:
+                outcome = ", транзакция остается открытой"
+            else:
+                outcome = ""
+            QMessageBox.critical(
+                self, "SQL Ошибка",
+                f"Ошибка в операторе {len(results)}{outcome}:\n"
+                f"{failed[0].error}")
+
+    def _clear_extra_result_tabs(self):
+        while self.result_tabs.count() > FIXED_RESULT_TABS:
+            view = self.result_tabs.widget(FIXED_RESULT_TABS)
+            self.result_tabs.removeTab(FIXED_RESULT_TABS)
+            view.deleteLater()
+
+    def on_query_failed(self, error):
+        self.refresh_profiler()
+        if self.query_worker is not None and self.query_worker.cancelled:
+            self.status_bar.showMessage("Запрос отменен")
+        elif isinstance(error, sqlite3.Error):
             self.status_bar.showMessage("Ошибка SQL")
             QMessageBox.critical(self, "SQL Ошибка",
-                                 f"Синтаксическая ошибка или ошибка БД:\n{e}")
-        except ConnectionError as e:
-            QMessageBox.warning(self, "Ошибка соединения", str(e))
-        except Exception as e:
-            QMessageBox.critical(self, "Критическая ошибка", str(e))
+                                 f"Синтаксическая ошибка или ошибка БД:\n{error}")
+        elif isinstance(error, ConnectionError):
+            QMessageBox.warning(self, "Ошибка соединения", str(error))
+        else:
+            QMessageBox.critical(self, "Критическая ошибка", str(error))
+
+    def on_worker_finished(self):
+        self.query_worker.deleteLater()
+        self.query_worker = None
+        self.btn_cancel.setEnabled(False)
+        self.btn_run.setEnabled(self.db.connection is not None)
+        self.btn_explain.setEnabled(self.db.connection is not None)
+        self.update_transaction_state()
+
+    def stop_query(self):
+        """Отмена текущего запроса с ожиданием завершения потока"""
+        if self.is_query_running():
+            self.query_worker.cancel()
+            self.query_worker.wait()
+
+    def stop_export(self):
+        """Прерывание экспорта с ожиданием завершения потока"""
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.cancel()
+            self.export_worker.wait()
+
+    def stop_import(self):
+        """Прерывание импорта (транзакция откатывается) с ожиданием потока"""
+        if self.import_worker is not None and self.import_worker.isRunning():
+            self.import_worker.cancel()
+            self.import_worker.wait()
+
+    def stop_restore(self):
+        """Ожидание фонового подключения; не переданные окну БД закрываются"""
+        worker = self.restore_worker
+        if worker is not None:
+            worker.wait()
+            for db, _, _ in worker.targets:
+                if db not in self.databases:
+                    db.close()
+
+    def closeEvent(self, event):
+        # Не даем потокам пережить окно
+        self.stop_query()
+
+        if not self.confirm_discard_edits():
+            event.ignore()
+            return
+
+        # Не теряем незафиксированные изменения молча
+        if not self.confirm_pending_transaction():
+            event.ignore()
+            return
+
+        # То же для остальных открытых БД
+        for db in list(self.databases):
+            if db.is_dirty():
+                self.set_active_database(db)
+                if not self.confirm_pending_transaction():
+                    event.ignore()
+                    return
+
+        self.stop_export()
+        self.stop_import()
+        self.stop_restore()
+        self.settings.setValue("editor_text", self.query_editor.toPlainText())
+        for db in self.databases:
+            db.close()
+        if self.history is not None:
+            # Дописываем накопленные запросы
+            self.history.close()
+            self.history = None
+        super().closeEvent(event)
+
+    def open_history(self):
+        """Открытие базы истории запросов в каталоге данных приложения"""
+        from sql_editor.db.history import QueryHistory
+        location = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppDataLocation)
+        try:
+            os.makedirs(location, exist_ok=True)
+            history = QueryHistory(os.path.join(location, HISTORY_FILE))
+        except (OSError, sqlite3.Error):
+            # Без истории редактор продолжает работать
+            history = None
+        self.history = history
+        for db in self.databases + [self.db]:
+            db.history = history
+        self.history_view.set_history(history)
+
+    def on_left_tab_changed(self, index):
+        if self.left_tabs.widget(index) is self.history_view:
+            self.history_view.refresh()
+
+    def on_history_activated(self, sql):
+        self.query_editor.setPlainText(sql)
+        self.query_editor.setFocus()
 
     def on_tree_item_clicked(self, item):
-        if item.parent():
-            table_name = item.text(0)
-            self.query_editor.setPlainText(f"SELECT * FROM {table_name};")
-            self.on_run_clicked()
+        # Щелчок по любому узлу делает его БД текущей
+        db = self._item_database(item)
+        if db is not None and db is not self.db:
+            if self.is_query_running():
+                self.status_bar.showMessage("Запрос уже выполняется")
+                return
+            self.set_active_database(db)
+
+        kind, name = item.data(0, TREE_NODE_ROLE) or (None, None)
+        if kind in ("table", "view") and not self.is_query_running():
+            self.preview_table(name)
+
+    def preview_table(self, name, sample=False):
+        """
+        Просмотр таблицы текущей БД: первая порция по rowid сразу, остальные
+        при прокрутке (или случайная выборка строк). Представления и
+        таблицы WITHOUT ROWID выполняются обычным запросом в фоне
+        """
+        if not self.confirm_discard_edits():
+            return
+        from sql_editor.db.preview import (
+            SAMPLE_ROWS, TablePreview, sample_rows
+        )
+        sql = f"SELECT * FROM {quote_identifier(name)};"
+        self.query_editor.setPlainText(sql)
+        source = None
+        try:
+            if sample:
+                headers, rows = sample_rows(self.db, name, SAMPLE_ROWS)
+            else:
+                source = TablePreview(self.db, name, self.batch_size)
+                headers, rows = source.headers, source.fetch()
+        except ValueError as e:
+            if sample:
+                QMessageBox.warning(self, "Внимание", str(e))
+            else:
+                self.on_run_clicked()
+            return
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Ошибка SQL", str(e))
+            return
+
+        # Экспорт частично загруженного просмотра выполнит запрос целиком,
+        # выборка уже загружена полностью
+        self.current_sql = sql if source is not None else None
+        self.current_params = None
+        self.current_db = self.db
+        self._clear_extra_result_tabs()
+        self.result_tabs.setCurrentWidget(self.result_page)
+        # После правок выборки показывается таблица с начала: новая
+        # случайная выборка не содержала бы измененных строк
+        self.fill_table(headers, rows, source, edit_sql=sql,
+                        reload=lambda: self.preview_table(name))
+        if sample:
+            self.status_bar.showMessage(
+                f"Случайная выборка из {name}: строк {len(rows)}")
+
+    def on_tree_context_menu(self, pos):
+        item = self.tree_widget.itemAt(pos)
+        db = self._item_database(item) if item is not None else None
+        if db is None:
+            return
+        menu = QMenu(self)
+        kind, name = item.data(0, TREE_NODE_ROLE) or (None, None)
+        action_sample = None
+        if kind == "table":
+            from sql_editor.db.preview import SAMPLE_ROWS
+            action_sample = menu.addAction(
+                f"Случайная выборка ({SAMPLE_ROWS} строк)")
+            action_sample.setEnabled(not self.is_query_running())
+            menu.addSeparator()
+        action_close = menu.addAction("Отключить БД")
+        action = menu.exec(self.tree_widget.viewport().mapToGlobal(pos))
+        if action is action_close:
+            self.close_database(db)
+        elif action is not None and action is action_sample:
+            self.set_active_database(db)
+            self.preview_table(name, sample=True)
+
+    def on_result_context_menu(self, pos):
+        index = self.result_table.indexAt(pos)
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        action_view = menu.addAction("Просмотр значения...")
+        action_view.setEnabled(is_long(self.result_model.value(index)))
+        if menu.exec(self.result_table.viewport().mapToGlobal(pos)) \
+                is action_view:
+            self.show_value(index)
+
+    def on_result_double_clicked(self, index):
+        # Редактируемая ячейка открывает редактор, а BLOB, заглушка длинного
+        # значения и длинный текст без правки - окно просмотра
+        value = self.result_model.value(index)
+        if isinstance(value, BINARY_TYPES + (LazyValue,)) or (
+                is_long(value) and not (
+                    self.result_model.flags(index)
+                    & Qt.ItemFlag.ItemIsEditable)):
+            self.show_value(index)
+
+    def show_value(self, index):
+        """Окно просмотра значения ячейки (HEX, текст, изображение)"""
+        from sql_editor.ui.blob_viewer import BlobViewer
+        value = self.result_model.value(index)
+        if isinstance(value, LazyValue) and self.is_database_busy(value.db):
+            # Значение читается через соединение, занятое фоновым запросом
+            self.status_bar.showMessage(
+                "Значение будет доступно после завершения запроса")
+            return
+        title = self.current_headers[index.column()]
+        try:
+            viewer = BlobViewer(value, title, self)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Ошибка",
+                                 f"Не удалось прочитать значение:\n{e}")
+            return
+        viewer.exec()
+
+    def _tree_root(self, db):
+        """Корневой узел дерева для БД (None, если его еще нет)"""
+        for i in range(self.tree_widget.topLevelItemCount()):
+            root = self.tree_widget.topLevelItem(i)
+            if root.data(0, TREE_NODE_ROLE) == ("database", db.db_path):
+                return root
+        return None
 
-    def update_tree_structure(self):
-        self.tree_widget.clear()
-        if not self.db.db_path: return
+    def _item_database(self, item):
+        """БД, к которой относится узел дерева"""
+        while item.parent() is not None:
+            item = item.parent()
+        _, path = item.data(0, TREE_NODE_ROLE)
+        for db in self.databases:
+            if db.db_path == path:
+                return db
+        return None
 
-        db_name = os.path.basename(self.db.db_path)
-        root = QTreeWidgetItem(self.tree_widget, [db_name])
+    def _mark_active_root(self):
+        """Текущая БД выделяется в дереве полужирным шрифтом"""
+        for i in range(self.tree_widget.topLevelItemCount()):
+            root = self.tree_widget.topLevelItem(i)
+            font = root.font(0)
+            font.setBold(
+                root.data(0, TREE_NODE_ROLE) == ("database", self.db.db_path))
+            root.setFont(0, font)
 
-        tables = self.db.get_tables()
-        for table in tables:
-            QTreeWidgetItem(root, [table])
+    def update_tree_structure(self, db=None):
+        db = db or self.db
+        if not db.db_path:
+            return
+        root = self._tree_root(db)
+        # Узел БД перестраивается, только если изменилась ее схема;
+        # после изменения данных обновляются только оценки числа строк
+        if not db.schema.refresh() and root is not None:
+            if db.schema.estimates_stale():
+                self._update_row_estimates(root, db)
+            return
+
+        if root is None:
+            root = QTreeWidgetItem(
+                self.tree_widget, [os.path.basename(db.db_path)])
+            root.setData(0, TREE_NODE_ROLE, ("database", db.db_path))
+        else:
+            root.takeChildren()
+        mode = "WAL, параллельное чтение" if db.pool.parallel_reads \
+            else "одно соединение"
+        root.setToolTip(0, f"{db.db_path}\n{mode}")
+
+        for kind in OBJECT_TYPES:
+            count = len(db.schema.objects(kind))
+            if not count:
+                continue
+            group = QTreeWidgetItem(
+                root, [f"{OBJECT_GROUP_TITLES[kind]} ({count})"])
+            group.setData(0, TREE_NODE_ROLE, ("group", kind))
+            self._set_lazy(group)
+            # Таблицы видны сразу, как и раньше
+            if kind == "table":
+                group.setExpanded(True)
         root.setExpanded(True)
+        self._mark_active_root()
+
+    @staticmethod
+    def _set_lazy(item):
+        """Узел со стрелкой раскрытия, дочерние элементы которого еще не загружены"""
+        item.setChildIndicatorPolicy(
+            QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+
+    @staticmethod
+    def _show_row_estimate(item, table, estimate):
+        """Подпись узла таблицы с оценкой числа строк"""
+        if estimate is None:
+            item.setText(0, table)
+            item.setToolTip(0, "")
+            return
+        item.setText(0, f"{table} (≈ {format_count(estimate[0])})")
+        item.setToolTip(0, ROW_ESTIMATE_HINTS[estimate[1]])
 
-    def fill_table(self, headers, rows):
+    def _update_row_estimates(self, root, db):
+        """Новые оценки числа строк в уже показанных узлах таблиц"""
+        if self.is_database_busy(db):
+            return
+        for i in range(root.childCount()):
+            group = root.child(i)
+            if group.data(0, TREE_NODE_ROLE) != ("group", "table") \
+                    or not group.childCount():
+                continue
+            estimates = db.schema.row_estimates(db.schema.tables())
+            for j in range(group.childCount()):
+                child = group.child(j)
+                _, table = child.data(0, TREE_NODE_ROLE)
+                self._show_row_estimate(child, table, estimates.get(table))
+
+    def on_tree_item_expanded(self, item):
+        if item.childCount():
+            return
+
+        # Соединение занято фоновым запросом - не блокируем интерфейс
+        db = self._item_database(item)
+        if db is None or self.is_database_busy(db):
+            item.setExpanded(False)
+            self.status_bar.showMessage(
+                "Структура будет доступна после завершения запроса")
+            return
+
+        kind, name = item.data(0, TREE_NODE_ROLE) or (None, None)
+        schema = db.schema
+
+        if kind == "group":
+            # Число строк таблиц - оценка без COUNT(*), см. row_estimates
+            estimates = schema.row_estimates(schema.tables()) \
+                if name == "table" else {}
+            for obj_name, table in schema.objects(name):
+                text = obj_name if name in ("table", "view") \
+                    else f"{obj_name} → {table}"
+                child = QTreeWidgetItem(item, [text])
+                child.setData(0, TREE_NODE_ROLE, (name, obj_name))
+                if name == "table":
+                    self._show_row_estimate(child, obj_name,
+                                            estimates.get(obj_name))
+                if name in ("table", "view"):
+                    self._set_lazy(child)
+
+        elif kind in ("table", "view"):
+            for _, col_name, col_type, notnull, _, pk in schema.columns(name):
+                text = f"{col_name} {col_type}".rstrip()
+                if pk:
+                    text += " 🔑"
+                elif notnull:
+                    text += " NOT NULL"
+                child = QTreeWidgetItem(item, [text])
+                child.setData(0, TREE_NODE_ROLE, ("column", col_name))
+
+            for _, index_name, unique, _, _ in schema.indexes(name):
+                columns = ", ".join(schema.index_columns(index_name))
+                prefix = "UNIQUE " if unique else ""
+                child = QTreeWidgetItem(
+                    item, [f"{prefix}INDEX {index_name} ({columns})"])
+                child.setData(0, TREE_NODE_ROLE, ("index", index_name))
+
+        if not item.childCount():
+            item.setChildIndicatorPolicy(
+                QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicator)
+
+    def fill_table(self, headers, rows, result=None, edit_sql=None,
+                   reload=None):
+        """
+        Показ результата. edit_sql - запрос, по которому определяется,
+        можно ли править результат; reload - перезагрузка после правок
+        """
         self.current_headers = headers
-        self.current_rows = rows
-        self.btn_export.setEnabled(bool(rows))
+        self.current_from_cache = bool(result and result.from_cache)
+        self.current_profile = result.profile if result is not None else None
+        self.btn_export.setEnabled(bool(rows) and self.export_worker is None)
+
+        # Сбрасываем индикатор сортировки, чтобы новый результат
+        # отображался в исходном порядке
+        self.result_table.horizontalHeader().setSortIndicator(
+            -1, Qt.SortOrder.AscendingOrder)
+        self.result_model.set_result(headers, rows, result)
+        # Строки хранятся по столбцам в модели; экспорт берет их оттуда же
+        self.current_rows = self.result_model.rows()
+        self.filter_bar.set_headers(headers)
+
+        target = None
+        db = self.current_db
+        if edit_sql and headers and not db.profile["read_only"]:
+            try:
+                # Просмотр таблицы передает rowid скрытым столбцом ключа
+                target = edit_target(db, edit_sql, headers,
+                                     getattr(result, "key_columns", ()))
+            except sqlite3.Error:
+                target = None
+        self.current_reload = reload if target is not None else None
+        self.result_model.set_pending(
+            PendingChanges(target) if target is not None else None)
+        self.edit_bar.setVisible(target is not None)
+        if target is not None:
+            key = ", ".join(target.key_columns)
+            self.edit_label.setText(f"Правка таблицы {target.table}")
+            self.edit_label.setToolTip(
+                f"Строки находятся по ключу: {key}. Правки записываются "
+                f"кнопкой \"Применить\"")
+
+    def on_filter_changed(self, row_filter):
+        model = self.result_model
+        if row_filter is not None and model.canFetchMore():
+            self.status_bar.showMessage("Загрузка всех строк для фильтра...")
+        model.set_filter(row_filter)
+        self.filter_bar.set_counts(model.shown_count(), model.total_count())
+
+    def on_pending_changed(self, count):
+        self.btn_apply_edits.setText(f"✔ Применить ({count})")
+        self.btn_apply_edits.setEnabled(count > 0)
+        self.btn_discard_edits.setEnabled(count > 0)
 
-        if not headers:
-            self.result_table.clear()
-            self.result_table.setRowCount(0)
-            self.result_table.setColumnCount(0)
+    def confirm_discard_edits(self):
+        """
+        Вопрос о неприменённых правках перед заменой результата.
+        Возвращает False, если пользователь отменил действие
+        """
+        pending = self.result_model.pending()
+        if not pending:
+            return True
+        answer = QMessageBox.question(
+            self, "Неприменённые правки",
+            f"Правок результата, не записанных в БД: {len(pending)}. "
+            f"Применить их?",
+            QMessageBox.StandardButton.Apply |
+            QMessageBox.StandardButton.Discard |
+            QMessageBox.StandardButton.Cancel)
+        if answer == QMessageBox.StandardButton.Cancel:
+            return False
+        if answer == QMessageBox.StandardButton.Apply:
+            return self.apply_edits(reload=False)
+        self.result_model.discard_pending()
+        return True
+
+    def on_add_row_clicked(self):
+        row = self.result_model.insert_row()
+        index = self.result_model.index(row, 0)
+        self.result_table.scrollTo(index)
+        self.result_table.setCurrentIndex(index)
+        self.result_table.edit(index)
+
+    def on_delete_rows_clicked(self):
+        rows = {index.row() for index in
+                self.result_table.selectionModel().selectedIndexes()}
+        if not rows and self.result_table.currentIndex().isValid():
+            rows = {self.result_table.currentIndex().row()}
+        self.result_model.delete_rows(rows)
+
+    def on_apply_edits_clicked(self):
+        self.apply_edits()
+
+    def apply_edits(self, reload=True):
+        """
+        Запись правок результата. При ошибке правки остаются в буфере.
+        Возвращает True, если правки записаны
+        """
+        if self.is_query_running():
+            self.status_bar.showMessage("Запрос уже выполняется")
+            return False
+        try:
+            changed = self.result_model.apply_pending()
+        except (sqlite3.Error, ValueError, ConnectionError) as e:
+            QMessageBox.critical(self, "Изменения не применены",
+                                 f"Ни одна правка не записана:\n{e}")
+            return False
+        self.status_bar.showMessage(f"Правки записаны, изменено строк: {changed}")
+        self.update_transaction_state()
+        if reload and self.current_reload is not None:
+            self.current_reload()
+        return True
+
+    def on_fetch_progress(self, count, done):
+        if not self.current_headers:
             return
+        message = f"Получено строк: {count}"
+        profile = self.current_profile
+        if profile is not None:
+            message += (f" за {profile.wall_time * 1000:.1f} мс "
+                        f"({profile.rows_per_sec:.0f} строк/с)")
+        if done and self.current_from_cache:
+            cache = (self.current_db or self.db).result_cache
+            message += (f" (из кэша; попаданий: {cache.hits}, "
+                        f"промахов: {cache.misses})")
+        elif not done:
+            message += " (прокрутите для загрузки)"
+        self.status_bar.showMessage(message)
+        self.refresh_profiler()
 
-        self.result_table.setColumnCount(len(headers))
-        self.result_table.setHorizontalHeaderLabels(headers)
-        self.result_table.setRowCount(len(rows))
+    def refresh_profiler(self):
+        """Обновление истории профилей (только если вкладка открыта)"""
+        if self.result_tabs.currentWidget() is self.profiler_view:
+            self.profiler_view.set_profiles(self.db.profiles)
+
+    def on_export_profiles(self):
+        if not len(self.db.profiles):
+            QMessageBox.warning(self, "Ошибка", "История профилей пуста")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт профилей", "profile.json", "JSON Files (*.json)")
+        if not file_path:
+            return
+        try:
+            self.db.profiles.export_json(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка экспорта",
+                                 f"Не удалось сохранить файл:\n{e}")
+            return
+        self.status_bar.showMessage(
+            f"Сохранено профилей: {len(self.db.profiles)}")
 
-        for r, row_data in enumerate(rows):
-            for c, value in enumerate(row_data):
-                self.result_table.setItem(r, c, QTableWidgetItem(str(value)))
+    def on_clear_profiles(self):
+        self.db.profiles.clear()
+        self.refresh_profiler()
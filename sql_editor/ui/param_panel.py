@@ -0,0 +1,76 @@
+from PyQt6.QtWidgets import (
+    QHeaderView, QLabel, QMenu, QTableWidget, QTableWidgetItem, QToolButton,
+    QVBoxLayout, QWidget
+)
+from PyQt6.QtCore import Qt
+
+
+class ParameterPanel(QWidget):
+    """
+    Панель значений параметров запроса (?, :name, @name, $name).
+    Значения сохраняются по именам, пока параметр остается в запросе.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.named = False
+        self._values = {}
+
+        self.table = QTableWidget(0, 2)
+        self.table.setHorizontalHeaderLabels(["Параметр", "Значение"])
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setToolTip(
+            "NULL - пустое значение, числа передаются числами, "
+            "'текст в кавычках' - всегда строкой")
+        self.table.itemChanged.connect(self._on_item_changed)
+
+        # Выполнение оператора для списка наборов параметров
+        self.btn_many = QToolButton()
+        self.btn_many.setText("▶▶ Выполнить для списка")
+        self.btn_many.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        menu = QMenu(self.btn_many)
+        self.action_from_file = menu.addAction("Из файла (CSV, NDJSON)...")
+        self.action_from_clipboard = menu.addAction("Из буфера обмена")
+        self.btn_many.setMenu(menu)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(QLabel("Параметры запроса"))
+        layout.addWidget(self.table)
+        layout.addWidget(self.btn_many)
+
+    def set_parameters(self, names, named):
+        """Обновление списка параметров с сохранением введенных значений"""
+        if names == self.names and named == self.named:
+            return
+        self.names = names
+        self.named = named
+
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(names))
+        for row, name in enumerate(names):
+            label = QTableWidgetItem(f":{name}" if named else f"?{name}")
+            label.setFlags(label.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.table.setItem(row, 0, label)
+            self.table.setItem(row, 1, QTableWidgetItem(
+                self._values.get(name, "NULL")))
+        self.table.blockSignals(False)
+        self.setVisible(bool(names))
+
+    def _on_item_changed(self, item):
+        if item.column() == 1:
+            self._values[self.names[item.row()]] = item.text()
+
+    def params(self):
+        """Значения параметров для sqlite3 или None, если их нет"""
+        if not self.names:
+            return None
+        # Модуль параметров тянет за собой импорт файлов - загружаем его
+        # не при запуске, а при первом выполнении запроса с параметрами
+        from sql_editor.utils.params import bind_values, parse_value
+        values = [parse_value(self._values.get(name, "NULL"))
+                  for name in self.names]
+        return bind_values(self.names, self.named, values)
@@ -0,0 +1,101 @@
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QHeaderView, QLabel, QPlainTextEdit, QPushButton, QSplitter,
+    QTableView, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QBrush, QColor
+from sql_editor.ui.result_model import ResultTableModel
+
+# Цвет строк плана с замечаниями (читается в обеих темах)
+WARNING_COLOR = QColor("#e5a50a")
+
+
+class PlanView(QWidget):
+    """Дерево EXPLAIN QUERY PLAN, подсказки по индексам и байт-код EXPLAIN"""
+
+    # Текст CREATE INDEX для вставки в редактор
+    insertRequested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Шаг плана", "Замечание"])
+        self.tree.header().setSectionResizeMode(
+            0, QHeaderView.ResizeMode.Stretch)
+
+        self.hints = QPlainTextEdit()
+        self.hints.setReadOnly(True)
+        self.btn_insert = QPushButton("Вставить в редактор")
+        self.btn_insert.setEnabled(False)
+        self.btn_insert.clicked.connect(
+            lambda: self.insertRequested.emit(self._index_sql))
+        self._index_sql = ""
+
+        self.bytecode_model = ResultTableModel(self)
+        self.bytecode_view = QTableView()
+        self.bytecode_view.setModel(self.bytecode_model)
+        self.bytecode_view.verticalHeader().setVisible(False)
+        self.bytecode_view.setVisible(False)
+
+        hints_panel = QWidget()
+        hints_layout = QVBoxLayout(hints_panel)
+        hints_layout.setContentsMargins(0, 0, 0, 0)
+        hints_header = QHBoxLayout()
+        hints_header.addWidget(QLabel("Подсказки по индексам"))
+        hints_header.addStretch()
+        hints_header.addWidget(self.btn_insert)
+        hints_layout.addLayout(hints_header)
+        hints_layout.addWidget(self.hints)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        splitter.addWidget(self.tree)
+        splitter.addWidget(hints_panel)
+        splitter.addWidget(self.bytecode_view)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(splitter)
+
+    def set_plan(self, roots, suggestions, bytecode=None):
+        """
+        Отображение плана: roots - корневые PlanNode, suggestions -
+        IndexSuggestion, bytecode - (заголовки, строки) EXPLAIN или None.
+        """
+        self.tree.clear()
+        brush = QBrush(WARNING_COLOR)
+
+        def add(parent, node):
+            item = QTreeWidgetItem(parent, [node.detail, node.warning or ""])
+            if node.warning:
+                item.setForeground(0, brush)
+                item.setForeground(1, brush)
+            for child in node.children:
+                add(item, child)
+
+        for root in roots:
+            add(self.tree, root)
+        self.tree.expandAll()
+
+        lines = []
+        statements = []
+        for suggestion in suggestions:
+            if suggestion.existing:
+                lines.append(
+                    f"-- Индекс {suggestion.existing} уже покрывает "
+                    f"{suggestion.table} ({', '.join(suggestion.columns)}), "
+                    f"но не используется: попробуйте выполнить ANALYZE")
+            else:
+                statements.append(suggestion.sql)
+                lines.append(suggestion.sql)
+        if not lines:
+            warnings = any(node.warning for root in roots for node in root.walk())
+            lines.append("-- Подходящих индексов не найдено" if warnings
+                         else "-- Замечаний нет")
+        self.hints.setPlainText("\n".join(lines))
+        self._index_sql = "\n".join(statements)
+        self.btn_insert.setEnabled(bool(statements))
+
+        if bytecode is not None:
+            self.bytecode_model.set_result(*bytecode)
+        else:
+            self.bytecode_model.clear()
+        self.bytecode_view.setVisible(bytecode is not None)
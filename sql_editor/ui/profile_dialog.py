@@ -0,0 +1,141 @@
+from PyQt6.QtWidgets import (
+    QCheckBox, QComboBox, QDialog, QDialogButtonBox, QFormLayout, QGroupBox,
+    QHBoxLayout, QHeaderView, QSpinBox, QTableWidget, QTableWidgetItem,
+    QVBoxLayout
+)
+from sql_editor.db.profiles import (
+    JOURNAL_MODES, PROFILE_PRESETS, SYNCHRONOUS_MODES, TEMP_STORE_MODES,
+    new_profile
+)
+
+# Пункт списка, означающий "оставить значение SQLite по умолчанию"
+KEEP_DEFAULT = "(не менять)"
+
+
+class ConnectionProfileDialog(QDialog):
+    """Настройка профиля соединения и просмотр действующих PRAGMA"""
+
+    def __init__(self, profile, effective, errors=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Настройки соединения")
+        self.resize(640, 480)
+
+        self.combo_preset = QComboBox()
+        self.combo_preset.addItems(PROFILE_PRESETS)
+        self.combo_preset.textActivated.connect(self.apply_preset)
+
+        self.combo_journal = self._combo(JOURNAL_MODES)
+        self.combo_synchronous = self._combo(SYNCHRONOUS_MODES)
+        self.combo_temp_store = self._combo(TEMP_STORE_MODES)
+        # Минимальное значение счетчиков означает "не менять"
+        self.spin_cache = self._spin(0, 1_048_576, " МБ")
+        self.spin_mmap = self._spin(-1, 1_048_576, " МБ")
+        self.spin_busy = self._spin(-1, 600_000, " мс")
+        self.chk_read_only = QCheckBox("Только чтение (mode=ro)")
+        self.chk_immutable = QCheckBox("Неизменяемый файл (immutable=1)")
+
+        form = QFormLayout()
+        form.addRow("Шаблон:", self.combo_preset)
+        form.addRow("journal_mode:", self.combo_journal)
+        form.addRow("synchronous:", self.combo_synchronous)
+        form.addRow("cache_size:", self.spin_cache)
+        form.addRow("mmap_size:", self.spin_mmap)
+        form.addRow("temp_store:", self.combo_temp_store)
+        form.addRow("busy_timeout:", self.spin_busy)
+        form.addRow(self.chk_read_only)
+        form.addRow(self.chk_immutable)
+        profile_box = QGroupBox("Профиль (применяется при подключении)")
+        profile_box.setLayout(form)
+
+        # Текущие значения соединения
+        self.effective_table = QTableWidget(0, 2)
+        self.effective_table.setHorizontalHeaderLabels(["PRAGMA", "Значение"])
+        self.effective_table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch)
+        self.effective_table.verticalHeader().setVisible(False)
+        rows = [(name, str(value)) for name, value in effective.items()]
+        rows += [(name, f"не применено: {error}")
+                 for name, error in (errors or {}).items()]
+        self.effective_table.setRowCount(len(rows))
+        for r, (name, value) in enumerate(rows):
+            self.effective_table.setItem(r, 0, QTableWidgetItem(name))
+            self.effective_table.setItem(r, 1, QTableWidgetItem(value))
+        effective_box = QGroupBox("Действующие настройки")
+        effective_layout = QVBoxLayout(effective_box)
+        effective_layout.addWidget(self.effective_table)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok |
+            QDialogButtonBox.StandardButton.Cancel)
+        buttons.button(QDialogButtonBox.StandardButton.Ok).setText(
+            "Сохранить и переподключить")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        columns = QHBoxLayout()
+        columns.addWidget(profile_box)
+        columns.addWidget(effective_box)
+        layout = QVBoxLayout(self)
+        layout.addLayout(columns)
+        layout.addWidget(buttons)
+
+        self.set_profile(profile)
+
+    @staticmethod
+    def _combo(values):
+        combo = QComboBox()
+        combo.addItems([KEEP_DEFAULT] + values)
+        return combo
+
+    @staticmethod
+    def _spin(minimum, maximum, suffix):
+        spin = QSpinBox()
+        spin.setRange(minimum, maximum)
+        spin.setSuffix(suffix)
+        spin.setSpecialValueText(KEEP_DEFAULT)
+        return spin
+
+    def apply_preset(self, name):
+        self.set_profile(new_profile(
+            PROFILE_PRESETS[name], self.chk_read_only.isChecked(),
+            self.chk_immutable.isChecked()))
+
+    def set_profile(self, profile):
+        pragmas = profile["pragmas"]
+        for combo, name in ((self.combo_journal, "journal_mode"),
+                            (self.combo_synchronous, "synchronous"),
+                            (self.combo_temp_store, "temp_store")):
+            value = pragmas.get(name)
+            combo.setCurrentText(str(value).upper() if value is not None
+                                 else KEEP_DEFAULT)
+
+        # cache_size хранится в КиБ со знаком минус, mmap_size - в байтах
+        cache = pragmas.get("cache_size")
+        self.spin_cache.setValue(
+            -int(cache) // 1024 if cache is not None and int(cache) < 0 else 0)
+        mmap = pragmas.get("mmap_size")
+        self.spin_mmap.setValue(int(mmap) // 1048576 if mmap is not None else -1)
+        busy = pragmas.get("busy_timeout")
+        self.spin_busy.setValue(int(busy) if busy is not None else -1)
+
+        self.chk_read_only.setChecked(profile["read_only"])
+        self.chk_immutable.setChecked(profile["immutable"])
+
+    def profile(self):
+        """Профиль, заданный в диалоге"""
+        pragmas = {}
+        for combo, name in ((self.combo_journal, "journal_mode"),
+                            (self.combo_synchronous, "synchronous"),
+                            (self.combo_temp_store, "temp_store")):
+            if combo.currentText() != KEEP_DEFAULT:
+                pragmas[name] = combo.currentText()
+
+        if self.spin_cache.value() > self.spin_cache.minimum():
+            pragmas["cache_size"] = -self.spin_cache.value() * 1024
+        if self.spin_mmap.value() > self.spin_mmap.minimum():
+            pragmas["mmap_size"] = self.spin_mmap.value() * 1048576
+        if self.spin_busy.value() > self.spin_busy.minimum():
+            pragmas["busy_timeout"] = self.spin_busy.value()
+
+        return new_profile(pragmas, self.chk_read_only.isChecked(),
+                           self.chk_immutable.isChecked())
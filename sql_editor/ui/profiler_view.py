@@ -0,0 +1,108 @@
+from datetime import datetime
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QHeaderView, QPlainTextEdit, QPushButton, QSplitter,
+    QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+
+# Столбцы таблицы истории профилей
+PROFILE_COLUMNS = [
+    "Время", "Запрос", "Всего, мс", "Подготовка, мс", "Выполнение, мс",
+    "Выборка, мс", "Строк", "Строк/с", "Объем, КБ", "Шагов VM", "Источник",
+]
+
+
+class ProfilerView(QWidget):
+    """История профилей запросов с подробностями выбранного запроса"""
+
+    exportRequested = pyqtSignal()
+    clearRequested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._profiles = []
+
+        self.table = QTableWidget(0, len(PROFILE_COLUMNS))
+        self.table.setHorizontalHeaderLabels(PROFILE_COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(
+            QTableWidget.SelectionBehavior.SelectRows)
+        self.table.currentCellChanged.connect(self._show_details)
+
+        # Полный текст запроса и трассировка SQLite выбранной строки
+        self.details = QPlainTextEdit()
+        self.details.setReadOnly(True)
+
+        self.btn_export = QPushButton("Экспорт JSON")
+        self.btn_clear = QPushButton("Очистить")
+        self.btn_export.clicked.connect(self.exportRequested)
+        self.btn_clear.clicked.connect(self.clearRequested)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.btn_export)
+        buttons.addWidget(self.btn_clear)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.details)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(buttons)
+        layout.addWidget(splitter)
+
+    def set_profiles(self, profiles):
+        """Отображение профилей (новые сверху)"""
+        self._profiles = list(profiles)[::-1]
+        self.table.setRowCount(len(self._profiles))
+        for row, profile in enumerate(self._profiles):
+            sql = " ".join(profile.sql.split())
+            if profile.error:
+                source = "ошибка"
+            elif profile.from_cache:
+                source = "кэш"
+            else:
+                source = "БД"
+            values = [
+                datetime.fromtimestamp(profile.started_at).strftime("%H:%M:%S"),
+                sql if len(sql) <= 120 else sql[:117] + "...",
+                f"{profile.wall_time * 1000:.2f}",
+                f"{profile.prepare_time * 1000:.2f}",
+                f"{profile.step_time * 1000:.2f}",
+                f"{profile.fetch_time * 1000:.2f}",
+                str(profile.rows),
+                f"{profile.rows_per_sec:.0f}",
+                f"{profile.bytes / 1024:.1f}",
+                str(profile.vm_steps),
+                source,
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column not in (0, 1, len(values) - 1):
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight |
+                                          Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self._show_details(self.table.currentRow())
+
+    def _show_details(self, row, *args):
+        if not 0 <= row < len(self._profiles):
+            self.details.clear()
+            return
+        profile = self._profiles[row]
+        lines = [profile.sql]
+        if profile.params:
+            lines.append(f"-- Параметры: {profile.params}")
+        if profile.error:
+            lines.append(f"-- Ошибка: {profile.error}")
+        if profile.statements:
+            lines.append("-- Трассировка SQLite:")
+            lines += [f"--   {statement}" for statement in profile.statements]
+        self.details.setPlainText("\n".join(lines))
@@ -0,0 +1,349 @@
+import sqlite3
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtWidgets import QApplication
+from sql_editor.db.editing import cell_text, cell_value
+from sql_editor.utils.blobs import BINARY_TYPES, LazyValue, display_text
+from sql_editor.utils.columnar import ColumnStore
+
+# Подсветка неприменённых правок (полупрозрачная - видна в обеих темах)
+EDITED_COLOR = QColor(255, 193, 7, 90)
+INSERTED_COLOR = QColor(76, 175, 80, 80)
+DELETED_COLOR = QColor(244, 67, 54, 80)
+
+
+class ResultTableModel(QAbstractTableModel):
+    """
+    Модель результата запроса для QTableView.
+    Хранит строки по столбцам (ColumnStore) и форматирует значения только
+    при отрисовке ячейки. Недостающие строки догружаются из QueryResult
+    по мере прокрутки. Сортировка (по нескольким столбцам - щелчок по
+    заголовку с Shift) и быстрый фильтр показывают строки через
+    перестановку номеров, не трогая хранилище.
+    С буфером правок (set_pending) ячейки редактируются; добавленные
+    строки показываются после полученных.
+    """
+
+    # Количество полученных строк и признак того, что выборка закончилась
+    fetchProgress = pyqtSignal(int, bool)
+    # Число неприменённых правок изменилось
+    pendingChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headers = []
+        self._rows = ColumnStore(0)
+        self._source = None
+        # Номера показываемых строк после сортировки и фильтра
+        # (None - все строки в исходном порядке)
+        self._order = None
+        # Ключи сортировки [(столбец, по убыванию)] и фильтр (RowFilter)
+        self._sort_keys = []
+        self._filter = None
+        # Буфер правок (PendingChanges) или None - результат только для чтения
+        self._pending = None
+        # Скрытые столбцы ключа из источника (кортежи по номеру полученной
+        # строки), например rowid просмотра таблицы; None - их нет
+        self._keys = None
+
+    def set_result(self, headers, rows, source=None):
+        """Замена отображаемого результата"""
+        self.beginResetModel()
+        if self._source is not None and self._source is not source:
+            self._source.close()
+        self._headers = list(headers)
+        self._rows = ColumnStore(len(self._headers), rows)
+        self._source = source
+        self._keys = getattr(source, "keys", None)
+        self._order = None
+        self._sort_keys = []
+        self._filter = None
+        self._pending = None
+        self.endResetModel()
+        self.fetchProgress.emit(len(self._rows), not self.canFetchMore())
+
+    def set_pending(self, pending):
+        """Включение редактирования с буфером правок (None - выключение)"""
+        self.beginResetModel()
+        self._pending = pending
+        self.endResetModel()
+        self.pendingChanged.emit(len(pending) if pending is not None else 0)
+
+    def pending(self):
+        return self._pending
+
+    def discard_pending(self):
+        """Отмена всех неприменённых правок"""
+        if self._pending:
+            self.beginResetModel()
+            self._pending.clear()
+            self.endResetModel()
+            self.pendingChanged.emit(0)
+
+    def apply_pending(self):
+        """
+        Запись правок в БД (PendingChanges.apply). При ошибке правки
+        остаются в буфере. Возвращает число измененных строк
+        """
+        changed = self._pending.apply()
+        self.beginResetModel()
+        self.endResetModel()
+        self.pendingChanged.emit(0)
+        return changed
+
+    def insert_row(self):
+        """Новая строка в буфере правок; возвращает ее номер в модели"""
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._pending.insert()
+        self.endInsertRows()
+        self.pendingChanged.emit(len(self._pending))
+        return row
+
+    def delete_rows(self, rows):
+        """
+        Пометка строк на удаление (повторная пометка снимает ее);
+        добавленные и еще не записанные строки просто убираются
+        """
+        pending = self._pending
+        loaded = self.shown_count()
+        for row in sorted(set(rows), reverse=True):
+            if row >= loaded:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del pending.inserts[row - loaded]
+                self.endRemoveRows()
+                continue
+            source = self.row_at(row)
+            if pending.is_deleted(source):
+                pending.restore(source)
+            else:
+                pending.delete(source)
+            self.dataChanged.emit(self.index(row, 0),
+                                  self.index(row, len(self._headers) - 1))
+        self.pendingChanged.emit(len(pending))
+
+    def clear(self):
+        self.set_result([], [])
+
+    def value(self, index):
+        """Значение ячейки (с учетом правки) или None для добавленной строки"""
+        row = index.row()
+        if row >= self.shown_count():
+            return None
+        source = self.row_at(row)
+        if self._pending is not None:
+            return self._pending.value(source, index.column())
+        return source[index.column()]
+
+    def headers(self):
+        return self._headers
+
+    def rows(self):
+        """Все полученные строки (последовательность кортежей)"""
+        return self._rows
+
+    def total_count(self):
+        """Число полученных строк без учета фильтра"""
+        return len(self._rows)
+
+    def shown_count(self):
+        """Число показываемых строк результата (без добавленных правкой)"""
+        return len(self._order) if self._order is not None \
+            else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._source is None:
+            return False
+        return not self._source.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._append(self._fetch(self._source.fetch))
+
+    def fetch_all(self):
+        """Догрузка всех оставшихся строк результата"""
+        if self.canFetchMore():
+            self._append(self._fetch(self._source.fetch_all))
+
+    def _fetch(self, method):
+        # Выборка может быть прервана (например, ROLLBACK транзакции) -
+        # показываем уже полученные строки
+        try:
+            return method()
+        except sqlite3.Error:
+            self._source.close()
+            return []
+
+    def _append(self, batch):
+        if batch:
+            # Пока есть что догружать, сортировки и фильтра нет (перед
+            # ними результат загружается целиком) - строки идут в конец
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self._rows.extend(batch)
+            self.endInsertRows()
+        self.fetchProgress.emit(len(self._rows), not self.canFetchMore())
+
+    def row_at(self, row):
+        """
+        Исходный кортеж для строки представления; скрытые столбцы ключа
+        источника идут после показываемых
+        """
+        if self._order is not None:
+            row = self._order[row]
+        if self._keys is not None:
+            return self._rows[row] + self._keys[row]
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._pending is not None:
+            return self.shown_count() + len(self._pending.inserts)
+        return self.shown_count()
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self._pending is not None:
+            return self._pending_data(index.row(), index.column(), role)
+        if role == Qt.ItemDataRole.DisplayRole:
+            row = index.row()
+            if self._order is not None:
+                row = self._order[row]
+            return display_text(self._rows.value(row, index.column()))
+        return None
+
+    def _pending_data(self, row, column, role):
+        pending = self._pending
+        loaded = self.shown_count()
+        inserted = row >= loaded
+        if inserted:
+            values = pending.inserts[row - loaded]
+            if column not in values:
+                # Незаданный столбец получит значение по умолчанию
+                return None if role != Qt.ItemDataRole.BackgroundRole \
+                    else INSERTED_COLOR
+            value = values[column]
+        else:
+            source = self.row_at(row)
+            value = pending.value(source, column)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return display_text(value)
+        if role == Qt.ItemDataRole.EditRole:
+            return cell_text(value)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if inserted:
+                return INSERTED_COLOR
+            if pending.is_deleted(source):
+                return DELETED_COLOR
+            if pending.is_edited(source, column):
+                return EDITED_COLOR
+        if role == Qt.ItemDataRole.FontRole and not inserted \
+                and pending.is_deleted(source):
+            font = QFont()
+            font.setStrikeOut(True)
+            return font
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if self._pending is None or not index.isValid():
+            return flags
+        row = index.row()
+        if row < self.shown_count():
+            source = self.row_at(row)
+            # BLOB и длинное значение, которое не прочитано, текстом
+            # не редактируются
+            if self._pending.is_deleted(source) or isinstance(
+                    source[index.column()], BINARY_TYPES + (LazyValue,)):
+                return flags
+        return flags | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if (role != Qt.ItemDataRole.EditRole or self._pending is None
+                or not index.isValid()):
+            return False
+        row, column = index.row(), index.column()
+        loaded = self.shown_count()
+        if row >= loaded:
+            values = self._pending.inserts[row - loaded]
+            if value == "":
+                values.pop(column, None)
+            else:
+                values[column] = cell_value(value)
+        else:
+            self._pending.edit(self.row_at(row), column, cell_value(value))
+        self.dataChanged.emit(index, index)
+        self.pendingChanged.emit(len(self._pending))
+        return True
+
+    def headerData(self, section, orientation,
+                   role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            if not 0 <= section < len(self._headers):
+                return None
+            header = self._headers[section]
+            if len(self._sort_keys) > 1:
+                # Номер столбца в сортировке по нескольким столбцам
+                for number, (column, descending) in enumerate(
+                        self._sort_keys, start=1):
+                    if column == section:
+                        return f"{header} {'▼' if descending else '▲'}{number}"
+            return header
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """
+        Сортировка по типизированному ключу без копирования строк.
+        С нажатым Shift столбец добавляется к ключам прежней сортировки
+        """
+        if not 0 <= column < len(self._headers):
+            return
+        descending = order == Qt.SortOrder.DescendingOrder
+        keys = [key for key in self._sort_keys if key[0] != column] \
+            if QApplication.keyboardModifiers() \
+            & Qt.KeyboardModifier.ShiftModifier else []
+        # Столбец, уже входивший в ключи, остается на своем месте
+        position = next((i for i, key in enumerate(self._sort_keys)
+                         if key[0] == column), len(keys))
+        keys.insert(min(position, len(keys)), (column, descending))
+        self.set_view(keys, self._filter)
+
+    def sort_keys(self):
+        return list(self._sort_keys)
+
+    def set_filter(self, row_filter):
+        """Быстрый фильтр строк (RowFilter или None - показать все)"""
+        self.set_view(self._sort_keys, row_filter)
+
+    def set_view(self, keys, row_filter):
+        """Показ строк по ключам сортировки и фильтру, без запроса к БД"""
+        if keys or row_filter is not None:
+            # Сортировать и фильтровать можно только полный результат
+            self.fetch_all()
+        # Смена сортировки не меняет числа строк - достаточно перестроить
+        # порядок; смена фильтра меняет состав строк
+        reset = row_filter is not self._filter
+        if reset:
+            self.beginResetModel()
+        else:
+            self.layoutAboutToBeChanged.emit()
+        self._sort_keys = list(keys)
+        self._filter = row_filter
+        self._order = self._rows.view(self._sort_keys, row_filter)
+        if reset:
+            self.endResetModel()
+        else:
+            self.layoutChanged.emit()
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0,
+                                    max(len(self._headers) - 1, 0))
@@ -0,0 +1,239 @@
+import os
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from sql_editor.db.connection import DatabaseManager, DEFAULT_BATCH_SIZE
+
+# Минимальный интервал между сигналами прогресса (секунды)
+PROGRESS_INTERVAL = 0.1
+
+
+class QueryWorker(QThread):
+    """
+    Выполнение запроса в фоновом потоке.
+    Результат (QueryResult и первая порция строк) передается в GUI сигналом.
+    """
+
+    resultReady = pyqtSignal(object, list)
+    failed = pyqtSignal(object)
+    # Прошедшее время (секунды) и число шагов VM SQLite
+    progress = pyqtSignal(float, int)
+
+    def __init__(self, db, sql, batch_size, parent=None, params=None):
+        super().__init__(parent)
+        self.db = db
+        self.sql = sql
+        self.batch_size = batch_size
+        # Значения параметров запроса (кортеж или словарь)
+        self.params = params
+        self.cancelled = False
+        self._started_at = 0.0
+        self._last_report = 0.0
+
+    def run(self):
+        self._started_at = time.perf_counter()
+        self._last_report = self._started_at
+        self.db.vm_steps = 0
+        self.db.progress_callback = self._on_progress
+        try:
+            self.execute()
+        except Exception as e:
+            # Ошибка любого типа передается в GUI, где решается, как ее показать
+            self.failed.emit(e)
+        finally:
+            self.db.progress_callback = None
+
+    def execute(self):
+        result = self.db.execute_stream(self.sql, self.batch_size, self.params)
+        rows = result.fetch()
+        self.progress.emit(self.elapsed(), self.db.vm_steps)
+        self.resultReady.emit(result, rows)
+
+    def elapsed(self):
+        return time.perf_counter() - self._started_at
+
+    def cancel(self):
+        """Отмена выполнения через sqlite3.Connection.interrupt()"""
+        self.cancelled = True
+        self.db.interrupt()
+
+    def _on_progress(self, steps):
+        now = time.perf_counter()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self.progress.emit(now - self._started_at, steps)
+
+
+class ScriptWorker(QueryWorker):
+    """Выполнение скрипта из нескольких операторов в фоновом потоке"""
+
+    # Список StatementResult по каждому выполненному оператору
+    scriptFinished = pyqtSignal(list)
+
+    def __init__(self, db, sql, stop_on_error=True, parent=None):
+        super().__init__(db, sql, DEFAULT_BATCH_SIZE, parent)
+        self.stop_on_error = stop_on_error
+
+    def execute(self):
+        results = self.db.execute_script(self.sql, self.stop_on_error)
+        self.progress.emit(self.elapsed(), self.db.vm_steps)
+        self.scriptFinished.emit(results)
+
+
+class ManyWorker(QueryWorker):
+    """Выполнение одного оператора для списка наборов параметров"""
+
+    # Число выполненных наборов и число измененных строк
+    manyFinished = pyqtSignal(int, int)
+    # Сколько наборов выполнено к текущему моменту
+    executed = pyqtSignal(int)
+
+    def __init__(self, db, sql, parameters, parent=None):
+        super().__init__(db, sql, DEFAULT_BATCH_SIZE, parent)
+        self.parameters = parameters
+
+    def execute(self):
+        executed, changed = self.db.execute_many(
+            self.sql, self.parameters, self.executed.emit)
+        self.progress.emit(self.elapsed(), self.db.vm_steps)
+        self.manyFinished.emit(executed, changed)
+
+
+class ExportWorker(QThread):
+    """
+    Потоковый экспорт в фоновом потоке.
+    Если результат загружен не полностью, запрос выполняется повторно
+    на отдельном соединении и строки пишутся в файл прямо из курсора.
+    """
+
+    progress = pyqtSignal(int)
+    done = pyqtSignal(int)
+    failed = pyqtSignal(object)
+
+    def __init__(self, filename, fmt, compression, headers, rows=None,
+                 db_path=None, sql=None, profile=None,
+                 batch_size=DEFAULT_BATCH_SIZE, parent=None, params=None,
+                 blobs="base64"):
+        super().__init__(parent)
+        self.filename = filename
+        self.fmt = fmt
+        self.blobs = blobs
+        self.compression = compression
+        self.headers = headers
+        self.rows = rows
+        self.db_path = db_path
+        self.sql = sql
+        self.params = params
+        self.profile = profile
+        self.batch_size = batch_size
+        self.db = None
+
+    def run(self):
+        # Модули экспорта (csv, json, сжатие) загружаются при первом экспорте,
+        # а не при запуске приложения
+        from sql_editor.utils.export import export_stream
+        try:
+            if self.rows is not None:
+                batches = (self.rows[i:i + self.batch_size]
+                           for i in range(0, len(self.rows), self.batch_size))
+                headers = self.headers
+                if self.db_path is not None:
+                    # Длинные значения (LazyValue) читаются через свое
+                    # соединение, а не через соединение окна
+                    from sql_editor.utils.blobs import bind_rows
+                    self.db = DatabaseManager()
+                    self.db.max_readers = 0
+                    self.db.connect(self.db_path, self.profile)
+                    batches = (list(bind_rows(batch, self.db))
+                               for batch in batches)
+            else:
+                self.db = DatabaseManager()
+                self.db.connect(self.db_path, self.profile)
+                result = self.db.execute_stream(
+                    self.sql, self.batch_size, self.params)
+                headers = result.headers
+                batches = result.batches()
+
+            count = export_stream(self.filename, headers, batches, self.fmt,
+                                  self.compression, self.progress.emit,
+                                  self.blobs)
+        except Exception as e:
+            # Недописанный файл не оставляем
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            self.failed.emit(e)
+            return
+        finally:
+            if self.db is not None:
+                self.db.close()
+
+        self.done.emit(count)
+
+    def cancel(self):
+        if self.db is not None:
+            self.db.interrupt()
+
+
+class ImportWorker(QThread):
+    """Загрузка файла в таблицу в фоновом потоке на отдельном соединении"""
+
+    progress = pyqtSignal(int)
+    done = pyqtSignal(int)
+    failed = pyqtSignal(object)
+
+    def __init__(self, db_path, filename, table, index_columns, batch_size,
+                 profile=None, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.filename = filename
+        self.table = table
+        self.index_columns = index_columns
+        self.batch_size = batch_size
+        self.profile = profile
+        self.db = DatabaseManager()
+
+    def run(self):
+        from sql_editor.utils.importer import import_file
+        try:
+            self.db.connect(self.db_path, self.profile)
+            count = import_file(self.db, self.filename, self.table,
+                                self.index_columns, self.batch_size,
+                                self.progress.emit)
+        except Exception as e:
+            self.failed.emit(e)
+            return
+        finally:
+            self.db.close()
+
+        self.done.emit(count)
+
+    def cancel(self):
+        self.db.interrupt()
+
+
+class ConnectWorker(QThread):
+    """
+    Подключение к базам данных в фоновом потоке (восстановление сессии).
+    Файл на медленном сетевом диске не задерживает появление окна:
+    соединение открывается и структура читается здесь, а в GUI
+    подключенная БД передается сигналом.
+    """
+
+    connected = pyqtSignal(object)
+    # Путь к файлу и ошибка
+    failed = pyqtSignal(str, object)
+
+    def __init__(self, targets, parent=None):
+        super().__init__(parent)
+        # Тройки (DatabaseManager, путь к файлу БД, профиль соединения)
+        self.targets = targets
+
+    def run(self):
+        for db, path, profile in self.targets:
+            try:
+                db.connect(path, profile)
+                db.schema.refresh()
+            except Exception as e:
+                db.close()
+                self.failed.emit(path, e)
+                continue
+            self.connected.emit(db)
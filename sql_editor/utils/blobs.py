@@ -0,0 +1,171 @@
+"""
+Длинные значения (BLOB и длинный текст) в результатах: заглушки с размером
+вместо значения, чтение частями через Connection.blobopen и текст ячейки
+для таблицы результатов.
+"""
+
+# Значения длиннее (байт BLOB или символов текста) при просмотре таблицы
+# не читаются, а заменяются LazyValue
+LAZY_SIZE = 4096
+
+# Размер части при чтении и экспорте длинных значений
+CHUNK_SIZE = 64 * 1024
+
+# Сколько символов текста показывать в ячейке таблицы
+DISPLAY_TEXT = 256
+
+# Байт в строке шестнадцатеричного представления
+HEX_WIDTH = 16
+
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+
+def format_size(size):
+    """Размер в байтах для подписи: 512 Б, 12.5 КБ, 3.2 МБ"""
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024 or unit == "МБ":
+            break
+        size /= 1024
+    if unit == "Б":
+        return f"{size} {unit}"
+    return f"{size:.1f} {unit}"
+
+
+class LazyValue:
+    """
+    Заглушка длинного значения ячейки таблицы: само значение не хранится,
+    а читается частями по rowid через blobopen, когда понадобится
+    (просмотр, экспорт). Блокировка чтения держится только на время
+    одного обращения
+    """
+
+    __slots__ = ("db", "table", "column", "rowid", "kind", "size")
+
+    def __init__(self, db, table, column, rowid, kind, size):
+        self.db = db
+        self.table = table
+        self.column = column
+        self.rowid = rowid
+        # "blob" или "text"; size - байт BLOB или символов текста
+        self.kind = kind
+        self.size = size
+
+    @property
+    def is_text(self):
+        return self.kind == "text"
+
+    def __str__(self):
+        if self.is_text:
+            return f"<TEXT, символов: {self.size}>"
+        return f"<BLOB {format_size(self.size)}>"
+
+    def __repr__(self):
+        return (f"LazyValue({self.table!r}, {self.column!r}, {self.rowid!r}, "
+                f"{self.kind!r}, {self.size})")
+
+    def bound_to(self, db):
+        """Та же заглушка, читающая значение через другое соединение"""
+        return LazyValue(db, self.table, self.column, self.rowid, self.kind,
+                         self.size)
+
+    def read(self, offset=0, size=-1):
+        """Байты значения с offset (size < 0 - до конца); текст - в UTF-8"""
+        with self.db.reading() as connection:
+            with connection.blobopen(self.table, self.column, self.rowid,
+                                     readonly=True) as blob:
+                blob.seek(offset)
+                return blob.read(size)
+
+    def length(self):
+        """Длина значения в байтах"""
+        with self.db.reading() as connection:
+            with connection.blobopen(self.table, self.column, self.rowid,
+                                     readonly=True) as blob:
+                return len(blob)
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        """Значение по частям (байты) через одно открытие blob"""
+        with self.db.reading() as connection:
+            with connection.blobopen(self.table, self.column, self.rowid,
+                                     readonly=True) as blob:
+                while True:
+                    data = blob.read(chunk_size)
+                    if not data:
+                        return
+                    yield data
+
+
+def bind_rows(rows, db):
+    """
+    Строки с заглушками, перенесенными на соединение db (например, своё
+    соединение фонового потока: соединение окна занято своими запросами)
+    """
+    for row in rows:
+        if any(type(value) is LazyValue for value in row):
+            row = tuple(value.bound_to(db) if type(value) is LazyValue
+                        else value for value in row)
+        yield row
+
+
+def display_text(value):
+    """Текст ячейки таблицы: BLOB - размером, длинный текст - началом"""
+    kind = type(value)
+    if kind is str:
+        if len(value) > DISPLAY_TEXT:
+            return value[:DISPLAY_TEXT] + "…"
+        return value
+    if kind in BINARY_TYPES:
+        return f"<BLOB {format_size(len(value))}>"
+    return str(value)
+
+
+def is_long(value):
+    """Значение, которое удобнее смотреть в отдельном окне"""
+    if isinstance(value, (LazyValue,) + BINARY_TYPES):
+        return True
+    return isinstance(value, str) and (len(value) > DISPLAY_TEXT
+                                       or "\n" in value)
+
+
+def value_bytes(value):
+    """Байтовое представление значения в памяти (текст - в UTF-8)"""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if isinstance(value, BINARY_TYPES):
+        return value
+    return str(value).encode("utf-8")
+
+
+def read_range(value, offset, size):
+    """Часть байтов значения: LazyValue читается из БД, остальное - из памяти"""
+    if isinstance(value, LazyValue):
+        return value.read(offset, size)
+    return bytes(value_bytes(value)[offset:offset + size])
+
+
+def value_length(value):
+    """Длина значения в байтах"""
+    if isinstance(value, LazyValue):
+        return value.length()
+    return len(value_bytes(value))
+
+
+def value_chunks(value, chunk_size=CHUNK_SIZE):
+    """Значение по частям байтов"""
+    if isinstance(value, LazyValue):
+        yield from value.chunks(chunk_size)
+        return
+    data = memoryview(value_bytes(value))
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def format_hex(data, offset=0):
+    """Шестнадцатеричный дамп: смещение, байты и символы ASCII"""
+    lines = []
+    for start in range(0, len(data), HEX_WIDTH):
+        chunk = bytes(data[start:start + HEX_WIDTH])
+        text = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in chunk)
+        lines.append(f"{offset + start:08x}  "
+                     f"{chunk.hex(' '):<{HEX_WIDTH * 3 - 1}}  |{text}|")
+    return "\n".join(lines)
@@ -0,0 +1,445 @@
+"""
+Хранение результата запроса по столбцам: числа - в массивах array,
+NULL - в битовой карте, текст - кодами словаря различных строк.
+Фильтрация и сортировка выполняются над столбцами, без обращения к БД.
+"""
+import operator
+import re
+import sys
+from array import array
+from itertools import compress, repeat
+from sql_editor.utils.blobs import BINARY_TYPES, display_text
+
+# Виды значений столбца; остальные типы (BLOB, смешанные столбцы) хранятся
+# списком объектов Python
+VALUE_KINDS = {int: "int", float: "float", str: "text"}
+
+# Словарь текста не используется, если различных строк больше этой доли
+# строк столбца (словарь почти уникальных строк тяжелее простого списка)
+DICT_MAX_SHARE = 0.5
+# ...но только начиная с этого числа строк
+DICT_MIN_ROWS = 1024
+
+# Режимы фильтра
+FILTER_MODES = ("substring", "regex", "range")
+
+# Сколько последних перестановок сортировки хранится
+SORT_CACHE_SIZE = 8
+
+# Символы текстового вида чисел (str(1e+20), str(-0.5), inf, nan)
+_NUMBER_CHARS = frozenset("0123456789.-+einfa")
+
+# Разворот байта битовой карты NULL в 8 байт признака "не NULL"
+_PRESENT_BYTES = [bytes(1 - (byte >> bit & 1) for bit in range(8))
+                  for byte in range(256)]
+
+
+def sort_key(value):
+    """Ключ сортировки в порядке SQLite: NULL < числа < текст < BLOB"""
+    if value is None:
+        return 0, 0
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    if isinstance(value, BINARY_TYPES):
+        return 3, bytes(value)
+    # Заглушки длинных значений (LazyValue) - после BLOB, по подписи
+    return 4, str(value)
+
+
+def _and(first, second):
+    """Поэлементное И двух масок из байтов 0/1"""
+    size = len(first)
+    return (int.from_bytes(first, "little")
+            & int.from_bytes(second, "little")).to_bytes(size, "little")
+
+
+def _or(first, second):
+    size = len(first)
+    return (int.from_bytes(first, "little")
+            | int.from_bytes(second, "little")).to_bytes(size, "little")
+
+
+class RowFilter:
+    """
+    Условие быстрого фильтра: подстрока (без учета регистра), регулярное
+    выражение или диапазон "от..до" (любая граница может отсутствовать).
+    Значения сравниваются в том виде, в каком показаны в таблице;
+    диапазон - в порядке сортировки SQLite. NULL не проходит фильтр.
+    column - индекс столбца или None (любой столбец)
+    """
+
+    def __init__(self, text, mode="substring", column=None):
+        if mode not in FILTER_MODES:
+            raise ValueError(f"Неизвестный режим фильтра: {mode}")
+        self.text = text
+        self.mode = mode
+        self.column = column
+        self.low = self.high = None
+
+        if mode == "substring":
+            self._needle = text.casefold()
+        elif mode == "regex":
+            try:
+                self._pattern = re.compile(text, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(
+                    f"Неверное регулярное выражение: {e}") from None
+        else:
+            low, dots, high = text.partition("..")
+            if not dots:
+                raise ValueError(
+                    "Диапазон задается как 10..20, ..20 или 10..")
+            # Границы разбираются так же, как значения параметров запроса
+            from sql_editor.utils.params import parse_value
+            self.low = parse_value(low.strip()) if low.strip() else None
+            self.high = parse_value(high.strip()) if high.strip() else None
+            self._low_key = sort_key(self.low) if self.low is not None \
+                else None
+            self._high_key = sort_key(self.high) if self.high is not None \
+                else None
+
+    def test(self, value):
+        """Проходит ли значение (не NULL) фильтр"""
+        if value is None:
+            return False
+        if self.mode == "substring":
+            return self._needle in display_text(value).casefold()
+        if self.mode == "regex":
+            return self._pattern.search(display_text(value)) is not None
+        key = sort_key(value)
+        return ((self._low_key is None or self._low_key <= key)
+                and (self._high_key is None or key <= self._high_key))
+
+    def mask(self, values, text=True):
+        """
+        Маска (байт 0/1 на значение) для последовательности значений.
+        Перебор идет через map встроенных функций, без вызова функции
+        Python на каждое значение; text=False - значения без букв (числа),
+        регистр не приводится
+        """
+        # Список объектов может содержать BLOB и заглушки - они
+        # сравниваются по тексту ячейки, а не по содержимому
+        texts = map(display_text if text else str, values)
+        if self.mode == "substring":
+            if text:
+                texts = map(str.casefold, texts)
+            return bytes(map(operator.contains, texts,
+                             repeat(self._needle)))
+        if self.mode == "regex":
+            return bytes(map(bool, map(self._pattern.search, texts)))
+        return bytes(map(self.test, values))
+
+    def may_match_numbers(self):
+        """Может ли фильтр пропустить число (подстрока из одних букв - нет)"""
+        if self.mode == "substring":
+            return set(self._needle) <= _NUMBER_CHARS
+        return True
+
+    def numeric_bounds(self):
+        """Границы диапазона, если обе - числа или отсутствуют, иначе None"""
+        if self.mode != "range":
+            return None
+        bounds = (self.low, self.high)
+        if all(bound is None or isinstance(bound, (int, float))
+               for bound in bounds):
+            return bounds
+        return None
+
+
+class Column:
+    """
+    Один столбец результата. Вид столбца определяется по значениям:
+    "int" и "float" - массив array, "text" - коды строк словаря,
+    "object" - список (BLOB и столбцы со значениями разных типов),
+    None - пока были только NULL
+    """
+
+    def __init__(self):
+        self.kind = None
+        self.data = None
+        # Словарь текста: строки по коду и коды по строке
+        self.words = None
+        self.codes = None
+        # Битовая карта NULL: бит i установлен, если значение i - NULL
+        self.nulls = bytearray()
+        self.null_count = 0
+        self.size = 0
+        self._sort_keys = None
+        self._present = None
+
+    def get(self, index):
+        if self.null_count and self.nulls[index >> 3] >> (index & 7) & 1:
+            return None
+        kind = self.kind
+        if kind == "text":
+            return self.words[self.data[index]]
+        if kind is None:
+            return None
+        return self.data[index]
+
+    def nbytes(self):
+        """Примерный объем данных столбца (без самих объектов строк)"""
+        size = sys.getsizeof(self.nulls)
+        if self.data is not None:
+            size += sys.getsizeof(self.data)
+        if self.words is not None:
+            size += sys.getsizeof(self.words) + sys.getsizeof(self.codes)
+        return size
+
+    def extend(self, values):
+        """Добавление значений столбца очередной порции строк"""
+        count = len(values)
+        types = set(map(type, values))
+        has_nulls = type(None) in types
+        types.discard(type(None))
+        kinds = {VALUE_KINDS.get(kind, "object") for kind in types}
+        if self.kind is not None:
+            kinds.add(self.kind)
+        if len(kinds) > 1:
+            self._to_objects()
+        elif kinds and self.kind is None:
+            self._start(kinds.pop())
+
+        start = self.size
+        self.nulls.extend(bytes((start + count + 7) // 8 - len(self.nulls)))
+        stored = values
+        if has_nulls:
+            nulls = self.nulls
+            positions = [i for i, value in enumerate(values) if value is None]
+            for position in positions:
+                index = start + position
+                nulls[index >> 3] |= 1 << (index & 7)
+            self.null_count += len(positions)
+            if self.kind in ("int", "float"):
+                filler = 0 if self.kind == "int" else 0.0
+                stored = [filler if value is None else value
+                          for value in values]
+
+        if self.kind in ("int", "float"):
+            mark = len(self.data)
+            try:
+                self.data.extend(stored)
+            except OverflowError:
+                # Целое больше 64 бит (SQLite таких не возвращает, но строки
+                # могут прийти и не из курсора)
+                del self.data[mark:]
+                self._to_objects()
+                self.data.extend(values)
+        elif self.kind == "text":
+            self.data.extend(map(self._code, values))
+            if (start + count >= DICT_MIN_ROWS
+                    and len(self.words) > (start + count) * DICT_MAX_SHARE):
+                self.size = start + count
+                self._to_objects()
+        elif self.kind == "object":
+            self.data.extend(values)
+
+        self.size = start + count
+        self._sort_keys = None
+        self._present = None
+
+    def _code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            if value is None:
+                # Значение NULL берется из битовой карты
+                return 0
+            code = self.codes[value] = len(self.words)
+            self.words.append(value)
+        return code
+
+    def _start(self, kind):
+        """Хранилище для первого значения не NULL; прежние строки - NULL"""
+        self.kind = kind
+        if kind == "int":
+            self.data = array("q", bytes(8 * self.size))
+        elif kind == "float":
+            self.data = array("d", bytes(8 * self.size))
+        elif kind == "text":
+            self.data = array("i", bytes(4 * self.size))
+            self.words = []
+            self.codes = {}
+        else:
+            self.data = [None] * self.size
+
+    def _to_objects(self):
+        """Переход к списку объектов Python"""
+        if self.kind == "object":
+            return
+        data = [self.get(i) for i in range(self.size)]
+        self.kind = "object"
+        self.data = data
+        self.words = self.codes = None
+
+    def present(self):
+        """Маска "не NULL" (байт на строку); None, если NULL в столбце нет"""
+        if not self.null_count:
+            return None
+        if self._present is None:
+            self._present = b"".join(
+                map(_PRESENT_BYTES.__getitem__, self.nulls))[:self.size]
+        return self._present
+
+    def sort_keys(self):
+        """
+        Ключи сортировки по номеру строки. Для массивов - сами значения
+        (NULL упорядочиваются отдельно, см. ColumnStore.sort_order), для
+        текста - номер строки словаря в порядке сортировки
+        """
+        if self._sort_keys is None:
+            kind = self.kind
+            if kind in ("int", "float"):
+                self._sort_keys = self.data
+            elif kind == "text":
+                words = self.words
+                ranks = [0] * len(words)
+                for rank, code in enumerate(
+                        sorted(range(len(words)), key=words.__getitem__)):
+                    ranks[code] = rank
+                self._sort_keys = array("i", map(ranks.__getitem__, self.data))
+            elif kind == "object":
+                self._sort_keys = list(map(sort_key, self.data))
+        return self._sort_keys
+
+    def match(self, row_filter):
+        """Маска строк (байт 0/1 на строку), значения которых проходят фильтр"""
+        kind = self.kind
+        if kind is None or kind in ("int", "float") \
+                and not row_filter.may_match_numbers():
+            return bytes(self.size)
+        if kind == "text":
+            # Условие проверяется один раз для каждой различной строки
+            passed = row_filter.mask(self.words)
+            mask = bytes(map(passed.__getitem__, self.data))
+        elif kind != "object" and row_filter.numeric_bounds():
+            low, high = row_filter.numeric_bounds()
+            mask = None
+            if low is not None:
+                mask = bytes(map(operator.le, repeat(low, self.size), self.data))
+            if high is not None:
+                upper = bytes(map(operator.ge, repeat(high, self.size),
+                                  self.data))
+                mask = upper if mask is None else _and(mask, upper)
+            if mask is None:
+                mask = bytes([1]) * self.size
+        else:
+            mask = row_filter.mask(self.data, text=kind == "object")
+        present = self.present()
+        return mask if present is None else _and(mask, present)
+
+
+class ColumnStore:
+    """
+    Строки результата по столбцам. Для остального кода выглядит как
+    последовательность кортежей (len, индекс и срез - как у списка строк),
+    кортеж собирается при обращении к строке
+    """
+
+    def __init__(self, width, rows=()):
+        self.columns = [Column() for _ in range(width)]
+        self._size = 0
+        # Перестановки сортировки: ключи сортировки -> номера строк
+        self._orders = {}
+        if rows:
+            self.extend(rows)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.row(i) for i in range(*item.indices(self._size))]
+        if item < 0:
+            item += self._size
+        if not 0 <= item < self._size:
+            raise IndexError("номер строки вне результата")
+        return self.row(item)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self.row(i)
+
+    def row(self, index):
+        return tuple(column.get(index) for column in self.columns)
+
+    def value(self, index, column):
+        return self.columns[column].get(index)
+
+    def nbytes(self):
+        return sum(column.nbytes() for column in self.columns)
+
+    def extend(self, rows):
+        """Добавление порции строк (кортежей)"""
+        if not rows:
+            return
+        if self.columns:
+            for column, values in zip(self.columns, zip(*rows)):
+                column.extend(values)
+        self._size += len(rows)
+        self._orders.clear()
+
+    def sort_order(self, keys):
+        """
+        Номера строк в порядке сортировки. keys - [(столбец, по убыванию)],
+        первый ключ главный. Перестановка запоминается до добавления строк,
+        поэтому смена фильтра не сортирует результат заново
+        """
+        keys = tuple(keys)
+        order = self._orders.get(keys)
+        if order is not None:
+            return order
+        order = list(range(self._size))
+        # Устойчивая сортировка от младшего ключа к старшему
+        for column_index, descending in reversed(keys):
+            column = self.columns[column_index]
+            sort_keys = column.sort_keys()
+            if sort_keys is not None:
+                order.sort(key=sort_keys.__getitem__, reverse=descending)
+            present = column.present()
+            if present is not None and column.kind != "object":
+                # NULL меньше любого значения
+                order.sort(key=present.__getitem__, reverse=descending)
+        if len(self._orders) >= SORT_CACHE_SIZE:
+            self._orders.clear()
+        self._orders[keys] = order
+        return order
+
+    def value_types(self):
+        """Типы значений (кроме NULL) во всех столбцах"""
+        types = set()
+        for column in self.columns:
+            if column.kind == "object":
+                types.update(map(type, column.data))
+            elif column.kind is not None:
+                types.add({"int": int, "float": float,
+                           "text": str}[column.kind])
+        types.discard(type(None))
+        return types
+
+    def clear_orders(self):
+        """Сброс запомненных перестановок сортировки"""
+        self._orders.clear()
+
+    def match(self, row_filter):
+        """Маска строк, проходящих фильтр (байт 0/1 на строку)"""
+        if row_filter.column is not None:
+            return self.columns[row_filter.column].match(row_filter)
+        mask = bytes(self._size)
+        for column in self.columns:
+            mask = _or(mask, column.match(row_filter))
+        return mask
+
+    def view(self, keys=(), row_filter=None):
+        """
+        Номера строк для показа: отсортированные по keys и прошедшие
+        row_filter. None - все строки в исходном порядке
+        """
+        order = self.sort_order(keys) if keys else None
+        if row_filter is None:
+            return list(order) if order is not None else None
+        mask = self.match(row_filter)
+        if order is None:
+            return list(compress(range(self._size), mask))
+        return list(compress(order, map(mask.__getitem__, order)))
@@ -0,0 +1,183 @@
+import re
+import sqlite3
+from bisect import bisect_left
+from sql_editor.utils.lexer import (
+    SQL_KEYWORDS, STATE_NONE, TABLE_KEYWORDS, table_references, tokenize,
+    unquote_identifier
+)
+
+# Наибольшее число вариантов в списке автодополнения
+MAX_SUGGESTIONS = 50
+
+# Сколько символов вокруг курсора просматривается для определения контекста
+CONTEXT_CHARS = 4000
+
+# Слово, которое дописывается под курсором
+_PREFIX_RE = re.compile(r"\w*\Z")
+
+
+class PrefixIndex:
+    """
+    Отсортированный индекс слов для поиска по префиксу без учета регистра.
+    Поиск - двоичный (bisect) плюс просмотр только подходящих слов.
+    """
+
+    def __init__(self, words=()):
+        pairs = sorted({(word.lower(), word) for word in words})
+        self._keys = [key for key, _ in pairs]
+        self._words = [word for _, word in pairs]
+
+    def find(self, prefix, limit=MAX_SUGGESTIONS):
+        prefix = prefix.lower()
+        keys = self._keys
+        result = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(result) < limit \
+                and keys[i].startswith(prefix):
+            result.append(self._words[i])
+            i += 1
+        return result
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def completion_context(text, position):
+    """
+    Контекст автодополнения в позиции курсора.
+    Возвращает (вид, префикс, квалификатор, таблицы оператора) или None,
+    если курсор внутри строки или комментария. Вид: "table" - имя таблицы
+    (после FROM, JOIN, ...), "column" - столбец после "псевдоним.",
+    "any" - ключевые слова и столбцы таблиц оператора.
+    Таблицы - словарь table_references для оператора под курсором.
+    """
+    start, end = _statement_bounds(text, position)
+    before = text[start:position]
+    prefix = _PREFIX_RE.search(before).group()
+    head = before[:len(before) - len(prefix)]
+
+    tokens, state = tokenize(head)
+    if state != STATE_NONE:
+        return None
+    if tokens:
+        kind, token_start, length = tokens[-1]
+        if (kind == "comment" and token_start + length == len(head)
+                and head.startswith("--", token_start)):
+            return None
+
+    words = [(kind, head[token_start:token_start + length])
+             for kind, token_start, length in tokens if kind != "comment"]
+    context = "any"
+    qualifier = None
+    if (len(words) >= 2 and words[-1][1] == "."
+            and words[-2][0] in ("identifier", "quoted", "keyword")):
+        context = "column"
+        qualifier = unquote_identifier(words[-2][1])
+    elif words and (words[-1][1].upper() in TABLE_KEYWORDS
+                    or (words[-1][1] == "," and _in_from_list(words))):
+        context = "table"
+
+    return context, prefix, qualifier, table_references(text[start:end])
+
+
+def _statement_bounds(text, position):
+    """
+    Границы оператора под курсором, но не дальше CONTEXT_CHARS в обе
+    стороны. Точки с запятой внутри строк, комментариев и тела триггера
+    границами не считаются - как в split_statements
+    """
+    low = max(position - CONTEXT_CHARS, 0)
+    high = min(position + CONTEXT_CHARS, len(text))
+    window = text[low:high]
+    cursor = position - low
+    start, end = 0, len(window)
+    tokens, _ = tokenize(window)
+    for kind, pos, _ in tokens:
+        if kind != "punct" or window[pos] != ";" \
+                or not sqlite3.complete_statement(window[start:pos + 1]):
+            continue
+        if pos >= cursor:
+            end = pos
+            break
+        start = pos + 1
+    return low + start, low + end
+
+
+def _in_from_list(words):
+    # Запятая относится к списку FROM, если до нее нет других предложений
+    for kind, text in reversed(words):
+        upper = text.upper()
+        if upper == "FROM":
+            return True
+        if upper in ("SELECT", "WHERE", "ON", "ORDER", "GROUP", "SET") \
+                or text in "()":
+            return False
+    return False
+
+
+class SchemaCompletion:
+    """
+    Варианты автодополнения по структуре БД.
+    Индекс таблиц перестраивается при смене версии SchemaCache, индексы
+    столбцов строятся лениво для таблиц, которые встречаются в запросе.
+    """
+
+    def __init__(self, schema, keywords=SQL_KEYWORDS):
+        self.schema = schema
+        # Можно ли сейчас читать столбцы из БД (во время выполнения запроса
+        # соединение занято - используются только уже загруженные)
+        self.can_load = None
+        self._keywords = PrefixIndex(keywords)
+        self._tables = PrefixIndex()
+        self._table_names = {}
+        self._columns = {}
+        self._version = object()
+
+    def set_schema(self, schema):
+        """Переключение на структуру другой БД"""
+        self.schema = schema
+        self._version = object()
+
+    def _sync(self):
+        if self.schema.version == self._version:
+            return
+        self._version = self.schema.version
+        names = self.schema.tables() + self.schema.views()
+        self._tables = PrefixIndex(names)
+        self._table_names = {name.lower(): name for name in names}
+        self._columns.clear()
+
+    def _column_index(self, table):
+        name = self._table_names.get(table.lower())
+        if name is None:
+            return None
+        index = self._columns.get(name)
+        if index is None:
+            if self.can_load is not None and not self.can_load():
+                return None
+            index = PrefixIndex(self.schema.column_names(name))
+            self._columns[name] = index
+        return index
+
+    def complete(self, text, position):
+        """Введенный префикс и варианты для позиции курсора"""
+        context = completion_context(text, position)
+        if context is None:
+            return "", []
+        kind, prefix, qualifier, tables = context
+        self._sync()
+
+        if kind == "table":
+            return prefix, self._tables.find(prefix)
+        if kind == "column":
+            index = self._column_index(tables.get(qualifier.lower(), qualifier))
+            return prefix, index.find(prefix) if index is not None else []
+
+        # Столбцы таблиц оператора, затем ключевые слова
+        words = []
+        for table in dict.fromkeys(tables.values()):
+            index = self._column_index(table)
+            if index is not None:
+                words += [w for w in index.find(prefix) if w not in words]
+        words += self._keywords.find(prefix)
+        return prefix, words[:MAX_SUGGESTIONS]
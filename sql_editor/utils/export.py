@@ -1,22 +1,256 @@
+import base64
+import bz2
+import codecs
 import csv
+import gzip
 import json
+import lzma
+import os
+import re
+from sql_editor.utils.blobs import BINARY_TYPES, LazyValue, value_chunks
+
+# Сжатие выходного файла: расширение -> функция открытия (только stdlib)
+COMPRESSORS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+try:
+    # Модуль zstd появился в стандартной библиотеке в Python 3.14
+    from compression import zstd
+    COMPRESSORS[".zst"] = zstd.open
+except ImportError:
+    pass
+
+EXPORT_FORMATS = ("csv", "json", "ndjson")
+
+# Запись BLOB: строкой base64 в самом файле или отдельными файлами в
+# каталоге ИМЯ_blobs рядом с ним (в ячейке - путь к файлу)
+BLOB_MODES = ("base64", "files")
+
+# Части BLOB для base64 кратны 3 байтам - строка кодируется по частям
+# без промежуточных символов "="
+BASE64_CHUNK = 3 * 21846
+
+# Значения, которые пишутся по частям (BLOB и заглушки длинных значений)
+_CHUNKED_TYPES = frozenset(BINARY_TYPES + (LazyValue,))
+
+
+def detect_format(filename):
+    """Определение формата и сжатия по имени файла: ("csv", ".gz")"""
+    name = filename.lower()
+    compression = None
+    for suffix in COMPRESSORS:
+        if name.endswith(suffix):
+            compression = suffix
+            name = name[:-len(suffix)]
+            break
+
+    fmt = name.rsplit(".", 1)[-1] if "." in name else ""
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    return (fmt if fmt in EXPORT_FORMATS else None), compression
+
+
+def open_output(filename, compression=None):
+    """Открытие файла для записи текста с необязательным сжатием"""
+    if compression:
+        return COMPRESSORS[compression](
+            filename, 'wt', encoding='utf-8', newline='')
+    return open(filename, 'w', newline='', encoding='utf-8')
+
+
+def blob_directory(filename):
+    """Каталог файлов BLOB для файла экспорта: data.json.gz -> data_blobs"""
+    _, compression = detect_format(filename)
+    base = filename[:len(filename) - len(compression or "")]
+    stem, dot, _ = base.rpartition(".")
+    return (stem if dot and stem else base) + "_blobs"
+
+
+def export_stream(filename, headers, batches, fmt="csv", compression=None,
+                  progress=None, blobs="base64"):
+    """
+    Потоковый экспорт: порции строк записываются по мере поступления,
+    в памяти одновременно находится только одна порция.
+    BLOB и длинные значения (LazyValue) кодируются по частям - см. BLOB_MODES.
+    Возвращает количество записанных строк.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+
+    with open_output(filename, compression) as f:
+        return write_stream(f, headers, batches, fmt, progress, blobs,
+                            blob_directory(filename))
+
+
+def write_stream(f, headers, batches, fmt="csv", progress=None,
+                 blobs="base64", blob_dir=None):
+    """
+    Потоковая запись в уже открытый текстовый поток (например, stdout).
+    Для blobs="files" нужен каталог blob_dir
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+    return _WRITERS[fmt](f, headers, batches, progress,
+                         _BlobWriter(blobs, blob_dir, headers))
+
+
+class _BlobWriter:
+    """
+    Запись значений BLOB и LazyValue при экспорте: по частям, не собирая
+    значение целиком (кроме CSV, где ячейка пишется одной строкой)
+    """
+
+    def __init__(self, mode, directory, headers):
+        if mode not in BLOB_MODES:
+            raise ValueError(f"Неизвестный способ записи BLOB: {mode}")
+        if mode == "files" and not directory:
+            raise ValueError("Для записи BLOB в файлы нужен каталог")
+        self.mode = mode
+        self.directory = directory
+        # Части имен файлов BLOB по столбцам (без символов, недопустимых
+        # в именах файлов)
+        self._names = [re.sub(r"[^\w.-]+", "_", name) or "column"
+                       for name in headers]
+        self._row = 0
+
+    @staticmethod
+    def plain(row):
+        """В строке нет значений, которые пишутся по частям"""
+        return _CHUNKED_TYPES.isdisjoint(map(type, row))
+
+    def next_row(self):
+        self._row += 1
+
+    def pieces(self, value, column, escape):
+        """
+        Текст значения частями: путь к файлу, base64 или текст длинного
+        значения. escape - части экранируются для строки JSON (без кавычек)
+        """
+        if self.mode == "files":
+            text = self._save(value, column)
+            yield json.dumps(text, ensure_ascii=False)[1:-1] if escape \
+                else text
+        elif isinstance(value, LazyValue) and value.is_text:
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            for chunk in value.chunks():
+                text = decoder.decode(chunk)
+                yield json.dumps(text, ensure_ascii=False)[1:-1] if escape \
+                    else text
+            yield decoder.decode(b"", final=True)
+        else:
+            for chunk in value_chunks(value, BASE64_CHUNK):
+                yield base64.b64encode(chunk).decode("ascii")
+
+    def text(self, value, column):
+        return "".join(self.pieces(value, column, False))
+
+    def _save(self, value, column):
+        """Запись значения в файл каталога BLOB; возвращает путь к файлу"""
+        os.makedirs(self.directory, exist_ok=True)
+        extension = ".txt" if isinstance(value, LazyValue) and value.is_text \
+            else ".bin"
+        name = f"{self._row}_{self._names[column]}{extension}"
+        with open(os.path.join(self.directory, name), "wb") as f:
+            for chunk in value_chunks(value):
+                f.write(chunk)
+        return os.path.join(os.path.basename(self.directory), name)
+
+
+def _write_csv(f, headers, batches, progress, blobs):
+    writer = csv.writer(f)
+    writer.writerow(headers)
+    count = 0
+    for batch in batches:
+        for row in batch:
+            blobs.next_row()
+            if not blobs.plain(row):
+                row = [blobs.text(value, i) if type(value) in _CHUNKED_TYPES
+                       else value for i, value in enumerate(row)]
+            writer.writerow(row)
+        count += len(batch)
+        if progress:
+            progress(count)
+    return count
+
+
+def _write_object(f, headers, row, blobs, indent):
+    """
+    Объект JSON строки с BLOB: значения BLOB пишутся в файл по частям.
+    indent - отступ строк объекта или None (одна строка, как у json.dumps)
+    """
+    separator = ",\n" + indent if indent is not None else ", "
+    f.write("{\n" + indent if indent is not None else "{")
+    for i, (name, value) in enumerate(zip(headers, row)):
+        if i:
+            f.write(separator)
+        f.write(json.dumps(name, ensure_ascii=False) + ": ")
+        if type(value) in _CHUNKED_TYPES:
+            f.write('"')
+            for piece in blobs.pieces(value, i, True):
+                f.write(piece)
+            f.write('"')
+        else:
+            f.write(json.dumps(value, ensure_ascii=False))
+    f.write("\n" + indent[:-4] + "}" if indent is not None else "}")
+
+
+def _write_json(f, headers, batches, progress, blobs):
+    # Тот же вид, что дает json.dump(data, indent=4), но без списка словарей
+    count = 0
+    for batch in batches:
+        for row in batch:
+            blobs.next_row()
+            f.write(",\n    " if count else "[\n    ")
+            if blobs.plain(row):
+                item = json.dumps(dict(zip(headers, row)),
+                                  ensure_ascii=False, indent=4)
+                f.write(item.replace("\n", "\n    "))
+            else:
+                _write_object(f, headers, row, blobs, " " * 8)
+            count += 1
+        if progress:
+            progress(count)
+    f.write("\n]" if count else "[]")
+    return count
+
+
+def _write_ndjson(f, headers, batches, progress, blobs):
+    count = 0
+    for batch in batches:
+        for row in batch:
+            blobs.next_row()
+            if blobs.plain(row):
+                f.write(json.dumps(dict(zip(headers, row)),
+                                   ensure_ascii=False) + "\n")
+            else:
+                _write_object(f, headers, row, blobs, None)
+                f.write("\n")
+        count += len(batch)
+        if progress:
+            progress(count)
+    return count
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "json": _write_json,
+    "ndjson": _write_ndjson,
+}
 
 
 def export_to_csv(filename, headers, rows):
     """Экспорт данных в CSV"""
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(rows)
+    export_stream(filename, headers, [rows], "csv")
 
 
 def export_to_json(filename, headers, rows):
     """Экспорт данных в JSON"""
-    data = []
-    for row in rows:
-        # Собираем словарь zip-ом заголовков и значений строки
-        item = dict(zip(headers, row))
-        data.append(item)
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    export_stream(filename, headers, [rows], "json")
+
+
+def export_to_ndjson(filename, headers, rows):
+    """Экспорт данных в NDJSON (один JSON-объект на строку)"""
+    export_stream(filename, headers, [rows], "ndjson")
@@ -0,0 +1,186 @@
+import csv
+import json
+import os
+import re
+from itertools import chain, islice
+from sql_editor.db.schema import column_affinity
+from sql_editor.utils.export import COMPRESSORS, detect_format
+
+# Сколько строк просматривается для определения типов столбцов
+SAMPLE_SIZE = 1000
+
+# Размер порции для executemany
+IMPORT_BATCH_SIZE = 10000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_INTEGER_RE = re.compile(r"[+-]?\d+")
+_REAL_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def open_input(filename, compression=None):
+    """Открытие файла для чтения текста с необязательной распаковкой"""
+    if compression:
+        return COMPRESSORS[compression](
+            filename, 'rt', encoding='utf-8', newline='')
+    return open(filename, 'r', newline='', encoding='utf-8')
+
+
+def read_csv(f):
+    """Заголовки и итератор строк CSV-файла"""
+    reader = csv.reader(f)
+    headers = next(reader, [])
+    return headers, reader
+
+
+def read_ndjson(f, sample_size=SAMPLE_SIZE):
+    """Заголовки (ключи объектов из выборки) и итератор строк NDJSON-файла"""
+    objects = (json.loads(line) for line in f if line.strip())
+    sample = list(islice(objects, sample_size))
+
+    headers = []
+    for obj in sample:
+        for key in obj:
+            if key not in headers:
+                headers.append(key)
+
+    def rows():
+        for obj in chain(sample, objects):
+            yield tuple(_json_value(obj.get(key)) for key in headers)
+
+    return headers, rows()
+
+
+def _json_value(value):
+    # Вложенные структуры сохраняются в виде JSON-текста
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def infer_type(values):
+    """Тип столбца SQLite по выборке значений"""
+    kinds = set()
+    for value in values:
+        if value is None or value == "":
+            continue
+        if isinstance(value, int):
+            kinds.add("INTEGER")
+        elif isinstance(value, float):
+            kinds.add("REAL")
+        elif isinstance(value, str) and _INTEGER_RE.fullmatch(value):
+            kinds.add("INTEGER")
+        elif isinstance(value, str) and _REAL_RE.fullmatch(value):
+            kinds.add("REAL")
+        else:
+            return "TEXT"
+
+    if kinds == {"INTEGER"}:
+        return "INTEGER"
+    if kinds <= {"INTEGER", "REAL"} and kinds:
+        return "REAL"
+    return "TEXT"
+
+
+def _to_integer(value):
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _to_real(value):
+    if value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _to_numeric(value):
+    # Целое число не проходит через float: значения больше 2**53
+    # сохраняются без потери точности
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return _to_real(value)
+
+
+def _to_text(value):
+    return None if value == "" else value
+
+
+_CONVERTERS = {
+    "INTEGER": _to_integer,
+    "REAL": _to_real,
+    "NUMERIC": _to_numeric,
+    "TEXT": _to_text,
+    # Столбец без типа хранит значение как есть - строкой из файла
+    "BLOB": _to_text,
+}
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_file(db, filename, table, index_columns=(),
+                batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Загрузка CSV или NDJSON файла в таблицу.
+    Если таблицы нет, она создается с типами, определенными по выборке строк,
+    иначе типы берутся из существующей таблицы.
+    Возвращает количество загруженных строк.
+    """
+    fmt, compression = detect_format(filename)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Неподдерживаемый формат импорта: {os.path.basename(filename)}")
+
+    with open_input(filename, compression) as f:
+        headers, rows = read_csv(f) if fmt == "csv" else read_ndjson(f)
+        if not headers:
+            raise ValueError("В файле нет заголовков столбцов")
+
+        db.schema.refresh()
+        # Имена таблиц и столбцов в SQLite не зависят от регистра
+        tables = {name.lower(): name for name in db.schema.tables()}
+        if table.lower() in tables:
+            existing = {c[1].lower(): c[2] for c in
+                        db.schema.columns(tables[table.lower()])}
+            missing = [h for h in headers if h.lower() not in existing]
+            if missing:
+                raise ValueError(
+                    f"В таблице {table} нет столбцов: {', '.join(missing)}")
+            types = [column_affinity(existing[h.lower()]) for h in headers]
+            column_types = None
+        else:
+            sample = list(islice(rows, SAMPLE_SIZE))
+            types = [infer_type(row[i] if i < len(row) else None
+                                for row in sample)
+                     for i in range(len(headers))]
+            rows = chain(sample, rows)
+            column_types = types
+
+        converters = [_CONVERTERS[t] for t in types]
+        width = len(headers)
+        data = (tuple(convert(value) for convert, value
+                      in zip(converters, chain(row, [None] * (width - len(row)))))
+                for row in rows)
+
+        count = db.bulk_insert(table, headers, _batches(data, batch_size),
+                               column_types, progress)
+
+    if index_columns:
+        db.create_indexes(table, index_columns)
+    return count
@@ -0,0 +1,194 @@
+import re
+import sqlite3
+
+# Глобальный список ключевых слов (подсветка синтаксиса и автодополнение)
+SQL_KEYWORDS = [
+    "SELECT", "FROM", "WHERE", "INSERT", "INTO", "VALUES", "UPDATE", "SET",
+    "DELETE", "DROP", "CREATE", "TABLE", "INDEX", "ALTER", "VIEW", "AND", "OR",
+    "NOT", "NULL", "PRIMARY", "KEY", "FOREIGN", "REFERENCES", "DEFAULT",
+    "ORDER", "BY", "GROUP", "LIMIT", "JOIN", "INNER", "LEFT", "RIGHT", "ON",
+    "AS", "DISTINCT", "COUNT", "MAX", "MIN", "AVG", "SUM", "LIKE", "IN",
+    "IS", "EXISTS", "BETWEEN", "HAVING", "UNION", "ALL"
+]
+
+KEYWORD_SET = frozenset(SQL_KEYWORDS)
+
+# Слова, после которых в операторе идет имя таблицы
+TABLE_KEYWORDS = frozenset(("FROM", "JOIN", "INTO", "UPDATE", "TABLE"))
+
+# Слова, которые не могут быть псевдонимом таблицы и завершают список FROM
+_SOURCE_END = frozenset((
+    "WHERE", "ON", "USING", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION",
+    "EXCEPT", "INTERSECT", "WINDOW", "SET", "VALUES", "SELECT", "INNER",
+    "LEFT", "RIGHT", "CROSS", "NATURAL", "FULL", "OUTER", "DEFAULT",
+    "RETURNING", "INDEXED", "NOT", "AS",
+))
+
+# Состояние в конце строки: внутри какой многострочной конструкции она закончилась
+STATE_NONE = 0
+STATE_COMMENT = 1   # /* ... */
+STATE_STRING = 2    # '...'
+STATE_QUOTED = 3    # "..."
+
+# Один общий шаблон на все виды лексем: текст просматривается за один проход
+_TOKEN_RE = re.compile(r"""
+    (?P<comment>--[^\n]*)
+  | (?P<block>/\*(?:.*?(?P<block_end>\*/)|.*))
+  | (?P<string>'(?:[^']|'')*(?P<string_end>'|\Z))
+  | (?P<quoted>"(?:[^"]|"")*(?P<quoted_end>"|\Z)|`[^`\n]*`?|\[[^\]\n]*\]?)
+  | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[^\W\d]\w*)
+  | (?P<punct>[^\s\w])
+""", re.VERBOSE | re.DOTALL)
+
+# Продолжение конструкции, начатой на предыдущей строке
+_CONTINUATION_RE = {
+    STATE_COMMENT: ("comment", re.compile(r".*?(?P<end>\*/)|.*", re.DOTALL)),
+    STATE_STRING: ("string", re.compile(r"(?:[^']|'')*(?P<end>'|\Z)")),
+    STATE_QUOTED: ("quoted", re.compile(r'(?:[^"]|"")*(?P<end>"|\Z)')),
+}
+
+# Незакрытая лексема -> состояние, с которого начнется следующая строка
+_OPEN_STATES = {
+    "block_end": STATE_COMMENT,
+    "string_end": STATE_STRING,
+    "quoted_end": STATE_QUOTED,
+}
+
+
+def tokenize(text, state=STATE_NONE):
+    """
+    Разбор текста на лексемы.
+    Возвращает список (вид, начало, длина) и состояние в конце текста.
+    Виды: keyword, identifier, quoted, string, number, comment, punct.
+    """
+    tokens = []
+    pos = 0
+
+    if state in _CONTINUATION_RE:
+        kind, pattern = _CONTINUATION_RE[state]
+        match = pattern.match(text)
+        pos = match.end()
+        if pos:
+            tokens.append((kind, 0, pos))
+        if not match.group("end"):
+            return tokens, state
+
+    state = STATE_NONE
+    for match in _TOKEN_RE.finditer(text, pos):
+        kind = match.lastgroup
+        start = match.start()
+        length = match.end() - start
+
+        if kind == "word":
+            if match.group().upper() in KEYWORD_SET:
+                kind = "keyword"
+            else:
+                kind = "identifier"
+        elif kind == "block":
+            kind = "comment"
+            if match.group("block_end") is None:
+                state = STATE_COMMENT
+        elif kind in ("string", "quoted"):
+            end_group = f"{kind}_end"
+            if match.group(end_group) == "":
+                state = _OPEN_STATES[end_group]
+
+        tokens.append((kind, start, length))
+
+    return tokens, state
+
+
+def split_statements(text):
+    """
+    Разбиение скрипта на законченные операторы.
+    Точки с запятой внутри строк и комментариев не учитываются, а тело
+    CREATE TRIGGER ... BEGIN ... END проверяется sqlite3.complete_statement.
+    """
+    statements = []
+    tokens, _ = tokenize(text)
+    start = 0
+    meaningful = False
+
+    for kind, pos, length in tokens:
+        if kind == "punct" and text[pos] == ";":
+            candidate = text[start:pos + 1]
+            if sqlite3.complete_statement(candidate):
+                if meaningful:
+                    statements.append(candidate.strip())
+                start = pos + 1
+                meaningful = False
+        elif kind != "comment":
+            meaningful = True
+
+    if meaningful:
+        statements.append(text[start:].strip())
+    return statements
+
+
+def first_keyword(statement):
+    """Первое ключевое слово оператора в верхнем регистре (без учета комментариев)"""
+    # Разбираем только начало текста, а не весь (возможно, длинный) оператор
+    for match in _TOKEN_RE.finditer(statement):
+        if match.lastgroup not in ("comment", "block"):
+            return match.group().upper()
+    return ""
+
+
+def unquote_identifier(text):
+    """Имя без кавычек SQL ("имя", `имя`, [имя])"""
+    if len(text) >= 2 and text[0] in '"`[':
+        body = text[1:-1] if text[-1] in '"`]' else text[1:]
+        return body.replace('""', '"') if text[0] == '"' else body
+    return text
+
+
+def table_references(text):
+    """
+    Таблицы оператора из FROM, JOIN, UPDATE и INTO.
+    Возвращает {имя или псевдоним в нижнем регистре: имя таблицы}.
+    """
+    tokens, _ = tokenize(text)
+    words = [(kind, text[start:start + length])
+             for kind, start, length in tokens if kind != "comment"]
+
+    references = {}
+    in_from = False
+    expect_table = False
+    i = 0
+    while i < len(words):
+        kind, word = words[i]
+        upper = word.upper()
+        i += 1
+
+        if upper in TABLE_KEYWORDS:
+            # Через запятую таблицы перечисляются только в FROM
+            in_from = upper == "FROM"
+            expect_table = True
+            continue
+        if word == "," and in_from:
+            expect_table = True
+            continue
+        if not expect_table:
+            if upper in _SOURCE_END or word in "()":
+                in_from = False
+            continue
+
+        expect_table = False
+        if kind not in ("identifier", "quoted"):
+            continue
+        # Имя со схемой: main.table
+        if (i + 1 < len(words) and words[i][1] == "."
+                and words[i + 1][0] in ("identifier", "quoted")):
+            word = words[i + 1][1]
+            i += 2
+        table = unquote_identifier(word)
+        references[table.lower()] = table
+
+        if i < len(words) and words[i][1].upper() == "AS":
+            i += 1
+        if (i < len(words) and words[i][0] in ("identifier", "quoted")
+                and words[i][1].upper() not in _SOURCE_END):
+            references[unquote_identifier(words[i][1]).lower()] = table
+            i += 1
+    return references
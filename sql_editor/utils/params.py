@@ -0,0 +1,130 @@
+import csv
+import io
+import os
+from sql_editor.utils.export import detect_format
+from sql_editor.utils.importer import (
+    IMPORT_FORMATS, infer_type, open_input, read_csv, read_ndjson
+)
+from sql_editor.utils.lexer import tokenize
+
+# Префиксы именованных параметров SQLite (:name, @name, $name)
+NAMED_PREFIXES = ":@$"
+
+
+def parameter_names(sql):
+    """
+    Параметры запроса в порядке появления.
+    Возвращает (имена, именованные ли). Для позиционных параметров (?, ?NNN)
+    имена - номера "1", "2", ..., для именованных - имена без префикса.
+    Знаки внутри строк и комментариев не учитываются.
+    """
+    tokens, _ = tokenize(sql)
+    names = []
+    positional = 0
+
+    for i, (kind, start, length) in enumerate(tokens):
+        if kind != "punct":
+            continue
+        char = sql[start]
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        # Имя или номер должны идти сразу за префиксом, без пробела
+        if following is not None and following[1] != start + 1:
+            following = None
+
+        if char == "?":
+            if following is not None and following[0] == "number":
+                number = sql[following[1]:following[1] + following[2]]
+                positional = max(positional, int(number))
+            else:
+                positional += 1
+        elif char in NAMED_PREFIXES and following is not None \
+                and following[0] in ("keyword", "identifier"):
+            name = sql[following[1]:following[1] + following[2]]
+            if name not in names:
+                names.append(name)
+
+    if names:
+        return names, True
+    return [str(number) for number in range(1, positional + 1)], False
+
+
+def parse_value(text):
+    """
+    Значение параметра из текста: NULL, целое, вещественное или строка.
+    Текст в одинарных кавычках всегда остается строкой ('123').
+    """
+    if text.upper() == "NULL":
+        return None
+    if len(text) >= 2 and text[0] == text[-1] == "'":
+        return text[1:-1].replace("''", "'")
+    kind = infer_type([text])
+    if kind == "INTEGER":
+        return int(text)
+    if kind == "REAL":
+        return float(text)
+    return text
+
+
+def bind_values(names, named, values):
+    """Набор параметров для sqlite3: словарь по именам или кортеж"""
+    if named:
+        return dict(zip(names, values))
+    return tuple(values)
+
+
+def parameter_rows(headers, rows, names, named, convert=False):
+    """
+    Наборы параметров из строк таблицы с заголовками.
+    Именованные параметры берутся из одноименных столбцов, позиционные -
+    из первых столбцов по порядку. convert - разбирать текстовые значения
+    (CSV и буфер обмена хранят все значения строками).
+    """
+    if named:
+        missing = [name for name in names if name not in headers]
+        if missing:
+            raise ValueError(
+                f"В данных нет столбцов для параметров: {', '.join(missing)}")
+        indexes = [headers.index(name) for name in names]
+    else:
+        if len(headers) < len(names):
+            raise ValueError(
+                f"Параметров в запросе: {len(names)}, "
+                f"столбцов в данных: {len(headers)}")
+        indexes = list(range(len(names)))
+
+    for row in rows:
+        values = [row[i] if i < len(row) else None for i in indexes]
+        if convert:
+            values = [parse_value(v) if isinstance(v, str) else v
+                      for v in values]
+        yield bind_values(names, named, values)
+
+
+def file_parameters(filename, names, named):
+    """
+    Наборы параметров из CSV или NDJSON файла (первая строка CSV - заголовки).
+    Файл читается построчно по мере выполнения.
+    """
+    fmt, compression = detect_format(filename)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Неподдерживаемый формат файла: {os.path.basename(filename)}")
+
+    with open_input(filename, compression) as f:
+        headers, rows = read_csv(f) if fmt == "csv" else read_ndjson(f)
+        yield from parameter_rows(headers, rows, names, named,
+                                  convert=fmt == "csv")
+
+
+def clipboard_parameters(text, names, named):
+    """
+    Наборы параметров из текста буфера обмена: строки с разделителем
+    табуляцией (копирование из электронной таблицы) или запятой.
+    Первая строка - заголовки.
+    """
+    first_line = text.split("\n", 1)[0]
+    delimiter = "\t" if "\t" in first_line else ","
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    headers = [h.strip() for h in next(reader, [])]
+    rows = (row for row in reader if row)
+    return list(parameter_rows(headers, rows, names, named, convert=True))
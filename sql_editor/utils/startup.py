@@ -0,0 +1,132 @@
+"""
+Замеры запуска приложения: время импорта модулей (как python -X importtime)
+и время этапов от старта процесса до восстановления сессии.
+Включаются флагом main.py --startup-report; без него не используются.
+"""
+import sys
+import time
+
+# Сколько самых долгих импортов показывать в отчете
+REPORT_IMPORTS = 25
+
+
+class _TimedLoader:
+    """Обертка загрузчика модуля, замеряющая выполнение его кода"""
+
+    def __init__(self, report, name, loader):
+        self._report = report
+        self._name = name
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Загрузчик модуля подменяется обратно, чтобы обертка не
+        # оставалась в __loader__ и __spec__ после импорта
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        with self._report.timing(self._name):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder:
+    """Поиск модулей остальными средствами sys.meta_path с оберткой загрузчика"""
+
+    def __init__(self, report):
+        self._report = report
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(self._report, name, spec.loader)
+            return spec
+        return None
+
+
+class StartupReport:
+    """
+    Этапы запуска и время импорта модулей.
+    Время импорта считается как у -X importtime: собственное (без вложенных
+    импортов) и полное, в микросекундах
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (этап, секунды от старта)
+        self.stages = []
+        # Модуль -> [собственное время, полное время]
+        self.imports = {}
+        self._stack = []
+        self._finder = None
+
+    def install(self):
+        """Начало замера импортов (до импорта замеряемых модулей)"""
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def timing(self, name):
+        return _ImportTiming(self, name)
+
+    def mark(self, stage):
+        """Отметка завершения этапа запуска"""
+        self.stages.append((stage, time.perf_counter() - self.started))
+
+    def format(self, limit=REPORT_IMPORTS):
+        """Текст отчета: этапы и самые долгие импорты"""
+        lines = ["Запуск (мс от старта):"]
+        previous = 0.0
+        for stage, elapsed in self.stages:
+            step = (elapsed - previous) * 1000
+            lines.append(f"  {elapsed * 1000:9.1f}  (+{step:.1f})  {stage}")
+            previous = elapsed
+
+        if self.imports:
+            total = sum(own for own, _ in self.imports.values())
+            lines.append(f"Импорт модулей: {len(self.imports)}, "
+                         f"{total / 1000:.1f} мс")
+            lines.append("  собств. [мкс] |  полное [мкс] | модуль")
+            slowest = sorted(self.imports.items(), key=lambda item: item[1][1],
+                             reverse=True)[:limit]
+            for name, (own, cumulative) in slowest:
+                lines.append(f"  {own:13.0f} | {cumulative:13.0f} | {name}")
+        return "\n".join(lines)
+
+
+class _ImportTiming:
+    """Контекст замера импорта одного модуля с учетом вложенных импортов"""
+
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+        self.started = 0.0
+        self.nested = 0.0
+
+    def __enter__(self):
+        self.report._stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (time.perf_counter() - self.started) * 1e6
+        stack = self.report._stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.report.imports[self.name] = [elapsed - self.nested, elapsed]
+        return False
@@ -1,6 +1,79 @@
+import base64
+import gzip
+import json
+import os
 import pytest
 import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import benchmark
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+from sql_editor import cli
+from sql_editor.db.backend import (
+    BACKENDS, SqliteBackend, get_backend, register_backend
+)
+from sql_editor.db.cache import ResultCache, normalize_sql
 from sql_editor.db.connection import DatabaseManager
+from sql_editor.db.editing import PendingChanges, cell_text, edit_target
+from sql_editor.db.history import QueryHistory, saved_statements
+from sql_editor.db.preview import TablePreview, sample_rows
+from sql_editor.db.plan import build_plan, clause_columns, suggest_indexes
+from sql_editor.db.profiles import load_profiles, dump_profiles, new_profile
+from sql_editor.db.workload import percentile, run_workload, split_workload
+from sql_editor.utils import export, importer, lexer, params
+from sql_editor.utils.blobs import (
+    LazyValue, bind_rows, display_text, format_hex
+)
+from sql_editor.utils.columnar import ColumnStore, RowFilter
+from sql_editor.utils.completion import (
+    PrefixIndex, SchemaCompletion, completion_context
+)
+from sql_editor.utils.startup import StartupReport
+from sql_editor.ui.result_model import (
+    DELETED_COLOR, EDITED_COLOR, INSERTED_COLOR, ResultTableModel
+)
+from sql_editor.ui.worker import QueryWorker
+
+
+def open_database(path, script="", profile=None, max_readers=None,
+                  cache_bytes=None):
+    """Менеджер соединений для временной БД, схема создается скриптом."""
+    manager = DatabaseManager()
+    if max_readers is not None:
+        manager.max_readers = max_readers
+    manager.connect(str(path), profile)
+    if cache_bytes is not None:
+        manager.result_cache.max_bytes = cache_bytes
+    if script:
+        manager.execute_script(script)
+    return manager
+
+
+@pytest.fixture
+def db_manager(request, tmp_path):
+    """
+    Временная БД и менеджер соединений. Класс тестов задает схему
+    атрибутом SCHEMA, при необходимости - профиль PROFILE (словарь PRAGMA),
+    число читателей MAX_READERS и размер кэша результатов CACHE_BYTES.
+    """
+    cls = request.cls
+    profile = getattr(cls, "PROFILE", None)
+    manager = open_database(
+        tmp_path / "test_core.db", getattr(cls, "SCHEMA", ""),
+        new_profile(profile) if profile else None,
+        getattr(cls, "MAX_READERS", None), getattr(cls, "CACHE_BYTES", None))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope="module")
+def qt_app():
+    """QApplication без окна (платформа offscreen) для тестов моделей Qt."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QApplication.instance() or QApplication([])
 
 
 class TestCoreLogic:
@@ -9,14 +82,6 @@ class TestCoreLogic:
     Проверяет класс DatabaseManager без участия GUI.
     """
 
-    @pytest.fixture
-    def db_manager(self, tmp_path):
-        """Создает временную БД и менеджер соединений."""
-        db_file = tmp_path / "test_core.db"
-        manager = DatabaseManager()
-        manager.connect(str(db_file))
-        return manager
-
     def test_connection_properties(self, db_manager):
         """Тестирует свойства активного соединения."""
         assert db_manager.connection is not None
@@ -88,3 +153,1706 @@ class TestCoreLogic:
         # Проверяем защиту от выполнения запросов после закрытия
         with pytest.raises(ConnectionError):
             db_manager.execute_query("SELECT 1")
+
+    def test_execute_stream(self, db_manager):
+        """Тестирует постраничную выборку результата."""
+        db_manager.execute_query("CREATE TABLE nums (n INT)")
+        db_manager.execute_query(
+            "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s "
+            "WHERE n < 25) INSERT INTO nums SELECT n FROM s"
+        )
+
+        result = db_manager.execute_stream("SELECT n FROM nums", batch_size=10)
+        # Заголовки доступны до получения строк
+        assert result.headers == ['n']
+        assert len(result.fetch()) == 10
+        assert result.fetched == 10
+        assert not result.exhausted
+
+        rest = list(result)
+        assert len(rest) == 15
+        assert result.exhausted
+        assert result.fetch() == []
+
+    def test_execute_stream_action(self, db_manager):
+        """Тестирует потоковое выполнение команды действия."""
+        result = db_manager.execute_stream("CREATE TABLE t (id INT)")
+        assert result.headers == []
+        assert result.exhausted
+
+    def test_execute_script(self, db_manager):
+        """Тестирует выполнение скрипта из нескольких операторов."""
+        results = db_manager.execute_script("""
+            CREATE TABLE t (id INT, name TEXT);
+            INSERT INTO t VALUES (1, 'a'), (2, 'b; c');
+            SELECT name FROM t ORDER BY id;
+            UPDATE t SET name = 'z';
+            SELECT count(*) FROM t;
+        """)
+        assert len(results) == 5
+        assert all(r.error is None for r in results)
+        assert results[1].rowcount == 2
+        assert results[2].headers == ["name"]
+        assert results[2].rows == [("a",), ("b; c",)]
+        assert results[3].rowcount == 2
+        assert results[4].rows == [(2,)]
+        assert all(r.elapsed >= 0 for r in results)
+        assert not db_manager.connection.in_transaction
+
+    def test_execute_script_stop_on_error(self, db_manager):
+        """Тестирует откат всего скрипта при первой ошибке."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        results = db_manager.execute_script(
+            "INSERT INTO t VALUES (1); INSERT INTO missing VALUES (2);"
+            "INSERT INTO t VALUES (3);")
+        assert len(results) == 2
+        assert isinstance(results[1].error, sqlite3.OperationalError)
+        assert db_manager.execute_query("SELECT * FROM t")[1] == []
+        assert results[1].rolled_back
+
+    def test_execute_script_own_begin_rolled_back(self, db_manager):
+        """Тестирует откат транзакции, открытой BEGIN самого скрипта."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        results = db_manager.execute_script(
+            "BEGIN; INSERT INTO t VALUES (1); INSERT INTO missing VALUES (2);"
+            "COMMIT;")
+        assert len(results) == 3 and results[2].rolled_back
+        assert not db_manager.in_transaction
+        assert db_manager.execute_query("SELECT * FROM t")[1] == []
+
+        # Транзакция, открытая до скрипта, не откатывается
+        db_manager.begin()
+        db_manager.execute_query("INSERT INTO t VALUES (5)")
+        results = db_manager.execute_script("BEGIN; SELECT 1;")
+        assert results[0].error is not None and not results[0].rolled_back
+        assert db_manager.in_transaction
+        db_manager.rollback()
+
+    def test_execute_script_continue_on_error(self, db_manager):
+        """Тестирует продолжение скрипта после ошибки."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        results = db_manager.execute_script(
+            "INSERT INTO t VALUES (1); INSERT INTO missing VALUES (2);"
+            "INSERT INTO t VALUES (3);", stop_on_error=False)
+        assert [r.error is None for r in results] == [True, False, True]
+        assert db_manager.execute_query("SELECT * FROM t")[1] == [(1,), (3,)]
+
+    def test_manual_transaction(self, db_manager):
+        """Тестирует ручной режим транзакций: COMMIT и ROLLBACK."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        db_manager.autocommit = False
+
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        assert db_manager.in_transaction
+        assert db_manager.is_dirty()
+        db_manager.rollback()
+        assert not db_manager.in_transaction
+        assert db_manager.execute_query("SELECT * FROM t")[1] == []
+        # SELECT в ручном режиме тоже открывает транзакцию, но без изменений
+        assert db_manager.in_transaction and not db_manager.is_dirty()
+
+        db_manager.execute_query("INSERT INTO t VALUES (2)")
+        db_manager.commit()
+        assert not db_manager.in_transaction
+        assert db_manager.execute_query("SELECT * FROM t")[1] == [(2,)]
+
+    def test_manual_transaction_ddl_is_dirty(self, db_manager):
+        """Тестирует, что незафиксированный DDL считается изменением."""
+        db_manager.autocommit = False
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        assert db_manager.is_dirty()
+        db_manager.rollback()
+        assert db_manager.get_tables() == []
+
+    def test_savepoints(self, db_manager):
+        """Тестирует откат к точке сохранения."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        db_manager.autocommit = False
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        name = db_manager.savepoint()
+        db_manager.execute_query("INSERT INTO t VALUES (2)")
+        db_manager.savepoint()
+        assert db_manager.savepoints == [name, "sp2"]
+
+        db_manager.rollback_to(name)
+        assert db_manager.savepoints == [name]
+        db_manager.commit()
+        assert db_manager.savepoints == []
+        assert db_manager.execute_query("SELECT * FROM t")[1] == [(1,)]
+
+    def test_user_begin_detected(self, db_manager):
+        """Тестирует распознавание BEGIN/COMMIT в SQL пользователя."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        db_manager.execute_query("BEGIN")
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        assert db_manager.in_transaction and db_manager.is_dirty()
+        db_manager.execute_query("COMMIT")
+        assert not db_manager.in_transaction
+
+    def test_script_in_manual_transaction(self, db_manager):
+        """Тестирует, что ошибка скрипта не откатывает ранее сделанные изменения."""
+        db_manager.execute_query("CREATE TABLE t (id INT)")
+        db_manager.autocommit = False
+        db_manager.execute_query("INSERT INTO t VALUES (1)")
+        results = db_manager.execute_script(
+            "INSERT INTO t VALUES (2); INSERT INTO missing VALUES (3);")
+        assert results[-1].error is not None
+        assert db_manager.in_transaction
+        assert db_manager.execute_query("SELECT * FROM t")[1] == [(1,)]
+
+    def test_session_pragma(self, db_manager):
+        """Тестирует установку PRAGMA для сеанса."""
+        assert db_manager.set_pragma("synchronous", "OFF") == 0
+        assert db_manager.set_pragma("journal_mode", "WAL") == "wal"
+
+    def test_connection_profile(self, tmp_path):
+        """Тестирует применение профиля соединения при подключении."""
+        path = str(tmp_path / "profile.db")
+        profile = new_profile({
+            "journal_mode": "WAL",
+            "cache_size": -65536,
+            "mmap_size": 67108864,
+            "temp_store": "MEMORY",
+            "busy_timeout": 1234,
+        })
+        manager = DatabaseManager()
+        manager.connect(path, profile)
+
+        settings = manager.effective_settings()
+        assert manager.profile_errors == {}
+        assert settings["journal_mode"] == "wal"
+        assert settings["cache_size"] == -65536
+        assert settings["mmap_size"] == 67108864
+        assert settings["temp_store"] == 2
+        assert settings["busy_timeout"] == 1234
+
+        # Профили переживают сохранение в настройки и чтение обратно
+        assert load_profiles(dump_profiles({path: profile})) == {path: profile}
+        assert load_profiles("not json") == {}
+
+    def test_read_only_profile(self, tmp_path):
+        """Тестирует подключение в режиме только для чтения."""
+        path = str(tmp_path / "ro.db")
+        writer = DatabaseManager()
+        writer.connect(path)
+        writer.execute_query("CREATE TABLE t (id INT)")
+        writer.close()
+
+        reader = DatabaseManager()
+        reader.connect(path, new_profile(read_only=True))
+        assert reader.get_tables() == ["t"]
+        with pytest.raises(sqlite3.OperationalError):
+            reader.execute_query("INSERT INTO t VALUES (1)")
+
+    def test_schema_cache(self, db_manager):
+        """Тестирует кэш структуры БД и его обновление по schema_version."""
+        db_manager.execute_query(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT NOT NULL)")
+        db_manager.execute_query("CREATE INDEX idx_title ON items (title)")
+        db_manager.execute_query("CREATE VIEW v_items AS SELECT title FROM items")
+
+        schema = db_manager.schema
+        assert schema.refresh() is True
+        # Без изменений схемы повторная загрузка не выполняется
+        assert schema.refresh() is False
+
+        assert schema.tables() == ["items"]
+        assert schema.views() == ["v_items"]
+        assert schema.column_names("items") == ["id", "title"]
+        assert [row[1] for row in schema.indexes("items")] == ["idx_title"]
+        assert schema.index_columns("idx_title") == ["title"]
+
+        # Запрос на чтение не меняет схему, DDL - меняет
+        db_manager.execute_query("SELECT * FROM items")
+        assert schema.refresh() is False
+        db_manager.execute_query("DROP VIEW v_items")
+        assert schema.refresh() is True
+        assert schema.views() == []
+
+    def test_result_cache(self, db_manager):
+        """Тестирует кэш результатов и его сброс после изменения данных."""
+        db_manager.execute_query("CREATE TABLE items (id INTEGER, title TEXT)")
+        db_manager.execute_query("INSERT INTO items VALUES (1, 'a'), (2, 'b')")
+
+        first = db_manager.execute_stream("SELECT * FROM items ORDER BY id")
+        assert first.fetch_all() == [(1, 'a'), (2, 'b')]
+        assert first.from_cache is False
+
+        # Тот же запрос в другом регистре и с комментарием берется из кэша
+        second = db_manager.execute_stream(
+            "select *  from ITEMS -- повтор\n order by id;")
+        assert second.from_cache is True
+        assert second.fetch_all() == [(1, 'a'), (2, 'b')]
+
+        # Запись делает старый результат недостижимым
+        db_manager.execute_query("INSERT INTO items VALUES (3, 'c')")
+        third = db_manager.execute_stream("SELECT * FROM items ORDER BY id")
+        assert third.from_cache is False
+        assert len(third.fetch_all()) == 3
+
+        # Недочитанный результат не кэшируется
+        partial = db_manager.execute_stream("SELECT id FROM items", batch_size=1)
+        partial.fetch()
+        partial.close()
+        assert db_manager.execute_stream("SELECT id FROM items").from_cache is False
+
+        assert normalize_sql("SELECT random()") is None
+        assert normalize_sql("select 'x' ;") == "SELECT 'x'"
+
+    def test_query_profile(self, db_manager, tmp_path):
+        """Тестирует профиль запроса: время, строки, трассировку и экспорт."""
+        db_manager.execute_query("CREATE TABLE items (id INTEGER, title TEXT)")
+        db_manager.execute_many("INSERT INTO items VALUES (?, ?)",
+                                ((i, f"item {i}") for i in range(3000)))
+
+        result = db_manager.execute_stream(
+            "SELECT * FROM items WHERE id >= ?", batch_size=1000, params=(0,))
+        result.fetch()
+        profile = list(db_manager.profiles)[-1]
+        assert profile.rows == 1000 and not profile.finished
+        result.fetch_all()
+        assert profile.rows == 3000 and profile.finished
+        assert profile.statements == ["SELECT * FROM items WHERE id >= 0"]
+        assert profile.bytes > 0 and profile.vm_steps > 0
+        assert profile.wall_time == pytest.approx(
+            profile.prepare_time + profile.step_time + profile.fetch_time)
+
+        with pytest.raises(sqlite3.OperationalError):
+            db_manager.execute_stream("SELECT * FROM missing")
+        assert "missing" in list(db_manager.profiles)[-1].error
+
+        path = tmp_path / "profile.json"
+        db_manager.profiles.export_json(str(path))
+        data = json.loads(path.read_text(encoding="utf-8"))
+        # INSERT для списка наборов, выборка и ошибочный запрос
+        assert [entry["rows"] for entry in data] == [3000, 3000, 0]
+        assert data[1]["params"] == [0]
+
+    def test_query_history(self, db_manager, tmp_path):
+        """Тестирует запись истории запросов и полнотекстовый поиск."""
+        history_path = str(tmp_path / "history.sqlite")
+        db_manager.history = QueryHistory(history_path)
+        db_manager.execute_query("CREATE TABLE items (id INTEGER, title TEXT)")
+        db_manager.execute_stream("SELECT title FROM items").fetch_all()
+        db_manager.execute_script("INSERT INTO items VALUES (1, 'a');"
+                                  "SELECT count(*) FROM items;")
+        with pytest.raises(sqlite3.OperationalError):
+            db_manager.execute_stream("SELECT * FROM missing_table")
+        # Запись идет в фоне; close() дописывает очередь
+        db_manager.history.close()
+
+        history = QueryHistory(history_path)
+        rows = history.search().fetch_all()
+        assert [row[1] for row in rows] == [
+            "SELECT * FROM missing_table", "SELECT count(*) FROM items;",
+            "INSERT INTO items VALUES (1, 'a');", "SELECT title FROM items"]
+        assert rows[1][3] == 1 and "missing_table" in rows[0][4]
+        assert [row[1] for row in history.search("ite tit").fetch_all()] == [
+            "SELECT title FROM items"]
+        history.clear()
+        assert history.search("items").fetch_all() == []
+        history.close()
+
+    def test_history_waits_for_fetch(self, db_manager, tmp_path):
+        """Тестирует запись выборки в историю после получения всех строк."""
+        history = db_manager.history = QueryHistory(
+            str(tmp_path / "history.sqlite"))
+        db_manager.execute_script(
+            "CREATE TABLE n (x); INSERT INTO n VALUES (1), (2), (3), (4), (5);")
+        connection = sqlite3.connect(history.path)
+
+        def recorded():
+            history._flush(connection)
+            return connection.execute(
+                "SELECT rows, duration FROM history "
+                "WHERE sql = 'SELECT x FROM n'").fetchall()
+
+        result = db_manager.execute_stream("SELECT x FROM n", 2)
+        assert len(result.fetch()) == 2
+        assert recorded() == []
+        result.fetch_all()
+        assert result.profile.finished
+        rows = recorded()
+        assert len(rows) == 1 and rows[0][0] == 5
+        assert rows[0][1] == pytest.approx(result.profile.wall_time)
+
+        # Незаконченная выборка пишется при закрытии истории
+        db_manager.execute_stream("SELECT x FROM n WHERE x > 1", 2).fetch()
+        history.close()
+        assert connection.execute(
+            "SELECT rows FROM history WHERE sql LIKE '%x > 1'").fetchall() \
+            == [(2,)]
+        connection.close()
+
+    def test_result_cache_eviction(self):
+        """Тестирует вытеснение давно не использованных результатов по объему."""
+        cache = ResultCache(max_bytes=100)
+        cache.put("a", ["x"], [(1,)], 40)
+        cache.put("b", ["x"], [(2,)], 40)
+        assert cache.get("a") is not None
+        cache.put("c", ["x"], [(3,)], 40)
+        # Вытеснен "b" - к "a" обращались позже
+        assert cache.get("b") is None
+        assert len(cache) == 2 and cache.bytes == 80
+        # Результат больше всего кэша не сохраняется
+        cache.put("d", ["x"], [(4,)], 500)
+        assert cache.get("d") is None
+
+
+class TestLexer:
+    """Тесты разбора SQL на лексемы (используется подсветкой синтаксиса)."""
+
+    @staticmethod
+    def kinds(text, state=lexer.STATE_NONE):
+        tokens, state = lexer.tokenize(text, state)
+        return [(kind, text[start:start + length])
+                for kind, start, length in tokens], state
+
+    def test_single_line(self):
+        """Тестирует распознавание видов лексем в одной строке."""
+        tokens, state = self.kinds(
+            "select name, 42 from \"t\" where x = 'a''b' -- note")
+        assert tokens == [
+            ("keyword", "select"), ("identifier", "name"), ("punct", ","),
+            ("number", "42"), ("keyword", "from"), ("quoted", '"t"'),
+            ("keyword", "where"), ("identifier", "x"), ("punct", "="),
+            ("string", "'a''b'"), ("comment", "-- note"),
+        ]
+        assert state == lexer.STATE_NONE
+
+    def test_multiline_comment(self):
+        """Тестирует перенос состояния комментария /* */ между строками."""
+        tokens, state = self.kinds("SELECT /* start")
+        assert tokens[-1] == ("comment", "/* start")
+        assert state == lexer.STATE_COMMENT
+
+        tokens, state = self.kinds("still comment", state)
+        assert tokens == [("comment", "still comment")]
+        assert state == lexer.STATE_COMMENT
+
+        tokens, state = self.kinds("end */ FROM", state)
+        assert tokens == [("comment", "end */"), ("keyword", "FROM")]
+        assert state == lexer.STATE_NONE
+
+    def test_multiline_string(self):
+        """Тестирует перенос состояния строкового литерала между строками."""
+        tokens, state = self.kinds("INSERT INTO t VALUES ('line one")
+        assert state == lexer.STATE_STRING
+
+        tokens, state = self.kinds("it''s line two');", state)
+        assert tokens[0] == ("string", "it''s line two'")
+        assert state == lexer.STATE_NONE
+
+    def test_split_statements(self):
+        """Тестирует разбиение скрипта на операторы."""
+        script = """
+            -- миграция
+            CREATE TABLE t (id INT, note TEXT);
+            INSERT INTO t VALUES (1, 'a; b'); /* ; */
+            CREATE TRIGGER trg AFTER INSERT ON t BEGIN
+                UPDATE t SET note = 'x;' WHERE id = new.id;
+                DELETE FROM t WHERE id < 0;
+            END;
+            SELECT * FROM t
+        """
+        statements = lexer.split_statements(script)
+        assert len(statements) == 4
+        assert statements[0].startswith("-- миграция")
+        assert statements[1] == "INSERT INTO t VALUES (1, 'a; b');"
+        # Комментарий после ";" относится к следующему оператору
+        assert statements[2].startswith("/* ; */")
+        assert statements[2].endswith("END;")
+        assert statements[3] == "SELECT * FROM t"
+        assert lexer.first_keyword(statements[2]) == "CREATE"
+        assert lexer.split_statements("-- только комментарий;") == []
+
+    def test_keywords_reexported(self):
+        """Тестирует, что список ключевых слов доступен и из модуля подсветки."""
+        from sql_editor.ui import syntax
+        assert syntax.SQL_KEYWORDS is lexer.SQL_KEYWORDS
+
+
+class TestExport:
+    """Тесты потокового экспорта результатов."""
+
+    HEADERS = ["id", "name"]
+    ROWS = [(1, "Тони"), (2, None), (3, 'quote "x"')]
+
+    def test_json_matches_dump(self, tmp_path):
+        """Тестирует, что потоковый JSON совпадает с json.dump(indent=4)."""
+        path = tmp_path / "out.json"
+        export.export_stream(str(path), self.HEADERS,
+                             [self.ROWS[:2], self.ROWS[2:]], "json")
+        expected = json.dumps([dict(zip(self.HEADERS, row)) for row in self.ROWS],
+                              ensure_ascii=False, indent=4)
+        assert path.read_text(encoding="utf-8") == expected
+
+        export.export_to_json(str(path), self.HEADERS, [])
+        assert json.loads(path.read_text(encoding="utf-8")) == []
+
+    def test_ndjson_gzip(self, tmp_path):
+        """Тестирует NDJSON со сжатием и отчет о прогрессе по порциям."""
+        path = tmp_path / "out.ndjson.gz"
+        fmt, compression = export.detect_format(str(path))
+        assert (fmt, compression) == ("ndjson", ".gz")
+
+        reported = []
+        count = export.export_stream(str(path), self.HEADERS,
+                                     [self.ROWS[:2], self.ROWS[2:]], fmt,
+                                     compression, reported.append)
+        assert count == 3
+        assert reported == [2, 3]
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[1] == {"id": 2, "name": None}
+
+    def test_stream_from_cursor(self, tmp_path):
+        """Тестирует экспорт прямо из курсора без загрузки всех строк."""
+        manager = DatabaseManager()
+        manager.connect(str(tmp_path / "export.db"))
+        manager.execute_query("CREATE TABLE t (n INT)")
+        manager.execute_query(
+            "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s "
+            "WHERE n < 250) INSERT INTO t SELECT n FROM s")
+
+        result = manager.execute_stream("SELECT n FROM t", batch_size=100)
+        path = tmp_path / "out.csv"
+        reported = []
+        export.export_stream(str(path), result.headers, result.batches(),
+                             progress=reported.append)
+        assert reported == [100, 200, 250]
+        assert path.read_text(encoding="utf-8").splitlines()[:2] == ["n", "1"]
+
+    def test_can_rerun(self, tmp_path):
+        """Тестирует, какие запросы экспорт может выполнить повторно."""
+        manager = DatabaseManager()
+        manager.connect(str(tmp_path / "export.db"))
+        manager.execute_query("CREATE TABLE t (n INT)")
+        manager.execute_query("CREATE VIEW v AS SELECT n FROM t")
+        manager.execute_query("CREATE TEMP TABLE tmp (n INT)")
+        manager.execute_query("CREATE TEMP VIEW tv AS SELECT n FROM t")
+        manager.execute_query(
+            f"ATTACH '{tmp_path / 'other.db'}' AS other")
+        manager.execute_query("CREATE TABLE other.o (n INT)")
+
+        assert manager.can_rerun("SELECT n FROM t WHERE n > ?", (1,))
+        assert manager.can_rerun("SELECT * FROM v")
+        assert manager.can_rerun("VALUES (1)")
+        assert not manager.can_rerun("SELECT n FROM tmp")
+        assert not manager.can_rerun("SELECT * FROM tv")
+        assert not manager.can_rerun("SELECT n FROM other.o")
+        assert not manager.can_rerun("INSERT INTO t VALUES (1) RETURNING n")
+        assert not manager.can_rerun("SELECT * FROM missing")
+
+        # Незафиксированные изменения другое соединение не видит
+        manager.autocommit = False
+        manager.execute_query("INSERT INTO t VALUES (1)")
+        assert not manager.can_rerun("SELECT n FROM t")
+        manager.rollback()
+        assert manager.can_rerun("SELECT n FROM t")
+        manager.close()
+
+
+class TestImport:
+    """Тесты массовой загрузки данных из файлов."""
+
+    def test_infer_type(self):
+        """Тестирует определение типа столбца по выборке."""
+        assert importer.infer_type(["1", "-2", ""]) == "INTEGER"
+        assert importer.infer_type(["1", "2.5", None]) == "REAL"
+        assert importer.infer_type(["1", "abc"]) == "TEXT"
+        assert importer.infer_type([]) == "TEXT"
+
+    def test_import_csv_creates_table(self, db_manager, tmp_path):
+        """Тестирует загрузку CSV в новую таблицу порциями с индексом."""
+        path = tmp_path / "data.csv"
+        lines = ["id,name,score"] + [f"{i},name {i},{i / 2}" for i in range(25)]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        reported = []
+        count = importer.import_file(db_manager, str(path), "scores",
+                                     index_columns=["name"], batch_size=10,
+                                     progress=reported.append)
+        assert count == 25
+        assert reported == [10, 20, 25]
+
+        columns = db_manager.connection.execute(
+            "PRAGMA table_info(scores)").fetchall()
+        assert [(c[1], c[2]) for c in columns] == [
+            ("id", "INTEGER"), ("name", "TEXT"), ("score", "REAL")]
+
+        headers, rows = db_manager.execute_query(
+            "SELECT * FROM scores WHERE id = 3")
+        assert rows == [(3, "name 3", 1.5)]
+        db_manager.schema.refresh()
+        assert db_manager.schema.names("index") == ["idx_scores_name"]
+
+    def test_import_ndjson_into_existing(self, db_manager, tmp_path):
+        """Тестирует загрузку NDJSON в существующую таблицу."""
+        db_manager.execute_query("CREATE TABLE events (kind TEXT, payload TEXT)")
+        path = tmp_path / "events.ndjson"
+        path.write_text('{"kind": "a", "payload": {"x": 1}}\n'
+                        '{"kind": "b"}\n', encoding="utf-8")
+
+        assert importer.import_file(db_manager, str(path), "events") == 2
+        headers, rows = db_manager.execute_query("SELECT * FROM events")
+        assert rows == [("a", '{"x": 1}'), ("b", None)]
+
+    def test_import_into_existing_other_case(self, db_manager, tmp_path):
+        """Тестирует загрузку в таблицу, имя которой задано в другом регистре."""
+        db_manager.execute_query(
+            "CREATE TABLE users (ID INTEGER, name, Score REAL)")
+        path = tmp_path / "users.csv"
+        path.write_text("id,NAME,score\n1,,2\n2,42,x\n", encoding="utf-8")
+
+        # Таблица не создается заново, типы берутся из нее
+        assert importer.import_file(db_manager, str(path), "Users") == 2
+        _, rows = db_manager.execute_query(
+            "SELECT id, name, typeof(name), score FROM users")
+        assert rows == [(1, None, "null", 2.0), (2, "42", "text", "x")]
+
+        path.write_text("id,extra\n3,a\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="extra"):
+            importer.import_file(db_manager, str(path), "USERS")
+
+    def test_import_numeric_precision(self, db_manager, tmp_path):
+        """Тестирует загрузку больших целых в столбец NUMERIC без потери точности."""
+        db_manager.execute_query("CREATE TABLE n (v NUMERIC)")
+        path = tmp_path / "n.csv"
+        path.write_text("v\n9007199254740993\n2.5\n1e3\n\nabc\n",
+                        encoding="utf-8")
+
+        assert importer.import_file(db_manager, str(path), "n") == 5
+        _, rows = db_manager.execute_query("SELECT v FROM n ORDER BY rowid")
+        assert rows == [(9007199254740993,), (2.5,), (1000,), (None,),
+                        ("abc",)]
+
+    def test_import_rolls_back_on_error(self, db_manager, tmp_path):
+        """Тестирует откат всей загрузки при ошибке."""
+        db_manager.execute_query("CREATE TABLE u (id INTEGER PRIMARY KEY)")
+        path = tmp_path / "dup.csv"
+        path.write_text("id\n1\n2\n2\n", encoding="utf-8")
+
+        with pytest.raises(sqlite3.IntegrityError):
+            importer.import_file(db_manager, str(path), "u")
+        assert db_manager.execute_query("SELECT * FROM u")[1] == []
+
+    def test_import_in_manual_transaction(self, db_manager, tmp_path):
+        """Тестирует импорт в ручном режиме: без COMMIT за пользователя."""
+        db_manager.execute_query("CREATE TABLE u (id INTEGER PRIMARY KEY)")
+        db_manager.autocommit = False
+        db_manager.execute_query("INSERT INTO u VALUES (100)")
+        path = tmp_path / "ids.csv"
+        path.write_text("id\n1\n2\n", encoding="utf-8")
+
+        assert importer.import_file(db_manager, str(path), "u",
+                                    index_columns=["id"]) == 2
+        assert db_manager.in_transaction
+        # Ошибка откатывает только свою загрузку
+        path.write_text("id\n3\n3\n", encoding="utf-8")
+        with pytest.raises(sqlite3.IntegrityError):
+            importer.import_file(db_manager, str(path), "u")
+        assert db_manager.execute_query("SELECT id FROM u")[1] == [
+            (1,), (2,), (100,)]
+
+        db_manager.rollback()
+        assert db_manager.execute_query("SELECT id FROM u")[1] == []
+
+
+class TestParams:
+    """Тесты параметров запросов и выполнения для списка наборов."""
+
+    SCHEMA = "CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT);"
+
+    def test_parameter_names(self):
+        """Тестирует поиск позиционных и именованных параметров."""
+        assert params.parameter_names(
+            "SELECT * FROM t WHERE id = ? AND name = ?") == (["1", "2"], False)
+        assert params.parameter_names(
+            "SELECT :id, @name, :id, '?' -- ?") == (["id", "name"], True)
+        assert params.parameter_names("SELECT ?3") == (["1", "2", "3"], False)
+        assert params.parameter_names("SELECT a : b") == ([], False)
+
+    def test_parse_value(self):
+        """Тестирует разбор значений из панели параметров."""
+        assert params.parse_value("NULL") is None
+        assert params.parse_value("42") == 42
+        assert params.parse_value("1.5") == 1.5
+        assert params.parse_value("'42'") == "42"
+        assert params.parse_value("abc") == "abc"
+
+    def test_execute_with_params(self, db_manager):
+        """Тестирует выполнение запросов с привязкой параметров."""
+        db_manager.execute_query("INSERT INTO t VALUES (?, ?)", (1, "a'b"))
+        headers, rows = db_manager.execute_query(
+            "SELECT name FROM t WHERE id = :id", {"id": 1})
+        assert rows == [("a'b",)]
+        result = db_manager.execute_stream("SELECT id FROM t WHERE name = ?",
+                                           params=("a'b",))
+        assert result.fetch_all() == [(1,)]
+
+    def test_execute_many_from_file(self, db_manager, tmp_path):
+        """Тестирует выполнение оператора для наборов из CSV-файла."""
+        path = tmp_path / "rows.csv"
+        path.write_text("name,id\nx,1\ny,2\nNULL,3\n", encoding="utf-8")
+        parameters = params.file_parameters(str(path), ["id", "name"], True)
+        executed, changed = db_manager.execute_many(
+            "INSERT INTO t VALUES (:id, :name)", parameters)
+        assert (executed, changed) == (3, 3)
+        assert db_manager.execute_query("SELECT * FROM t")[1] == [
+            (1, "x"), (2, "y"), (3, None)]
+
+    def test_execute_many_rolls_back(self, db_manager):
+        """Тестирует откат всех наборов при ошибке одного из них."""
+        rows = params.clipboard_parameters("id\tname\n1\ta\n1\tb\n",
+                                           ["1", "2"], False)
+        with pytest.raises(sqlite3.IntegrityError):
+            db_manager.execute_many("INSERT INTO t VALUES (?, ?)", rows)
+        assert db_manager.execute_query("SELECT * FROM t")[1] == []
+        assert not db_manager.in_transaction
+
+
+class TestPlan:
+    """Тесты анализа плана запроса и подсказок по индексам."""
+
+    SCHEMA = (
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, customer INTEGER, "
+        "status TEXT, created TEXT);"
+        "CREATE INDEX idx_status ON orders (status);")
+
+    def analyze(self, db_manager, sql):
+        roots = build_plan(db_manager.explain(sql))
+        return roots, suggest_indexes(sql, roots, db_manager.schema)
+
+    def test_clause_columns(self):
+        """Тестирует выделение столбцов условий и сортировки."""
+        equality, ranges, order = clause_columns(
+            "SELECT * FROM t AS x WHERE x.a = 1 AND 5 < b AND lower(c) = 'q' "
+            "AND d IS NOT NULL ORDER BY e DESC, x.f")
+        assert equality == [("x", "a")]
+        assert ranges == [(None, "b")]
+        assert order == [(None, "e"), ("x", "f")]
+
+    def test_full_scan_suggestion(self, db_manager):
+        """Тестирует подсказку индекса для полного просмотра и сортировки."""
+        roots, suggestions = self.analyze(
+            db_manager,
+            "SELECT * FROM orders o WHERE o.customer = 7 ORDER BY o.created")
+        warnings = [node.warning for root in roots for node in root.walk()]
+        assert "полный просмотр таблицы" in warnings
+        assert "сортировка во временном B-дереве" in warnings
+        assert [(s.table, s.columns) for s in suggestions] == [
+            ("orders", ["customer", "created"])]
+        assert suggestions[0].sql == (
+            'CREATE INDEX "idx_orders_customer_created" ON "orders" '
+            '("customer", "created");')
+
+    def test_index_used(self, db_manager):
+        """Тестирует отсутствие подсказок, когда индекс используется."""
+        roots, suggestions = self.analyze(
+            db_manager, "SELECT * FROM orders WHERE status = 'new'")
+        assert roots[0].index == "idx_status"
+        assert not roots[0].warning
+        assert suggestions == []
+
+
+class TestCompletion:
+    """Тесты автодополнения по структуре БД."""
+
+    @pytest.fixture
+    def completion(self, tmp_path):
+        manager = DatabaseManager()
+        manager.connect(str(tmp_path / "completion.db"))
+        manager.execute_script(
+            "CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, "
+            "total REAL);"
+            "CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);"
+            "CREATE VIEW order_totals AS SELECT customer_id, sum(total) "
+            "AS total FROM orders GROUP BY customer_id;")
+        manager.schema.refresh()
+        return SchemaCompletion(manager.schema)
+
+    @staticmethod
+    def complete(completion, text):
+        # Курсор - на месте символа "|"
+        position = text.index("|")
+        return completion.complete(text.replace("|", ""), position)
+
+    def test_prefix_index(self):
+        """Тестирует поиск по префиксу без учета регистра."""
+        index = PrefixIndex(["Orders", "order_items", "customers", "OrderLog"])
+        assert index.find("ORD") == ["order_items", "OrderLog", "Orders"]
+        assert index.find("x") == []
+        assert index.find("", limit=2) == ["customers", "order_items"]
+
+    def test_context(self):
+        """Тестирует определение контекста по тексту перед курсором."""
+        text = "SELECT o.to FROM orders AS o; SELECT * FROM a, cu"
+        kind, prefix, qualifier, tables = completion_context(text, 11)
+        assert (kind, prefix, qualifier) == ("column", "to", "o")
+        assert tables == {"orders": "orders", "o": "orders"}
+        assert completion_context(text, len(text))[:2] == ("table", "cu")
+        assert completion_context("SELECT 'FROM x", 14) is None
+        assert completion_context("-- FROM x", 9) is None
+
+        # Точка с запятой в строке или комментарии не разделяет операторы
+        text = "SELECT * FROM notes n WHERE note = 'a;b' /* ; */ AND n."
+        kind, prefix, qualifier, tables = completion_context(text, len(text))
+        assert (kind, qualifier) == ("column", "n")
+        assert tables == {"notes": "notes", "n": "notes"}
+        text = "SELECT 1; SELECT x FROM t WHERE y = ';' AND "
+        assert completion_context(text, len(text))[3] == {"t": "t"}
+
+    def test_tables_and_columns(self, completion):
+        """Тестирует варианты таблиц, столбцов по псевдониму и в WHERE."""
+        assert self.complete(completion, "SELECT * FROM ord|") == (
+            "ord", ["order_totals", "orders"])
+        assert self.complete(
+            completion, "SELECT c.| FROM customers c") == ("", ["id", "name"])
+        assert self.complete(
+            completion,
+            "SELECT * FROM orders o JOIN customers c ON c.id = o.customer_id "
+            "WHERE cu|") == ("cu", ["customer_id"])
+
+    def test_schema_refresh(self, completion):
+        """Тестирует обновление индекса таблиц после изменения схемы."""
+        assert self.complete(completion, "SELECT * FROM it|") == ("it", [])
+        completion.schema.db.execute_query("CREATE TABLE items (sku TEXT)")
+        completion.schema.refresh()
+        assert self.complete(completion, "SELECT * FROM it|") == (
+            "it", ["items"])
+        assert self.complete(completion, "SELECT s| FROM items") == (
+            "s", ["sku"] + completion._keywords.find("s"))
+
+    def test_many_tables_speed(self, tmp_path):
+        """Тестирует время подбора вариантов при тысячах таблиц."""
+        manager = DatabaseManager()
+        manager.connect(str(tmp_path / "many.db"))
+        manager.execute_script("".join(
+            f"CREATE TABLE t{i} (id INTEGER, name{i} TEXT, value REAL);"
+            for i in range(3000)))
+        manager.schema.refresh()
+        completion = SchemaCompletion(manager.schema)
+        text = ("SELECT a.id, b.value FROM t10 a JOIN t2500 b ON a.id = b.id "
+                "WHERE b.na")
+        assert completion.complete(text, len(text)) == ("na", ["name2500"])
+
+        start = time.perf_counter()
+        for _ in range(200):
+            completion.complete(text, len(text))
+            completion.complete("SELECT * FROM t25", 17)
+        assert (time.perf_counter() - start) / 400 < 0.001
+
+
+class TestPool:
+    """Тесты пула соединений: параллельное чтение в режиме WAL."""
+
+    SCHEMA = "CREATE TABLE t (x INTEGER); INSERT INTO t VALUES (1), (2), (3);"
+    PROFILE = {"journal_mode": "WAL"}
+    MAX_READERS = 2
+    CACHE_BYTES = 0
+
+    def test_readers_see_snapshot(self, db_manager):
+        """Тестирует выборку через читателя параллельно с записью."""
+        assert db_manager.parallel_reads
+        result = db_manager.execute_stream("SELECT x FROM t", 1)
+        assert result.fetch() == [(1,)]
+        assert db_manager.pool.busy_readers == 1
+
+        # Запись не ждет открытой выборки, а выборка не видит новую строку
+        db_manager.execute_query("INSERT INTO t VALUES (4)")
+        assert db_manager.execute_stream(
+            "SELECT count(*) FROM t").fetch_all() == [(4,)]
+        assert result.fetch_all() == [(2,), (3,)]
+        assert db_manager.pool.busy_readers == 0
+        assert db_manager.pool.open_readers == 2
+
+    def test_reader_limit_and_fallback(self, db_manager, monkeypatch):
+        """Тестирует предел читателей и выполнение через соединение записи."""
+        monkeypatch.setattr("sql_editor.db.connection.READER_WAIT", 0)
+        results = [db_manager.execute_stream("SELECT x FROM t", 1)
+                   for _ in range(3)]
+        assert db_manager.pool.busy_readers == 2
+        # Читателей не осталось - третья выборка идет через соединение записи
+        assert results[2].cursor.connection is db_manager.connection
+        for result in results:
+            result.close()
+
+        # Временная таблица видна только соединению записи
+        db_manager.execute_query("CREATE TEMP TABLE tmp (y)")
+        db_manager.execute_query("INSERT INTO tmp VALUES ('a')")
+        assert db_manager.execute_stream(
+            "SELECT y FROM tmp").fetch_all() == [("a",)]
+        assert all(profile.error is None for profile in db_manager.profiles)
+
+        # В ручном режиме транзакций выборка видит свои изменения
+        db_manager.autocommit = False
+        db_manager.execute_query("INSERT INTO t VALUES (5)")
+        assert not db_manager.parallel_reads
+        assert db_manager.execute_stream(
+            "SELECT count(*) FROM t").fetch_all() == [(4,)]
+        db_manager.rollback()
+
+    def test_concurrent_threads(self, db_manager):
+        """Тестирует одновременные выборки из нескольких потоков."""
+        barrier = threading.Barrier(4)
+        counts = []
+
+        def read():
+            barrier.wait()
+            result = db_manager.execute_stream(
+                "WITH RECURSIVE c(i) AS (SELECT 1 UNION ALL SELECT i + 1 "
+                "FROM c WHERE i < 20000) SELECT count(*) FROM c, t")
+            counts.append(result.fetch_all()[0][0])
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counts == [60000] * 4
+        assert db_manager.pool.open_readers <= 2
+
+    def test_journal_mode_switch(self, db_manager):
+        """Тестирует отключение читателей при выходе из режима WAL."""
+        db_manager.execute_stream("SELECT 1").fetch_all()
+        assert db_manager.set_pragma("journal_mode", "DELETE") == "delete"
+        assert not db_manager.parallel_reads
+        assert db_manager.pool.open_readers == 0
+        result = db_manager.execute_stream("SELECT x FROM t")
+        assert result.cursor.connection is db_manager.connection
+        result.close()
+
+    def test_backend_registry(self):
+        """Тестирует регистрацию и выбор драйвера БД."""
+        class MemoryBackend(SqliteBackend):
+            name = "test-memory"
+
+        register_backend(MemoryBackend)
+        try:
+            assert isinstance(get_backend("test-memory"), MemoryBackend)
+            manager = DatabaseManager(get_backend("test-memory"))
+            manager.connect(":memory:")
+            assert not manager.parallel_reads
+            manager.close()
+        finally:
+            del BACKENDS["test-memory"]
+        with pytest.raises(ValueError):
+            get_backend("test-memory")
+
+
+class TestCli:
+    """Тесты запуска скриптов без графического интерфейса."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = str(tmp_path / "cli.db")
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        connection.executemany("INSERT INTO t (v) VALUES (?)",
+                               [(f"v{i}",) for i in range(500)])
+        connection.commit()
+        connection.close()
+        return path
+
+    def test_numbered_path_and_groups(self):
+        """Тестирует имена файлов операторов и группы параллельных выборок."""
+        assert cli.numbered_path("out/r.ndjson.gz", 3) == "out/r.3.ndjson.gz"
+        assert cli.numbered_path("r.csv", 1) == "r.1.csv"
+        statements = ["SELECT 1", "WITH a AS (SELECT 1) SELECT * FROM a",
+                      "INSERT INTO t VALUES (1)", "SELECT 2"]
+        assert cli.plan_groups(statements, 1) == [[1], [2], [3], [4]]
+        assert cli.plan_groups(statements, 4) == [[1, 2], [3], [4]]
+
+    def test_run_to_files(self, db_path, tmp_path):
+        """Тестирует запись результатов каждого оператора в свой файл."""
+        script = tmp_path / "s.sql"
+        script.write_text("SELECT count(*) AS n FROM t;\n"
+                          "INSERT INTO t (v) VALUES ('x');\n"
+                          "SELECT v FROM t WHERE id > 499;", encoding="utf-8")
+        out = tmp_path / "r.ndjson"
+        code = cli.main(["run", db_path, str(script), "--out", str(out), "-q"])
+        assert code == cli.EXIT_OK
+        first = (tmp_path / "r.1.ndjson").read_text(encoding="utf-8")
+        assert json.loads(first) == {"n": 500}
+        rows = (tmp_path / "r.3.ndjson").read_text(encoding="utf-8")
+        assert [json.loads(line)["v"] for line in rows.splitlines()] == [
+            "v499", "x"]
+        assert not (tmp_path / "r.2.ndjson").exists()
+
+    def test_jobs_inside_script_transaction(self, db_path, tmp_path):
+        """Тестирует выборки --jobs внутри транзакции, открытой скриптом."""
+        script = tmp_path / "s.sql"
+        script.write_text("BEGIN;\nINSERT INTO t (v) VALUES ('tx');\n"
+                          "SELECT count(*) AS n FROM t;\n"
+                          "SELECT v FROM t WHERE v = 'tx';\nCOMMIT;\n"
+                          "SELECT count(*) AS n FROM t;\n"
+                          "SELECT count(*) AS n FROM t WHERE v = 'tx';",
+                          encoding="utf-8")
+        out = tmp_path / "r.ndjson"
+        code = cli.main(["run", db_path, str(script), "--out", str(out),
+                         "-j", "2", "-q"])
+        assert code == cli.EXIT_OK
+
+        def read(number):
+            path = tmp_path / f"r.{number}.ndjson"
+            return [json.loads(line) for line in
+                    path.read_text(encoding="utf-8").splitlines()]
+
+        # Незафиксированная строка видна выборкам внутри транзакции
+        assert read(3) == [{"n": 501}]
+        assert read(4) == [{"v": "tx"}]
+        assert read(6) == [{"n": 501}] and read(7) == [{"n": 1}]
+
+    def test_errors_and_transaction(self, db_path, tmp_path, capsys):
+        """Тестирует коды завершения и откат --single-transaction."""
+        script = tmp_path / "s.sql"
+        script.write_text("INSERT INTO t (v) VALUES ('y');\n"
+                          "SELECT * FROM nope;\nSELECT 1 AS a;",
+                          encoding="utf-8")
+        code = cli.main(["run", db_path, str(script), "--single-transaction"])
+        assert code == cli.EXIT_SQL_ERROR
+        out, err = capsys.readouterr()
+        assert out == ""
+        assert "no such table: nope" in err
+        assert "Выполнено операторов: 1 из 3" in err
+
+        code = cli.main(["run", db_path, str(script), "--continue", "-q"])
+        assert code == cli.EXIT_SQL_ERROR
+        assert capsys.readouterr().out == '{"a": 1}\n'
+        connection = sqlite3.connect(db_path)
+        # Первая попытка откачена, вторая зафиксирована
+        assert connection.execute(
+            "SELECT count(*) FROM t WHERE v = 'y'").fetchone()[0] == 1
+        connection.close()
+
+        assert cli.main(["run", db_path, str(script), "-j", "2"]) == \
+            cli.EXIT_USAGE
+        assert cli.main(["run", str(tmp_path / "none.db"), str(script)]) == \
+            cli.EXIT_IO_ERROR
+
+
+class TestBenchmark:
+    """Тесты набора замеров производительности."""
+
+    def test_small_run(self, tmp_path):
+        """Тестирует замеры без Qt на маленьких базах."""
+        report = benchmark.run_benchmarks(
+            sizes=[200], cases=["execute", "export", "filter"], repeat=1,
+            data_dir=str(tmp_path))
+        results = report["results"]
+        assert set(results) == {
+            f"{name}/{shape}/200" for shape in benchmark.SHAPES
+            for name in ("execute_query", "export_to_csv", "export_to_json",
+                         "column_store", "filter", "sort")}
+        assert results["execute_query/wide/200"]["peak_bytes"] > 0
+        assert results["execute_query/wide/200"]["rows"] == 200
+
+        # Повторный запуск берет уже созданную базу
+        path = benchmark.database_path(str(tmp_path), "narrow", 200)
+        modified = (tmp_path / path).stat().st_mtime_ns
+        benchmark.create_database(path, "narrow", 200)
+        assert (tmp_path / path).stat().st_mtime_ns == modified
+        connection = sqlite3.connect(path)
+        assert connection.execute(
+            "SELECT count(*) FROM narrow").fetchone()[0] == 200
+        connection.close()
+
+    def test_compare(self):
+        """Тестирует поиск регрессий относительно эталона."""
+        def report(**results):
+            return {"results": {
+                key: {"seconds": seconds, "peak_bytes": peak}
+                for key, (seconds, peak) in results.items()}}
+
+        baseline = report(a=(1.0, 1000), b=(0.001, 1000), c=(1.0, 1000))
+        current = report(a=(1.1, 1500), b=(0.003, 1000), c=(1.5, 900),
+                         d=(9.0, 9000))
+        assert benchmark.compare_results(current, baseline, 0.2) == [
+            ("a", "peak_bytes", 1000, 1500),
+            ("c", "seconds", 1.0, 1.5),
+        ]
+
+
+class TestStartup:
+    """Тесты замеров запуска и отложенного импорта."""
+
+    def test_import_timing(self, tmp_path, monkeypatch):
+        """Тестирует замер собственного и полного времени импорта."""
+        (tmp_path / "startup_outer.py").write_text(
+            "import time\nimport startup_inner\ntime.sleep(0.01)\n")
+        (tmp_path / "startup_inner.py").write_text(
+            "import time\ntime.sleep(0.02)\nVALUE = 1\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        report = StartupReport()
+        report.install()
+        try:
+            import startup_outer
+        finally:
+            report.uninstall()
+            sys.modules.pop("startup_outer", None)
+            sys.modules.pop("startup_inner", None)
+
+        own, cumulative = report.imports["startup_outer"]
+        inner_own, inner_cumulative = report.imports["startup_inner"]
+        assert inner_own >= 20000 and inner_own == inner_cumulative
+        assert 10000 <= own < 20000
+        assert cumulative >= own + inner_cumulative
+        # Загрузчик модуля не подменен оберткой
+        assert type(startup_outer.__loader__).__name__ == "SourceFileLoader"
+
+        report.mark("импорт")
+        text = report.format()
+        assert "импорт" in text and "startup_inner" in text
+
+    def test_window_import_is_lazy(self):
+        """Тестирует, что модуль окна не загружает экспорт, диалоги и план."""
+        code = ("import sys, sql_editor.ui.main_window; "
+                "print(sorted(name for name in sys.modules if name in ("
+                "'sql_editor.utils.export', 'sql_editor.utils.importer', "
+                "'sql_editor.ui.syntax', 'sql_editor.ui.import_dialog', "
+                "'sql_editor.ui.profile_dialog', 'sql_editor.db.plan', "
+                "'sql_editor.db.preview', 'sql_editor.db.history', 'csv', "
+                "'json', 'gzip', 'lzma')))")
+        output = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True, check=True)
+        assert output.stdout.strip() == "[]"
+
+
+class TestPreview:
+    """Тесты просмотра таблиц по rowid и оценки числа строк."""
+
+    SCHEMA = (
+        "CREATE TABLE big (id INTEGER PRIMARY KEY, v TEXT);"
+        "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s "
+        "WHERE n < 5000) INSERT INTO big SELECT n * 2 - 100, 'v' || n "
+        "FROM s;"
+        "CREATE TABLE kv (k TEXT PRIMARY KEY, v) WITHOUT ROWID;"
+        "INSERT INTO kv VALUES ('a', 1);"
+        "CREATE TABLE odd (rowid TEXT, x);"
+        "INSERT INTO odd VALUES ('r1', 1), ('r2', 2);"
+        "CREATE VIEW big_view AS SELECT * FROM big;")
+
+    def test_keyset_pages(self, db_manager):
+        """Тестирует постраничное чтение по rowid с пропусками и отрицательными rowid."""
+        preview = TablePreview(db_manager, "big", 1000)
+        assert preview.headers == ["id", "v"]
+        first = preview.fetch()
+        assert first[0] == (-98, "v1") and len(first) == 1000
+        rest = preview.fetch_all()
+        assert preview.exhausted
+        ids = [row[0] for row in first + rest]
+        assert ids == list(range(-98, 9902, 2))
+
+        # Столбец с именем rowid не мешает: используется _rowid_
+        odd = TablePreview(db_manager, "odd", 10)
+        assert odd.headers == ["rowid", "x"]
+        assert odd.fetch() == [("r1", 1), ("r2", 2)]
+
+        for name in ("kv", "big_view"):
+            with pytest.raises(ValueError):
+                TablePreview(db_manager, name, 10)
+
+    def test_sample(self, db_manager):
+        """Тестирует случайную выборку поиском по rowid."""
+        headers, rows = sample_rows(db_manager, "big", 100)
+        assert headers == ["id", "v"]
+        assert 90 <= len(rows) <= 100
+        ids = [row[0] for row in rows]
+        assert ids == sorted(set(ids))
+
+        _, rows = sample_rows(db_manager, "odd", 100)
+        assert sorted(rows) == [("r1", 1), ("r2", 2)]
+
+        # Столбцы с именами n и r не заслоняют служебные столбцы выборки
+        db_manager.execute_script(
+            "CREATE TABLE nr (id INTEGER PRIMARY KEY, n INT, r INT);"
+            "WITH RECURSIVE s(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM s "
+            "WHERE x < 10000) INSERT INTO nr SELECT x, 0, 0 FROM s;")
+        _, rows = sample_rows(db_manager, "nr", 50)
+        assert len(rows) >= 40
+        with pytest.raises(ValueError):
+            sample_rows(db_manager, "kv")
+
+    def test_row_estimates(self, db_manager):
+        """Тестирует оценку числа строк по max(rowid) и по sqlite_stat1."""
+        schema = db_manager.schema
+        schema.refresh()
+        assert schema.row_estimates(["big", "kv", "odd"]) == {
+            "big": (9900, "rowid"), "odd": (2, "rowid")}
+        # Изменение данных (без изменения схемы) сбрасывает оценки
+        assert not schema.estimates_stale()
+        db_manager.execute_query("INSERT INTO odd VALUES ('r3', 3)")
+        assert schema.estimates_stale()
+        assert schema.row_estimates(["odd"]) == {"odd": (3, "rowid")}
+
+        db_manager.execute_query("ANALYZE")
+        schema.refresh()
+        estimates = schema.row_estimates(["big", "kv", "odd"])
+        assert estimates == {"big": (5000, "stat1"), "kv": (1, "stat1"),
+                             "odd": (3, "stat1")}
+        # Повторный ANALYZE не меняет ни схему, ни total_changes
+        db_manager.execute_query("DELETE FROM odd WHERE x = 3")
+        schema.row_estimates(["odd"])
+        db_manager.execute_query("ANALYZE")
+        assert not schema.refresh()
+        assert schema.row_estimates(["odd"]) == {"odd": (2, "stat1")}
+
+
+class TestEditing:
+    """Тесты правки результата и записи правок одной транзакцией."""
+
+    SCHEMA = (
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE, "
+        "qty INTEGER DEFAULT 0);"
+        "INSERT INTO items VALUES (1, 'a', 1), (2, 'b', 2), (3, 'c', 3);"
+        "CREATE TABLE pairs (x, y, v, PRIMARY KEY (y, x));"
+        "INSERT INTO pairs VALUES (1, 1, 'p');"
+        "CREATE TABLE plain (v);"
+        "CREATE VIEW items_view AS SELECT * FROM items;")
+
+    def test_edit_target(self, db_manager):
+        """Тестирует определение таблицы и ключа правки по запросу."""
+        target = edit_target(db_manager, "SELECT * FROM Items WHERE id > ?",
+                             ["id", "name", "qty"])
+        assert target.table == "items" and target.key_columns == ["id"]
+        target = edit_target(db_manager, "SELECT v, x, y FROM pairs",
+                             ["v", "x", "y"])
+        assert target.key_columns == ["y", "x"]
+        target = edit_target(db_manager, "SELECT rowid, v FROM plain",
+                             ["rowid", "v"])
+        assert target.key_columns == ["rowid"]
+
+        for sql, headers in [
+                ("SELECT * FROM items i JOIN pairs p ON p.x = i.id",
+                 ["id", "name", "qty", "x", "y", "v"]),
+                ("SELECT id, name AS n FROM items", ["id", "n"]),
+                ("SELECT id, qty + 1 FROM items", ["id", "qty + 1"]),
+                ("SELECT * FROM items_view", ["id", "name", "qty"]),
+                ("SELECT name FROM items", ["name"]),
+                ("SELECT v FROM plain", ["v"]),
+                ("SELECT DISTINCT id FROM items", ["id"]),
+                ("DELETE FROM items", [])]:
+            assert edit_target(db_manager, sql, headers) is None, sql
+
+    def test_statements(self, db_manager):
+        """Тестирует группировку правок в операторы executemany."""
+        target = edit_target(db_manager, "SELECT * FROM items",
+                             ["id", "name", "qty"])
+        pending = PendingChanges(target)
+        pending.edit((1, "a", 1), 2, 10)
+        pending.edit((2, "b", 2), 2, 20)
+        pending.edit((3, "c", 3), 1, "z")
+        pending.edit((3, "c", 3), 1, "c")
+        assert not pending.is_edited((3, "c", 3), 1)
+        pending.delete((3, "c", 3))
+        pending.inserts.append({1: "d"})
+        pending.inserts.append({})
+        assert len(pending) == 5
+        assert pending.statements() == [
+            ('DELETE FROM "items" WHERE "id" = ?', [[3]]),
+            ('UPDATE "items" SET "qty" = ? WHERE "id" = ?', [[10, 1], [20, 2]]),
+            ('INSERT INTO "items" ("name") VALUES (?)', [["d"]]),
+            ('INSERT INTO "items" DEFAULT VALUES', [[]]),
+        ]
+        assert cell_text("12") == "'12'" and cell_text(None) == "NULL"
+
+    def test_apply(self, db_manager):
+        """Тестирует запись правок одной транзакцией."""
+        target = edit_target(db_manager, "SELECT * FROM items",
+                             ["id", "name", "qty"])
+        pending = PendingChanges(target)
+        for row in [(1, "a", 1), (2, "b", 2)]:
+            pending.edit(row, 2, row[2] * 10)
+        pending.delete((3, "c", 3))
+        pending.inserts.append({1: "d"})
+        changes = db_manager.connection.total_changes
+        assert pending.apply() == 4
+        assert not pending and not db_manager.in_transaction
+        assert db_manager.connection.total_changes - changes == 4
+        _, rows = db_manager.execute_query("SELECT * FROM items ORDER BY id")
+        assert rows == [(1, "a", 10), (2, "b", 20), (3, "d", 0)]
+
+    def test_preview_hidden_rowid(self, qt_app, db_manager):
+        """Тестирует правку просмотра таблицы без первичного ключа по скрытому rowid."""
+        db_manager.execute_query(
+            "INSERT INTO plain VALUES ('a'), ('a'), ('b'), ('0')")
+        sql = "SELECT * FROM plain;"
+        preview = TablePreview(db_manager, "plain", 2)
+        assert preview.headers == ["v"] and preview.key_columns == ["rowid"]
+        assert edit_target(db_manager, sql, preview.headers) is None
+        target = edit_target(db_manager, sql, preview.headers,
+                             preview.key_columns)
+        assert target.key_columns == ["rowid"] and target.key_indexes == [1]
+
+        model = ResultTableModel()
+        model.set_result(preview.headers, preview.fetch(), preview)
+        model.set_pending(PendingChanges(target))
+        # Сортировка догружает строки; ключи идут за строками
+        model.sort(0, Qt.SortOrder.DescendingOrder)
+        assert model.columnCount() == 1
+        assert [model.data(model.index(row, 0)) for row in range(4)] == [
+            "b", "a", "a", "0"]
+        assert model.row_at(0) == ("b", 3)
+        assert model.setData(model.index(2, 0), "c")
+        model.delete_rows([3])
+        assert model.apply_pending() == 2
+        _, rows = db_manager.execute_query(
+            "SELECT rowid, v FROM plain ORDER BY rowid")
+        assert rows == [(1, "a"), (2, "c"), (3, "b")]
+
+    def test_conflict_rolls_back(self, db_manager):
+        """Тестирует откат всех правок, если строка пропала или нарушено ограничение."""
+        target = edit_target(db_manager, "SELECT * FROM items",
+                             ["id", "name", "qty"])
+        pending = PendingChanges(target)
+        pending.edit((1, "a", 1), 2, 100)
+        pending.edit((9, "x", 0), 2, 5)
+        with pytest.raises(ValueError):
+            pending.apply()
+        assert len(pending) == 2
+
+        pending = PendingChanges(target)
+        pending.edit((1, "a", 1), 2, 100)
+        pending.edit((2, "b", 2), 1, "a")
+        with pytest.raises(sqlite3.IntegrityError):
+            pending.apply()
+        assert not db_manager.in_transaction
+        _, rows = db_manager.execute_query("SELECT * FROM items ORDER BY id")
+        assert rows == [(1, "a", 1), (2, "b", 2), (3, "c", 3)]
+
+        # В ручной транзакции откатываются только правки
+        db_manager.autocommit = False
+        db_manager.execute_query("INSERT INTO plain VALUES (1)")
+        with pytest.raises(sqlite3.IntegrityError):
+            pending.apply()
+        assert db_manager.in_transaction
+        db_manager.commit()
+        _, rows = db_manager.execute_query("SELECT v FROM plain")
+        assert rows == [(1,)]
+
+
+class TestColumnar:
+    """Тесты хранения результата по столбцам, фильтра и сортировки."""
+
+    ROWS = [
+        (3, "b", 1.5, b"\x01"),
+        (None, "a", None, None),
+        (1, "b", 2.5, "text"),
+        (2, None, 0.5, 7),
+        (-5, "C", 2.5, None),
+    ]
+
+    def test_store(self):
+        """Тестирует виды столбцов, NULL и доступ к строкам как к списку."""
+        store = ColumnStore(4, self.ROWS[:2])
+        store.extend(self.ROWS[2:])
+        assert [column.kind for column in store.columns] == [
+            "int", "text", "float", "object"]
+        assert store.columns[1].words == ["b", "a", "C"]
+        assert len(store) == 5 and list(store) == self.ROWS
+        assert store[1] == self.ROWS[1] and store[-1] == self.ROWS[-1]
+        assert store[1:3] == self.ROWS[1:3]
+
+        # Столбец из одних NULL, затем значения; смена вида на object
+        store = ColumnStore(1, [(None,)] * 3)
+        assert store.columns[0].kind is None
+        store.extend([(1,), (2 ** 70,), ("x",)])
+        assert store.columns[0].kind == "object"
+        assert [row[0] for row in store] == [None, None, None, 1, 2 ** 70, "x"]
+
+        # Почти уникальный текст хранится списком, а не словарем
+        store = ColumnStore(1, [(f"v{i}",) for i in range(2000)])
+        assert store.columns[0].kind == "object" and store[1999] == ("v1999",)
+
+    def test_sort(self):
+        """Тестирует сортировку по нескольким столбцам в порядке SQLite."""
+        store = ColumnStore(4, self.ROWS)
+        assert store.sort_order([(0, False)]) == [1, 4, 2, 3, 0]
+        assert store.sort_order([(0, True)]) == [0, 3, 2, 4, 1]
+        # Текст сравнивается побайтно, как BINARY в SQLite: "C" < "b"
+        assert store.sort_order([(2, True), (1, False)]) == [4, 2, 0, 3, 1]
+        assert store.sort_order([(1, False), (0, True)]) == [3, 4, 1, 0, 2]
+        assert store.sort_order([(3, False)]) == [1, 4, 3, 2, 0]
+
+    def test_filter(self):
+        """Тестирует подстроку, регулярное выражение и диапазон."""
+        store = ColumnStore(4, self.ROWS)
+        assert store.view((), RowFilter("B")) == [0, 2]
+        assert store.view((), RowFilter("5", column=2)) == [0, 2, 3, 4]
+        assert store.view((), RowFilter("none")) == []
+        assert store.view((), RowFilter("^[a-b]$", "regex", 1)) == [0, 1, 2]
+        assert store.view((), RowFilter("1..2.5", "range", 2)) == [0, 2, 4]
+        assert store.view((), RowFilter("..2", "range", 0)) == [2, 3, 4]
+        assert store.view((), RowFilter("b..", "range", 1)) == [0, 2]
+        assert store.view(((0, True),), RowFilter("b", column=1)) == [0, 2]
+        with pytest.raises(ValueError):
+            RowFilter("(", "regex")
+        with pytest.raises(ValueError):
+            RowFilter("10", "range")
+
+
+class TestResultModel:
+    """Тесты модели результата: догрузка строк, правки, сортировка и фильтр."""
+
+    SCHEMA = (
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, qty INTEGER);"
+        "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s "
+        "WHERE n < 10) INSERT INTO items SELECT n, 'g' || (n % 2), n * 10 "
+        "FROM s;")
+    SQL = "SELECT * FROM items ORDER BY id"
+
+    @pytest.fixture
+    def model(self, qt_app):
+        return ResultTableModel()
+
+    def load(self, model, db_manager, batch_size=4):
+        result = db_manager.execute_stream(self.SQL, batch_size)
+        model.set_result(result.headers, result.fetch(), result)
+        return result
+
+    def column(self, model, column):
+        return [model.data(model.index(row, column))
+                for row in range(model.rowCount())]
+
+    def test_fetch_paging(self, model, db_manager):
+        """Тестирует догрузку порций через canFetchMore/fetchMore."""
+        progress = []
+        model.fetchProgress.connect(lambda count, done: progress.append(
+            (count, done)))
+        result = self.load(model, db_manager)
+        assert model.rowCount() == 4 and model.columnCount() == 3
+        assert model.canFetchMore()
+        model.fetchMore()
+        assert model.rowCount() == 8
+        model.fetchMore()
+        assert model.rowCount() == 10 and not model.canFetchMore()
+        model.fetchMore()
+        assert progress == [(4, False), (8, False), (10, True)]
+        assert result.exhausted
+
+        assert model.data(model.index(0, 1)) == "g1"
+        assert model.data(model.index(9, 2)) == "100"
+        assert model.data(model.index(0, 0),
+                          Qt.ItemDataRole.EditRole) is None
+        assert model.headerData(1, Qt.Orientation.Horizontal) == "name"
+        assert model.headerData(2, Qt.Orientation.Vertical) == "3"
+        # Результат только для чтения
+        assert not model.setData(model.index(0, 2), "1")
+        assert not model.flags(model.index(0, 2)) \
+            & Qt.ItemFlag.ItemIsEditable
+
+        # Новый результат закрывает прежнюю незаконченную выборку
+        result = self.load(model, db_manager)
+        model.set_result(["x"], [(1,), (2,)])
+        assert result.exhausted
+        assert model.rowCount() == 2 and not model.canFetchMore()
+        assert model.total_count() == 2 and model.sort_keys() == []
+        model.clear()
+        assert model.rowCount() == 0 and model.columnCount() == 0
+
+    def test_sort_and_filter(self, model, db_manager):
+        """Тестирует сортировку по нескольким столбцам и быстрый фильтр."""
+        self.load(model, db_manager)
+        model.sort(2, Qt.SortOrder.DescendingOrder)
+        # Перед сортировкой результат загружается целиком
+        assert not model.canFetchMore()
+        assert self.column(model, 0) == [str(n) for n in range(10, 0, -1)]
+
+        model.set_view([(1, False), (0, True)], None)
+        assert self.column(model, 0) == [
+            "10", "8", "6", "4", "2", "9", "7", "5", "3", "1"]
+        assert model.headerData(1, Qt.Orientation.Horizontal) == "name ▲1"
+        assert model.headerData(0, Qt.Orientation.Horizontal) == "id ▼2"
+        assert model.row_at(0) == (10, "g0", 100)
+
+        model.set_filter(RowFilter("g1", column=1))
+        assert self.column(model, 0) == ["9", "7", "5", "3", "1"]
+        assert model.shown_count() == 5 and model.total_count() == 10
+        model.set_view([], RowFilter("3..7", "range", 0))
+        assert self.column(model, 0) == ["3", "4", "5", "6", "7"]
+        assert model.headerData(1, Qt.Orientation.Horizontal) == "name"
+        model.set_view([], None)
+        assert model.rowCount() == 10
+
+    def test_pending_edits(self, model, db_manager):
+        """Тестирует правку ячеек, пометку удаления и добавленные строки."""
+        self.load(model, db_manager, 100)
+        counts = []
+        model.pendingChanged.connect(counts.append)
+        model.set_pending(PendingChanges(edit_target(
+            db_manager, self.SQL, model.headers())))
+        background = Qt.ItemDataRole.BackgroundRole
+
+        # Правка ячейки в отсортированном представлении
+        model.sort(2, Qt.SortOrder.DescendingOrder)
+        index = model.index(0, 2)
+        assert model.flags(index) & Qt.ItemFlag.ItemIsEditable
+        assert model.setData(index, "7")
+        assert model.data(index) == "7"
+        assert model.data(index, Qt.ItemDataRole.EditRole) == "7"
+        assert model.data(index, background) == EDITED_COLOR
+        assert model.data(model.index(0, 1), background) is None
+        assert model.setData(model.index(1, 1), "12")
+        assert model.data(model.index(1, 1),
+                          Qt.ItemDataRole.EditRole) == "12"
+        assert model.value(model.index(1, 1)) == 12
+
+        # Удаление: строка зачеркнута и не редактируется, повтор снимает пометку
+        model.delete_rows([2])
+        assert model.data(model.index(2, 0), background) == DELETED_COLOR
+        assert model.data(model.index(2, 0),
+                          Qt.ItemDataRole.FontRole).strikeOut()
+        assert not model.flags(model.index(2, 0)) \
+            & Qt.ItemFlag.ItemIsEditable
+        model.delete_rows([2, 3])
+        assert model.data(model.index(2, 0), background) is None
+
+        # Добавленные строки идут после полученных
+        row = model.insert_row()
+        assert row == 10 and model.rowCount() == 11
+        assert model.data(model.index(row, 1)) is None
+        assert model.data(model.index(row, 1), background) == INSERTED_COLOR
+        assert model.setData(model.index(row, 1), "new")
+        assert model.value(model.index(row, 1)) is None
+        second = model.insert_row()
+        model.delete_rows([second])
+        assert model.rowCount() == 11
+        assert counts == [0, 1, 2, 3, 3, 4, 4, 5, 4]
+
+        assert model.apply_pending() == 4
+        assert counts[-1] == 0 and not model.pending()
+        _, rows = db_manager.execute_query(
+            "SELECT id, name, qty FROM items WHERE id IN (7, 9, 10, 11) "
+            "ORDER BY id")
+        # Столбец TEXT хранит введенное число строкой
+        assert rows == [(9, "12", 90), (10, "g0", 7), (11, "new", None)]
+
+        model.insert_row()
+        model.discard_pending()
+        assert model.rowCount() == 10 and counts[-1] == 0
+
+
+class TestQueryWorker:
+    """Тесты выполнения запроса в фоновом потоке и его отмены."""
+
+    # Выборка, которая выполняется дольше любого разумного ожидания
+    LONG_SQL = ("WITH RECURSIVE c(i) AS (SELECT 1 UNION ALL SELECT i + 1 "
+                "FROM c WHERE i < 1000000000) SELECT count(*) FROM c")
+
+    def run(self, qt_app, db, sql, cancel=False):
+        worker = QueryWorker(db, sql, 100)
+        ready, failed = [], []
+        worker.resultReady.connect(lambda result, rows: ready.append(rows))
+        worker.failed.connect(failed.append)
+        db.vm_steps = 0
+        worker.start()
+        if cancel:
+            # Отмена, когда запрос уже выполняется в SQLite
+            deadline = time.monotonic() + 10
+            while not db.vm_steps and time.monotonic() < deadline:
+                time.sleep(0.01)
+            worker.cancel()
+        assert worker.wait(10000)
+        # Сигналы из потока доставляются через очередь событий
+        qt_app.processEvents()
+        return worker, ready, failed
+
+    @pytest.mark.parametrize("journal_mode", ["DELETE", "WAL"])
+    def test_interrupt(self, qt_app, tmp_path, journal_mode):
+        """Тестирует отмену долгого запроса и работу соединения после нее."""
+        db = open_database(tmp_path / "worker.db",
+                           "CREATE TABLE t (x); INSERT INTO t VALUES (1);",
+                           new_profile({"journal_mode": journal_mode}))
+        try:
+            worker, ready, failed = self.run(qt_app, db, self.LONG_SQL,
+                                             cancel=True)
+            assert worker.cancelled and not ready
+            assert len(failed) == 1
+            assert isinstance(failed[0], sqlite3.OperationalError)
+            assert "interrupted" in str(failed[0])
+            assert db.progress_callback is None
+            if db.pool is not None:
+                assert db.pool.busy_readers == 0
+
+            # Соединение остается рабочим для следующих запросов
+            worker, ready, failed = self.run(qt_app, db, "SELECT x FROM t")
+            assert ready == [[(1,)]] and not failed
+            db.execute_query("INSERT INTO t VALUES (2)")
+            _, rows = db.execute_query("SELECT count(*) FROM t")
+            assert rows == [(2,)] and not db.in_transaction
+        finally:
+            db.close()
+
+
+class TestBlobs:
+    """Тесты заглушек длинных значений и чтения BLOB частями."""
+
+    SCHEMA = (
+        "CREATE TABLE files (id INTEGER PRIMARY KEY, name TEXT, data BLOB, "
+        "n INT);"
+        "INSERT INTO files VALUES (1, 'small', x'0001', 10);"
+        "INSERT INTO files VALUES (2, hex(randomblob(3000)), "
+        "randomblob(100000), 20);")
+
+    def test_lazy_preview(self, db_manager):
+        """Тестирует заглушки в просмотре таблицы и чтение через blobopen."""
+        rows = TablePreview(db_manager, "files", 10).fetch_all()
+        assert rows[0] == (1, "small", b"\x00\x01", 10)
+        _, name, data, n = rows[1]
+        assert n == 20
+        assert isinstance(name, LazyValue) and name.is_text
+        assert str(name) == "<TEXT, символов: 6000>"
+        assert isinstance(data, LazyValue) and data.size == 100000
+        assert str(data) == "<BLOB 97.7 КБ>"
+
+        expected = db_manager.execute_query(
+            "SELECT name, data FROM files WHERE id = 2")[1][0]
+        assert name.read().decode() == expected[0]
+        assert b"".join(data.chunks(30000)) == expected[1]
+        assert data.read(99990, 100) == expected[1][99990:]
+        assert data.length() == 100000
+
+        _, sample = sample_rows(db_manager, "files", 10)
+        assert [type(row[2]) for row in sample] == [bytes, LazyValue]
+
+        # Перенос заглушек на другое соединение (фоновый экспорт)
+        other = DatabaseManager()
+        other.max_readers = 0
+        other.connect(db_manager.db_path)
+        bound = list(bind_rows(rows, other))
+        assert bound[0] is rows[0]
+        assert bound[1][2].db is other and bound[1][1].db is other
+        assert bound[1][2].read(0, 10) == expected[1][:10]
+        other.close()
+
+    def test_display(self):
+        """Тестирует текст ячейки для BLOB и длинного текста и дамп HEX."""
+        assert display_text(b"\x00" * 2048) == "<BLOB 2.0 КБ>"
+        assert display_text("x" * 300) == "x" * 256 + "…"
+        assert display_text(1.5) == "1.5"
+        assert format_hex(b"AB\x00", 16) == (
+            "00000010  41 42 00" + " " * 41 + "|AB.|")
+
+    def test_export(self, db_manager, tmp_path):
+        """Тестирует экспорт BLOB строками base64 и отдельными файлами."""
+        preview = TablePreview(db_manager, "files", 1)
+        path = tmp_path / "files.json"
+        export.export_stream(str(path), preview.headers, preview.batches(),
+                             "json")
+        items = json.loads(path.read_text(encoding="utf-8"))
+        expected = db_manager.execute_query("SELECT * FROM files")[1]
+        assert items[0] == {"id": 1, "name": "small", "data": "AAE=", "n": 10}
+        assert items[1]["name"] == expected[1][1]
+        assert base64.b64decode(items[1]["data"]) == expected[1][2]
+
+        path = tmp_path / "files.ndjson.gz"
+        preview = TablePreview(db_manager, "files", 10)
+        export.export_stream(str(path), preview.headers, preview.batches(),
+                             "ndjson", ".gz", blobs="files")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f]
+        assert items[1]["data"] == "files_blobs/2_data.bin"
+        assert items[1]["name"] == "files_blobs/2_name.txt"
+        assert (tmp_path / "files_blobs" / "2_data.bin").read_bytes() == \
+            expected[1][2]
+        assert (tmp_path / "files_blobs" / "1_data.bin").read_bytes() == \
+            b"\x00\x01"
+
+
+class TestWorkload:
+    """Тесты нагрузочного повторения запросов."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = str(tmp_path / "load.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        connection.executemany("INSERT INTO t (v) VALUES (?)",
+                               [(f"v{i}",) for i in range(1000)])
+        connection.commit()
+        connection.close()
+        return path
+
+    def test_split_and_percentile(self):
+        """Тестирует разделение операторов и процентили задержки."""
+        reads, writes, skipped = split_workload([
+            "SELECT 1", "WITH a AS (SELECT 1) SELECT * FROM a",
+            "INSERT INTO t (v) VALUES ('x')", "BEGIN", "PRAGMA cache_size",
+            "SELECT * FROM t WHERE id = ?", "DELETE FROM t WHERE id = :id"])
+        assert reads == ["SELECT 1", "WITH a AS (SELECT 1) SELECT * FROM a"]
+        assert writes == ["INSERT INTO t (v) VALUES ('x')"]
+        assert skipped == 4
+
+        values = list(range(1, 101))
+        assert [percentile(values, p) for p in (50, 95, 99, 100)] == \
+            [50, 95, 99, 100]
+        assert percentile([7], 99) == 7 and percentile([], 50) is None
+
+    def test_run_modes(self, db_path):
+        """Тестирует замер в потоках для двух режимов журнала на копиях БД."""
+        report = run_workload(
+            db_path, ["SELECT count(*) FROM t"],
+            ["INSERT INTO t (v) VALUES ('x')", "UPDATE t SET v = 'y' "
+             "WHERE id = 1", "INSERT INTO t (id) VALUES (1)"],
+            readers=2, writers=1, write_rate=100, duration=0.3,
+            journal_modes=("WAL", "DELETE"))
+        assert list(report["journal_modes"]) == ["WAL", "DELETE"]
+        for result in report["journal_modes"].values():
+            reads, writes = result["reads"], result["writes"]
+            assert reads["operations"] > 0 and reads["errors"] == 0
+            latency = reads["latency_ms"]
+            assert latency["p50"] <= latency["p95"] <= latency["p99"] <= \
+                latency["max"]
+            # Частота ограничена: около 30 изменений, каждое третье - ошибка
+            assert 15 <= writes["operations"] + writes["errors"] <= 31
+            assert writes["error_messages"] == {
+                "UNIQUE constraint failed: t.id": writes["errors"]}
+        json.dumps(report)
+
+        # Исходная БД не изменилась
+        connection = sqlite3.connect(db_path)
+        assert connection.execute("SELECT count(*) FROM t").fetchone()[0] == \
+            1000
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == \
+            "delete"
+        connection.close()
+
+        with pytest.raises(ValueError):
+            run_workload(db_path, [], ["DELETE FROM t"], readers=1)
+
+    def test_history_cli(self, db_path, tmp_path):
+        """Тестирует команду load с запросами из истории редактора."""
+        history_path = str(tmp_path / "history.db")
+        QueryHistory(history_path).close()
+        connection = sqlite3.connect(history_path)
+        connection.executemany(
+            "INSERT INTO history (executed_at, db_path, sql, error) "
+            "VALUES (0, ?, ?, ?)",
+            [(db_path, "SELECT * FROM t WHERE id = 5", None),
+             (db_path, "SELECT * FROM nope", "no such table: nope"),
+             ("other.db", "SELECT 2", None),
+             (db_path, "UPDATE t SET v = 'z' WHERE id = 2", None)])
+        connection.commit()
+        connection.close()
+        assert saved_statements(history_path, db_path) == [
+            "SELECT * FROM t WHERE id = 5", "UPDATE t SET v = 'z' WHERE id = 2"]
+        assert saved_statements(history_path, limit=1) == [
+            "UPDATE t SET v = 'z' WHERE id = 2"]
+
+        out = tmp_path / "report.json"
+        code = cli.main(["load", db_path, "--history", history_path,
+                         "--readers", "1", "--writers", "1", "--duration",
+                         "0.2", "--journal-modes", "wal", "-o", str(out),
+                         "-q"])
+        assert code == cli.EXIT_OK
+        report = json.loads(out.read_text(encoding="utf-8"))
+        assert report["workload"]["reads"] == 1
+        assert report["workload"]["writes"] == 1
+        assert report["journal_modes"]["WAL"]["writes"]["operations"] > 0
+
+        assert cli.main(["load", db_path, "--history", history_path,
+                         "--journal-modes", "fast"]) == cli.EXIT_USAGE